@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DjangoUsersProject.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Поток событий об изменениях пользователей (SSE) обслуживается до Django
+from main.events import UserEventsApp  # noqa: E402
+
+application = UserEventsApp(django_application)
@@ -38,9 +38,13 @@ ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',')
 
 # Application definition
 
+# Облегчённый старт воркера: админка и HTML-представления загружаются при первом обращении
+LEAN_STARTUP = os.getenv('LEAN_STARTUP', 'False') == 'True'
+
 INSTALLED_APPS = [
     'main',
-    'django.contrib.admin',
+    # SimpleAdminConfig не импортирует admin.py модули при старте (см. main.lazy)
+    'django.contrib.admin.apps.SimpleAdminConfig' if LEAN_STARTUP else 'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -51,8 +55,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.health.HealthCheckMiddleware',
+    'main.tracing.TracingMiddleware',
+    'main.slowlog.SlowRequestMiddleware',
+    'main.memprofile.MemoryProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # Статика отдаётся самим приложением, до сессий и аутентификации
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'main.db_routers.ReplicaPinningMiddleware',
+    'main.tracing.TracedSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -60,14 +71,32 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Запросы к API с заголовком Authorization: Token пропускают браузерную часть
+# middleware (сессия, CSRF, сообщения, X-Frame-Options); стандартные middleware
+# остаются в списке, и проверки check --deploy их находят
+API_PATH_PREFIX = '/api/'
+LEAN_API_MIDDLEWARE = os.getenv('LEAN_API_MIDDLEWARE', 'True') == 'True'
+if LEAN_API_MIDDLEWARE:
+    MIDDLEWARE.append('main.browser_middleware.TokenAPIMiddleware')
+
 ROOT_URLCONF = 'DjangoUsersProject.urls'
 
+# Скомпилированные шаблоны хранятся в памяти процесса (cached.Loader); при
+# TEMPLATE_PRECOMPILE шаблоны проекта компилируются при старте, до первого запроса
+TEMPLATE_CACHE = os.getenv('TEMPLATE_CACHE', str(not DEBUG)) == 'True'
+TEMPLATE_PRECOMPILE = TEMPLATE_CACHE and not LEAN_STARTUP and os.getenv('TEMPLATE_PRECOMPILE', 'True') == 'True'
+_TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': [('django.template.loaders.cached.Loader', _TEMPLATE_LOADERS)]
+            if TEMPLATE_CACHE else _TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -83,10 +112,122 @@ WSGI_APPLICATION = 'DjangoUsersProject.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Постоянные соединения: CONN_MAX_AGE секунд соединение переживает запрос,
+# перед повторным использованием проверяется (CONN_HEALTH_CHECKS)
 DATABASES = {
     "default": dj_database_url.config(
-        default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}"
+        default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
+        conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        conn_health_checks=os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+    )
+}
+
+# Режим SQLite для конкурентной нагрузки (когда DATABASE_URL не задан): WAL позволяет
+# читать во время записи, busy timeout ждёт блокировку вместо «database is locked»,
+# а транзакции IMMEDIATE берут блокировку записи сразу, без взаимоблокировок при её повышении.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' and os.getenv('SQLITE_TUNED', 'True') == 'True':
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', '20')),
+        'transaction_mode': os.getenv('SQLITE_TRANSACTION_MODE', 'IMMEDIATE') or None,
+        'init_command': ';'.join([
+            'PRAGMA journal_mode=WAL',
+            'PRAGMA synchronous=NORMAL',
+            'PRAGMA temp_store=MEMORY',
+            f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))}",
+            f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_SIZE_KB', '32768'))}",
+        ]),
+    })
+
+# Реплики только для чтения: DATABASE_REPLICA_URLS через запятую.
+# Маршрутизация и «прилипание» к основной БД после записи — main.db_routers.
+DATABASE_REPLICAS = []
+for _index, _url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    _alias = f'replica{_index}'
+    DATABASES[_alias] = dj_database_url.parse(
+        _url.strip(),
+        conn_max_age=DATABASES['default']['CONN_MAX_AGE'],
+        conn_health_checks=DATABASES['default']['CONN_HEALTH_CHECKS'],
     )
+    DATABASES[_alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['main.db_routers.PrimaryReplicaRouter']
+
+# Сколько секунд после записи клиент читает только с основной БД
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
+# Пул соединений psycopg 3 для PostgreSQL (Django 5.1+). Несовместим с постоянными
+# соединениями, поэтому при включённом пуле CONN_MAX_AGE сбрасывается в 0.
+if os.getenv('DB_POOL', 'False') == 'True':
+    for _database in DATABASES.values():
+        if _database['ENGINE'] != 'django.db.backends.postgresql':
+            continue
+        _database['CONN_MAX_AGE'] = 0
+        _database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '600')),
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
+        }
+
+
+# Аутентификация и хеширование паролей (с замером фаз для трассировки)
+
+AUTHENTICATION_BACKENDS = [
+    'main.backends.TracedModelBackend',
+]
+
+PASSWORD_HASHERS = [
+    'main.backends.TracedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+
+# Кеш: L1 в памяти процесса (main.cache.TieredCache) поверх общего для воркеров L2.
+# CACHE_BACKEND: file (по умолчанию), db (нужен manage.py createcachetable), redis, locmem.
+# Блокировки между воркерами (get_or_set, Idempotency-Key) надёжны только с redis и db:
+# у file add() не атомарен (perfcheck: perf.W005).
+_SHARED_CACHE_BACKENDS = {
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'django_cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/0'),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'shared'),
+}
+_shared_backend, _shared_location = _SHARED_CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'file')]
+
+CACHES = {
+    'default': {
+        'BACKEND': 'main.cache.TieredCache',
+        # Имя L1 и счётчиков процесса: общие для всех потоков, как у LocMemCache
+        'LOCATION': 'default',
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', '300')),
+        # Смена версии при деплое делает недействительными все старые ключи
+        'VERSION': int(os.getenv('CACHE_VERSION', '1')),
+        'OPTIONS': {
+            'SHARED_ALIAS': 'shared',
+            'L1_MAX_ENTRIES': int(os.getenv('CACHE_L1_MAX_ENTRIES', '10000')),
+            'L1_TTL': float(os.getenv('CACHE_L1_TTL', '5')),
+            'TAG_TTL': float(os.getenv('CACHE_TAG_TTL', '1')),
+        },
+    },
+    'shared': {
+        'BACKEND': _shared_backend,
+        'LOCATION': os.getenv('CACHE_LOCATION') or _shared_location,
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', '300')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '10000')),
+        },
+    },
+    # Статичные фрагменты шаблонов ({% cache None ... using="templates" %}) хранятся
+    # без срока в памяти процесса: новая версия шаблонов приходит с перезапуском воркеров
+    'templates': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'templates',
+    },
 }
 
 
@@ -125,6 +266,21 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATICFILES_DIRS = [BASE_DIR / 'static']
+
+# collectstatic: минификация CSS, хеш содержимого в имени файла и сжатые копии
+# (main.storage). Файлы с хешем отдаются WhiteNoise с Cache-Control на год.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': os.getenv('STATICFILES_STORAGE', 'main.storage.MinifiedStaticFilesStorage'),
+    },
+}
+# Файлы без хеша в имени (например, запрошенные по старому URL)
+WHITENOISE_MAX_AGE = int(os.getenv('WHITENOISE_MAX_AGE', '3600'))
 
 # Перенаправление после успешного входа (замените '/catalog/' на URL вашей главной страницы)
 LOGIN_REDIRECT_URL = 'home'
@@ -139,10 +295,180 @@ LOGOUT_REDIRECT_URL = '/'
 # Настройки REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'main.authentication.ExpiringTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
-    ]
-}
\ No newline at end of file
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'main.tracing.TracedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Запросов с одного IP (throttle_scope у view); счётчики — в общем уровне кеша
+    'DEFAULT_THROTTLE_RATES': {
+        'availability': os.getenv('AVAILABILITY_THROTTLE_RATE', '60/min'),
+    },
+}
+
+# Журнал изменений пользователей (/api/users/changes/): записи моложе N секунд
+# не отдаются, чтобы курсор не перескочил через ещё не зафиксированную транзакцию
+CHANGE_FEED_SETTLE_SECONDS = float(os.getenv('CHANGE_FEED_SETTLE_SECONDS', '1'))
+# Сколько секунд курсор ждёт запись с пропущенным id (транзакция ещё не зафиксирована);
+# дольше — пропуск считается откатом. Изменения из транзакций, фиксирующихся дольше, теряются
+CHANGE_FEED_GAP_SECONDS = float(os.getenv('CHANGE_FEED_GAP_SECONDS', '60'))
+
+# Поток событий об изменениях пользователей (SSE, только в режиме ASGI)
+USER_EVENTS = {
+    'PATH': os.getenv('USER_EVENTS_PATH', '/api/events/users/'),
+    'POLL_INTERVAL': float(os.getenv('USER_EVENTS_POLL_INTERVAL', '1')),
+    'HEARTBEAT': float(os.getenv('USER_EVENTS_HEARTBEAT', '15')),
+    'QUEUE_SIZE': int(os.getenv('USER_EVENTS_QUEUE_SIZE', '100')),
+    # Срок билета для EventSource (POST /api/events/ticket/), секунд
+    'TICKET_TTL': int(os.getenv('USER_EVENTS_TICKET_TTL', '60')),
+}
+
+# Сессии (SESSION_MODE):
+#   cache — общий уровень кеша, запись в БД фоновым потоком (main.sessions);
+#   signed_cookies — всё в подписанной cookie, без хранилища на сервере
+#     (подходит для небольших сессий; выход не отзывает уже выданную cookie);
+#   db — стандартный движок Django.
+SESSION_MODE = os.getenv('SESSION_MODE', 'cache')
+SESSION_ENGINE = {
+    'cache': 'main.sessions',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[SESSION_MODE]
+# Общий уровень, а не TieredCache: выход в одном воркере сразу виден остальным
+SESSION_CACHE_ALIAS = 'shared'
+SESSION_WRITE_BEHIND = {
+    'ENABLED': os.getenv('SESSION_WRITE_BEHIND', 'True') == 'True',
+    'FLUSH_INTERVAL': float(os.getenv('SESSION_WRITE_BEHIND_INTERVAL', '0.5')),
+}
+
+# Задачи обслуживания (purge_sessions, archive_inactive_users, cleartokens):
+# строк в пачке, пауза между пачками в секундах, срок неактивности пользователя в днях.
+# Массовые действия админки выполняются теми же задачами через TASK_QUEUE
+MAINTENANCE = {
+    'BATCH_SIZE': int(os.getenv('MAINTENANCE_BATCH_SIZE', '1000')),
+    'SLEEP': float(os.getenv('MAINTENANCE_SLEEP', '0.1')),
+    'INACTIVE_DAYS': int(os.getenv('MAINTENANCE_INACTIVE_DAYS', '365')),
+    # Срок хранения журнала изменений пользователей (prune_user_changes), дней
+    'CHANGE_FEED_DAYS': int(os.getenv('MAINTENANCE_CHANGE_FEED_DAYS', '30')),
+}
+
+# Админка: при оценке числа строк больше порога точный COUNT(*) не выполняется
+# (PostgreSQL, оценка планировщика); 0 — всегда точный подсчёт
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv('ADMIN_ESTIMATED_COUNT_THRESHOLD', '10000'))
+
+# Проверка занятости username/email (/api/availability/): доля ложных срабатываний
+# фильтра Блума, период догрузки новых пользователей из журнала изменений (секунд),
+# построение фильтра при старте воркера gunicorn
+AVAILABILITY = {
+    'ERROR_RATE': float(os.getenv('AVAILABILITY_ERROR_RATE', '0.01')),
+    'REFRESH_INTERVAL': float(os.getenv('AVAILABILITY_REFRESH_INTERVAL', '5')),
+    'PRELOAD': os.getenv('AVAILABILITY_PRELOAD', 'True') == 'True',
+}
+
+# Повторы запросов с Idempotency-Key (регистрация, смена пароля): сколько секунд
+# хранится первый ответ и сколько дубликат ждёт выполняющийся исходный запрос
+IDEMPOTENCY = {
+    'TTL': int(os.getenv('IDEMPOTENCY_TTL', str(24 * 3600))),
+    'LOCK_TIMEOUT': float(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', '30')),
+}
+
+# Фоновые задачи после запроса (main.task_queue): db — таблица и manage.py task_worker,
+# thread — пул потоков в процессе веб-сервера, sync — сразу после транзакции;
+# повторы: попыток и пауза перед первым повтором в секундах (далее вдвое больше)
+TASK_QUEUE = {
+    'MODE': os.getenv('TASK_QUEUE_MODE', 'thread'),
+    'THREADS': int(os.getenv('TASK_QUEUE_THREADS', '2')),
+    'BATCH_SIZE': int(os.getenv('TASK_QUEUE_BATCH_SIZE', '100')),
+    'POLL_INTERVAL': float(os.getenv('TASK_QUEUE_POLL_INTERVAL', '1')),
+    'MAX_ATTEMPTS': int(os.getenv('TASK_QUEUE_MAX_ATTEMPTS', '3')),
+    'RETRY_DELAY': float(os.getenv('TASK_QUEUE_RETRY_DELAY', '10')),
+}
+
+# Почта (приветственное письмо): по умолчанию письма выводятся в консоль
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'False') == 'True'
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+
+# Журнал аудита (логгер main.audit, уровень INFO): в stderr рядом с логами
+# gunicorn или в файл AUDIT_LOG_FILE с ротацией по размеру
+AUDIT_LOG_FILE = os.getenv('AUDIT_LOG_FILE', '')
+AUDIT_LOG_HANDLER = {
+    'class': 'logging.StreamHandler',
+    'formatter': 'audit',
+}
+if AUDIT_LOG_FILE:
+    AUDIT_LOG_HANDLER = {
+        'class': 'logging.handlers.RotatingFileHandler',
+        'filename': AUDIT_LOG_FILE,
+        'maxBytes': 10 * 1024 * 1024,
+        'backupCount': 5,
+        'formatter': 'audit',
+    }
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'audit': {'format': '%(asctime)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'audit': AUDIT_LOG_HANDLER,
+    },
+    'loggers': {
+        'main.audit': {'handlers': ['audit'], 'level': 'INFO'},
+    },
+}
+
+# Кеш HTML-страниц для анонимных посетителей, секунд (0 — выключен)
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', '60'))
+
+# Сколько секунд пара (пользователь, токен) живёт в кеше аутентификации
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', '60'))
+
+# Токены API (main.models.AuthToken): срок действия в секундах (0 — бессрочно),
+# продление при использовании и количество устройств на пользователя (0 — без ограничения)
+AUTH_TOKEN_TTL = int(os.getenv('AUTH_TOKEN_TTL', str(30 * 24 * 3600)))
+AUTH_TOKEN_SLIDING = os.getenv('AUTH_TOKEN_SLIDING', 'True') == 'True'
+AUTH_TOKEN_MAX_PER_USER = int(os.getenv('AUTH_TOKEN_MAX_PER_USER', '10'))
+
+# Проверки живости и готовности (пути, время кеширования проверки БД)
+HEALTH_CHECK = {
+    'LIVE_PATH': os.getenv('HEALTH_LIVE_PATH', '/healthz/live'),
+    'READY_PATH': os.getenv('HEALTH_READY_PATH', '/healthz/ready'),
+    'READY_CACHE_SECONDS': float(os.getenv('HEALTH_READY_CACHE_SECONDS', '5')),
+}
+
+# Трассировка запросов: заголовок Server-Timing и выборочная запись трасс в JSONL
+TRACING = {
+    'ENABLED': os.getenv('TRACING_ENABLED', 'False') == 'True',
+    'SERVER_TIMING': os.getenv('TRACING_SERVER_TIMING', 'True') == 'True',
+    'FILE': os.getenv('TRACING_FILE', ''),
+    'SAMPLE_RATE': float(os.getenv('TRACING_SAMPLE_RATE', '0.01')),
+}
+
+# Журнал медленных запросов: SQL, параметры и место вызова для запросов дольше порога
+SLOW_REQUEST_LOG = {
+    'ENABLED': os.getenv('SLOW_REQUEST_LOG_ENABLED', 'False') == 'True',
+    'THRESHOLD_MS': float(os.getenv('SLOW_REQUEST_THRESHOLD_MS', '500')),
+    'FILE': os.getenv('SLOW_REQUEST_LOG_FILE', str(BASE_DIR / 'slow_requests.jsonl')),
+    'MAX_BYTES': int(os.getenv('SLOW_REQUEST_LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+    'BACKUP_COUNT': int(os.getenv('SLOW_REQUEST_LOG_BACKUP_COUNT', '5')),
+}
+
+# Профилирование памяти воркеров (tracemalloc): отчёт в /api/admin/memory/ и дамп по сигналу
+MEMORY_PROFILER = {
+    'ENABLED': os.getenv('MEMORY_PROFILER_ENABLED', 'False') == 'True',
+    'SAMPLE_RATE': float(os.getenv('MEMORY_PROFILER_SAMPLE_RATE', '0.01')),
+    'FRAMES': int(os.getenv('MEMORY_PROFILER_FRAMES', '5')),
+    'TOP': int(os.getenv('MEMORY_PROFILER_TOP', '20')),
+    'DUMP_DIR': os.getenv('MEMORY_PROFILER_DUMP_DIR') or str(BASE_DIR),
+    'SIGNAL': os.getenv('MEMORY_PROFILER_SIGNAL', 'SIGUSR2'),
+}
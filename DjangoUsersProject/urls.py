@@ -14,14 +14,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
 from django.urls import path, include
+from main.lazy import admin_urls
 
 
 urlpatterns = [
     path('', include('main.urls')),
     path('api/', include('main.api_urls')),
-    path('admin/', admin.site.urls),
+    path('admin/', admin_urls()),
     path('accounts/', include('django.contrib.auth.urls')),
 
 ]
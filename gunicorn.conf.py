@@ -0,0 +1,104 @@
+# gunicorn.conf.py
+"""
+Конфигурация gunicorn для продакшена.
+
+    gunicorn -c gunicorn.conf.py
+
+GUNICORN_MODE=wsgi (по умолчанию) — потоковые воркеры gthread поверх WSGI;
+GUNICORN_MODE=asgi — воркеры uvicorn поверх ASGI (нужно для SSE и долгих соединений).
+Количество воркеров и потоков считается от доступных процессору ядер
+(с учётом cpuset и квоты cgroup в контейнере) и переопределяется переменными окружения.
+"""
+import gc
+import math
+import os
+
+
+def available_cpus():
+    """Количество ядер, доступных процессу, с учётом ограничений контейнера"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != 'max':
+            count = min(count, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+mode = os.getenv('GUNICORN_MODE', 'wsgi')
+cpus = available_cpus()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+backlog = int(os.getenv('GUNICORN_BACKLOG', '2048'))
+
+if mode == 'asgi':
+    wsgi_app = 'DjangoUsersProject.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    # Асинхронному воркеру достаточно одного процесса на ядро
+    workers = int(os.getenv('GUNICORN_WORKERS') or cpus)
+else:
+    wsgi_app = 'DjangoUsersProject.wsgi:application'
+    worker_class = 'gthread'
+    workers = int(os.getenv('GUNICORN_WORKERS') or min(2 * cpus + 1, 12))
+    # Потоки закрывают ожидание БД и хеширования паролей без лишних процессов
+    threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# Воркеры перезапускаются после max_requests запросов (со случайным разбросом,
+# чтобы не перезапускаться одновременно) — ограничивает рост памяти
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', str(max_requests // 10)))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Приложение загружается в мастере до fork: воркеры стартуют быстрее и делят память
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+# Heartbeat-файлы воркеров в памяти, а не на диске контейнера
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+if preload_app:
+    # Сборщик мусора в мастере выключен: проходы gc трогают заголовки объектов
+    # и ломают copy-on-write страниц, общих с воркерами
+    gc.disable()
+
+
+def pre_fork(server, worker):
+    # Всё, что загружено в мастере, переносится в постоянное поколение и
+    # больше не сканируется сборщиком мусора в воркерах
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        gc.enable()
+
+
+def post_worker_init(worker):
+    from django.db import connections
+
+    from main.availability import availability_index, get_availability_config
+    from main.memprofile import install_signal_handler
+
+    # gunicorn сбрасывает обработчики сигналов в воркере, ставим заново
+    install_signal_handler()
+
+    # Фильтры проверки занятости строятся до первого запроса; при ошибке — при первом обращении
+    if get_availability_config()['PRELOAD']:
+        try:
+            availability_index.load()
+        except Exception:
+            worker.log.exception('Не удалось построить индекс проверки занятости')
+        finally:
+            connections.close_all()
@@ -1,3 +1,136 @@
-from django.contrib import admin
+# main/admin.py
+"""
+Админка пользователей для больших таблиц.
 
-# Register your models here.
+- Количество строк: точный COUNT(*) заменяется оценкой планировщика PostgreSQL,
+  когда строк больше ADMIN_ESTIMATED_COUNT_THRESHOLD; «всего N» без фильтров
+  не считается (show_full_result_count = False).
+- Поиск только по индексам (main/migrations/0004_user_search_indexes):
+  начало username и точный email без учёта регистра.
+- Сортировка — по первичному ключу и индексированным колонкам.
+- Массовые действия выполняются пачками через очередь задач (main.tasks,
+  main.maintenance), а не одной транзакцией на время запроса.
+"""
+import json
+import uuid
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .maintenance import DeactivateUsersJob, ResetTokensJob
+from .models import MaintenanceCheckpoint, Task
+from .task_queue import get_task_queue_config, retry_failed
+from .tasks import enqueue_user_job
+
+
+def estimated_count(queryset):
+    """Оценка числа строк по плану запроса (только PostgreSQL, иначе None)"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.get_compiler(using=queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, которому на больших выборках хватает оценки количества строк"""
+
+    @cached_property
+    def count(self):
+        threshold = settings.ADMIN_ESTIMATED_COUNT_THRESHOLD
+        if threshold:
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate > threshold:
+                return estimate
+        return super().count
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class UserAdmin(DjangoUserAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'is_active',
+                    'date_joined', 'last_login')
+    list_filter = ('is_staff', 'is_active')
+    search_fields = ('^username', '=email')
+    search_help_text = 'Начало имени пользователя или email целиком'
+    ordering = ('-pk',)
+    sortable_by = ('username', 'date_joined', 'last_login')
+
+    actions = ['deactivate_users', 'reset_tokens']
+
+    def get_actions(self, request):
+        # Стандартное удаление загружает все выбранные объекты в одну страницу подтверждения
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(description='Деактивировать выбранных пользователей (в фоне, пачками)',
+                  permissions=['change'])
+    def deactivate_users(self, request, queryset):
+        # Себя деактивировать нельзя: администратор потерял бы доступ к админке
+        self.start_job(request, DeactivateUsersJob, queryset.exclude(pk=request.user.pk), 'Деактивация')
+
+    @admin.action(description='Сбросить токены API выбранных пользователей (в фоне, пачками)',
+                  permissions=['change'])
+    def reset_tokens(self, request, queryset):
+        self.start_job(request, ResetTokensJob, queryset, 'Сброс токенов')
+
+    def start_job(self, request, job_class, queryset, title):
+        name = f'{job_class.name}:{uuid.uuid4().hex[:12]}'
+        user_ids = queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=10000)
+        parts = enqueue_user_job(job_class.name, name, user_ids)
+        if get_task_queue_config()['MODE'] == 'sync':
+            self.message_user(request, f'{title}: выполнено', messages.SUCCESS)
+            return
+        self.message_user(
+            request,
+            f'{title}: поставлено в очередь задач ({parts}); ход выполнения — '
+            f'в разделах «Задачи» и «Позиции задач обслуживания» (задача {name})',
+            messages.INFO,
+        )
+
+
+@admin.register(MaintenanceCheckpoint)
+class MaintenanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('job', 'processed', 'last_pk', 'started_at', 'updated_at')
+    ordering = ('-updated_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at')
+    list_filter = ('status',)
+    ordering = ('-pk',)
+    show_full_result_count = False
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Повторить упавшие задачи', permissions=['delete'])
+    def retry(self, request, queryset):
+        self.message_user(request, f'Возвращено в очередь: {retry_failed(queryset)}', messages.SUCCESS)
@@ -7,6 +7,9 @@ urlpatterns = [
     path('register/', api_views.RegisterAPIView.as_view(), name='api_register'),
     path('login/', api_views.LoginAPIView.as_view(), name='api_login'),
     path('logout/', api_views.LogoutAPIView.as_view(), name='api_logout'),
+    path('logout-all/', api_views.LogoutAllAPIView.as_view(), name='api_logout_all'),
+    path('events/ticket/', api_views.EventTicketAPIView.as_view(), name='api_event_ticket'),
+    path('availability/', api_views.AvailabilityAPIView.as_view(), name='api_availability'),
 
     # Профиль
     path('profile/', api_views.UserProfileAPIView.as_view(), name='api_profile'),
@@ -14,7 +17,10 @@ urlpatterns = [
 
     # Админские функции
     path('admin/users/', api_views.UserListView.as_view(), name='api_users'),
+    path('admin/memory/', api_views.MemoryProfileAPIView.as_view(), name='api_admin_memory'),
+    path('admin/cache/', api_views.CacheStatsAPIView.as_view(), name='api_admin_cache'),
 
     path('users/', api_views.UserListAPIView.as_view(), name='api_users_list'),  # Список всех пользователей
+    path('users/changes/', api_views.UserChangesAPIView.as_view(), name='api_users_changes'),  # Изменения после курсора
     path('users/<int:user_id>/', api_views.UserDetailAPIView.as_view(), name='api_user_detail'),  # Детально по ID
 ]
\ No newline at end of file
@@ -1,12 +1,25 @@
 # main/api_views.py
+import secrets
+
 from django.contrib.auth import login, logout
 from django.contrib.auth.models import User
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from django.contrib.auth import authenticate
+from django.core.cache import cache
+from .cache import USER_FULL_LIST_TAG, USER_LIST_TAG, user_tag
+from .change_feed import read_changes
+from .events import get_events_config, issue_ticket
+from .db_routers import pin_token
+from .idempotency import idempotent
+from .availability import FIELDS as AVAILABILITY_FIELDS, availability_index
+from .models import AuthToken
+from .tasks import after_registration
+from .memprofile import get_memprofile_config, profiler
+from .throttling import SharedScopedRateThrottle
+from .tracing import span
 from .serializers import (
     UserSerializer,
     UserRegisterSerializer,
@@ -17,24 +30,86 @@ from .serializers import (
 )
 
 
+def device_name(request):
+    """
+    Название устройства для токена. Повторный вход с тем же полем device заменяет
+    токен этого устройства. Без поля device название уникально для каждого входа
+    (User-Agent и случайный суффикс): одинаковые браузеры или сборки приложения
+    на разных устройствах не выходят из аккаунта друг у друга.
+    """
+    device = request.data.get('device')
+    if device:
+        return str(device)[:100]
+    user_agent = request.META.get('HTTP_USER_AGENT', '')[:90]
+    return f'{user_agent} #{secrets.token_hex(4)}'.strip()
+
+
 class RegisterAPIView(generics.CreateAPIView):
     """API для регистрации новых пользователей"""
     serializer_class = UserRegisterSerializer
     permission_classes = [permissions.AllowAny]  # Доступно всем
+    # Токен не хранится в кеше повторов: повтор получает новый токен
+    idempotent_private_fields = ('token',)
 
+    # Повтор после таймаута с тем же Idempotency-Key получает исходный ответ
+    @idempotent
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
 
-        # Создаем токен для пользователя
-        token, created = Token.objects.get_or_create(user=user)
+        # Создаем токен для устройства, с которого прошла регистрация
+        with span('token'):
+            token = AuthToken.objects.issue(user, device_name(request))
+        # Новый токен ещё может не дойти до реплик
+        pin_token(token.key)
+        # Письмо, аудит и прогрев кеша — в фоне, ответ их не ждёт
+        after_registration(user, request, 'api')
 
-        return Response({
+        response = Response({
             'user': UserSerializer(user).data,
             'token': token.key,
             'message': 'Пользователь успешно зарегистрирован'
         }, status=status.HTTP_201_CREATED)
+        # Повтор заменит токен того же устройства, а не создаст ещё один
+        response.idempotent_context = {'device': token.device}
+        return response
+
+    def restore_idempotent_fields(self, request, data, context):
+        """Повтор регистрации по Idempotency-Key: токен устройства выдаётся заново"""
+        user = User.objects.get(pk=data['user']['id'])
+        token = AuthToken.objects.issue(user, context['device'])
+        pin_token(token.key)
+        data['token'] = token.key
+        return data
+
+
+class AvailabilityAPIView(APIView):
+    """
+    Проверка, свободны ли username и email, — для подсказок в форме регистрации.
+
+    GET /api/availability/?username=<имя>&email=<email>. Ответ берётся из фильтров
+    Блума в памяти (main.availability), БД читается только при возможном совпадении.
+    Аутентификация не выполняется: запрос должен быть дешёвым на каждое нажатие клавиши.
+    Частота ограничена по IP (REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]["availability"]):
+    без ограничения эндпоинт позволял бы перебором проверять, зарегистрирован ли email.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [SharedScopedRateThrottle]
+    throttle_scope = 'availability'
+
+    def get(self, request):
+        result = {}
+        for field in AVAILABILITY_FIELDS:
+            value = request.query_params.get(field, '').strip()
+            if value:
+                result[field] = {'value': value, 'available': not availability_index.is_taken(field, value)}
+        if not result:
+            return Response({
+                'error': 'Укажите username или email'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
 
 
 class LoginAPIView(APIView):
@@ -53,8 +128,14 @@ class LoginAPIView(APIView):
         user = authenticate(request, username=username, password=password)
 
         if user:
-            login(request, user)
-            token, created = Token.objects.get_or_create(user=user)
+            # Сессия есть только у браузерных запросов (см. main.browser_middleware)
+            if hasattr(request, 'session'):
+                with span('login'):
+                    login(request, user)
+            # Токен устройства: прежний токен того же device заменяется
+            with span('token'):
+                token = AuthToken.objects.issue(user, device_name(request))
+            pin_token(token.key)
             return Response({
                 'user': UserSerializer(user).data,
                 'token': token.key,
@@ -71,14 +152,42 @@ class LogoutAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]  # Только для авторизованных
 
     def post(self, request):
-        # Удаляем токен
-        request.user.auth_token.delete()
-        logout(request)
+        # Удаляем токен текущего устройства (при входе по сессии токена нет)
+        if isinstance(request.auth, AuthToken):
+            request.auth.delete()
+        if hasattr(request, 'session'):
+            logout(request)
         return Response({
             'message': 'Выход выполнен успешно'
         })
 
 
+class LogoutAllAPIView(APIView):
+    """API для выхода на всех устройствах: удаляет все токены пользователя"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        deleted, _ = AuthToken.objects.filter(user=request.user).delete()
+        if hasattr(request, 'session'):
+            logout(request)
+        return Response({
+            'message': 'Выход выполнен на всех устройствах',
+            'tokens_deleted': deleted,
+        })
+
+
+class EventTicketAPIView(APIView):
+    """
+    Билет для потока событий (main.events): EventSource не передаёт заголовок
+    Authorization, а токен в ?token= оказался бы в журналах доступа
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        ttl = get_events_config()['TICKET_TTL']
+        return Response({'ticket': issue_ticket(request.user), 'expires_in': ttl})
+
+
 class UserProfileAPIView(generics.RetrieveUpdateAPIView):
     """API для просмотра и редактирования профиля"""
     serializer_class = UserSerializer
@@ -97,6 +206,7 @@ class ChangePasswordAPIView(APIView):
     """API для смены пароля"""
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         serializer = ChangePasswordSerializer(data=request.data, context={'request': request})
 
@@ -132,6 +242,15 @@ class UserListAPIView(generics.ListAPIView):
         """Возвращает всех пользователей"""
         return User.objects.all().order_by('id')
 
+    def list(self, request, *args, **kwargs):
+        """Список из кеша; сбрасывается при изменении id/username любого пользователя"""
+        data = cache.get_or_set(
+            'user_list',
+            lambda: self.get_serializer(self.get_queryset(), many=True).data,
+            tags=[USER_LIST_TAG],
+        )
+        return Response(data)
+
 
 class UserDetailAPIView(generics.RetrieveAPIView):
     """
@@ -144,8 +263,122 @@ class UserDetailAPIView(generics.RetrieveAPIView):
     lookup_field = 'id'  # Ищем по полю id
     lookup_url_kwarg = 'user_id'  # В URL параметр будет user_id
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Данные пользователя из кеша; сбрасываются при его изменении.
+        Параллельные промахи по одному ID объединяются, и БД читает один запрос.
+        Отсутствующий пользователь не кешируется: Http404 из get_object() проходит
+        через get_or_set, и перебор ID не заполняет общий кеш (он же хранит сессии).
+        """
+        user_id = kwargs[self.lookup_url_kwarg]
+        data = cache.get_or_set(
+            f'user_detail:{user_id}',
+            self.load_user_data,
+            tags=[user_tag(user_id)],
+        )
+        return Response(data)
+
+    def load_user_data(self):
+        return self.get_serializer(self.get_object()).data
+
+
+class UserChangesAPIView(APIView):
+    """
+    API инкрементальной синхронизации списка пользователей.
+
+    GET /api/users/changes/?cursor=<id>&limit=<n> возвращает пользователей,
+    изменённых после курсора (по одному разу, в последнем состоянии), и новый
+    курсор. cursor=0 — полная синхронизация. Стоимость запроса зависит от числа
+    изменений, а не от размера таблицы пользователей.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 500
+    max_limit = 1000
+
+    def get(self, request):
+        try:
+            cursor = int(request.query_params.get('cursor', 0))
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            return Response({
+                'error': 'cursor и limit должны быть целыми числами'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if cursor < 0 or limit < 1:
+            return Response({
+                'error': 'cursor не может быть отрицательным, limit должен быть больше нуля'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        cursor, has_more, results = read_changes(cursor, limit)
+        return Response({
+            'cursor': cursor,
+            'has_more': has_more,
+            'changes': results,
+        })
+
+
 class UserListView(generics.ListAPIView):
     """API для получения списка пользователей (только для админов)"""
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    permission_classes = [permissions.IsAdminUser]  # Только для админов
\ No newline at end of file
+    permission_classes = [permissions.IsAdminUser]  # Только для админов
+
+    def list(self, request, *args, **kwargs):
+        data = cache.get_or_set(
+            'admin_user_list',
+            lambda: self.get_serializer(self.get_queryset(), many=True).data,
+            tags=[USER_FULL_LIST_TAG],
+        )
+        return Response(data)
+
+
+class MemoryProfileAPIView(APIView):
+    """
+    API для просмотра отчёта профилировщика памяти текущего воркера (только для админов).
+    POST сбрасывает накопленную статистику и снимки.
+
+    Прирост и пик по view — память всего процесса: для запросов из
+    overlapped_requests они включают аллокации параллельных запросов.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        config = get_memprofile_config()
+        if not config['ENABLED']:
+            return Response({
+                'error': 'Профилирование памяти отключено'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            top = min(int(request.query_params.get('top', config['TOP'])), 100)
+        except ValueError:
+            return Response({
+                'error': 'top должен быть целым числом'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if top < 1:
+            return Response({
+                'error': 'top должен быть больше нуля'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(profiler.report(top))
+
+    def post(self, request):
+        profiler.reset()
+        return Response({
+            'message': 'Статистика профилировщика сброшена'
+        })
+
+
+class CacheStatsAPIView(APIView):
+    """
+    API для просмотра статистики кеша текущего воркера (только для админов).
+    POST обнуляет счётчики.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(cache.stats())
+
+    def post(self, request):
+        cache.reset_stats()
+        return Response({
+            'message': 'Статистика кеша сброшена'
+        })
@@ -3,3 +3,17 @@ from django.apps import AppConfig
 
 class MainConfig(AppConfig):
     name = 'main'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import checks, signals  # noqa: F401
+        from .memprofile import install_signal_handler
+        from .template_warmup import precompile_templates
+
+        # Дамп отчёта профилировщика памяти по сигналу (если профилирование включено)
+        install_signal_handler()
+
+        # Шаблоны компилируются до первого запроса (только вместе с cached.Loader)
+        if settings.TEMPLATE_PRECOMPILE:
+            precompile_templates()
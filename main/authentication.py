@@ -0,0 +1,60 @@
+# main/authentication.py
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .cache import token_tag, user_tag
+from .models import AuthToken
+
+
+def _cache_key(key):
+    return 'auth_token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с кешем: пара (пользователь, токен) не читается из БД
+    на каждый запрос. Запись сбрасывается при удалении токена и изменении
+    пользователя (main.signals) и живёт не дольше AUTH_TOKEN_CACHE_TIMEOUT.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = cache.get(_cache_key(key))
+        if cached is not None:
+            return cached
+
+        user, token = super().authenticate_credentials(key)
+        self.cache_credentials(key, user, token)
+        return user, token
+
+    @staticmethod
+    def cache_credentials(key, user, token):
+        cache.set(_cache_key(key), (user, token), settings.AUTH_TOKEN_CACHE_TIMEOUT,
+                  tags=[token_tag(key), user_tag(user.pk)])
+
+
+class ExpiringTokenAuthentication(CachedTokenAuthentication):
+    """
+    Аутентификация по main.models.AuthToken: истёкшие токены отклоняются,
+    активные продлеваются (не чаще раза в половину срока действия).
+    """
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        user, token = super().authenticate_credentials(key)
+        now = timezone.now()
+        if token.is_expired(now):
+            # Копия в кеше могла устареть: токен продлили в другом воркере
+            token = AuthToken.objects.filter(key=key).first()
+            if token is None or token.is_expired(now):
+                cache.delete(_cache_key(key))
+                raise AuthenticationFailed('Срок действия токена истёк.')
+            self.cache_credentials(key, user, token)
+        if token.needs_renewal(now):
+            token.renew(now)
+            self.cache_credentials(key, user, token)
+        return user, token
@@ -0,0 +1,163 @@
+# main/availability.py
+"""
+Проверка занятости имени пользователя и email без обращения к БД.
+
+Каждый воркер держит в памяти фильтры Блума по всем username и email.
+Отрицательный ответ фильтра точен — значение свободно, БД не нужна.
+Положительный может быть ложным (ERROR_RATE), его подтверждает запрос к БД.
+
+Фильтр строится при первом обращении (или при старте воркера, PRELOAD),
+регистрации в этом процессе добавляются сразу (main.signals), в других
+воркерах — из журнала изменений (main.change_feed) не чаще раза в
+REFRESH_INTERVAL секунд. Поэтому имя, занятое в другом воркере секунду назад,
+может ненадолго показаться свободным: проверка — подсказка для формы,
+уникальность по-прежнему проверяется при регистрации.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from .change_feed import latest_cursor, read_changes
+
+FIELDS = ('username', 'email')
+
+
+def get_availability_config():
+    """Настройки проверки занятости с значениями по умолчанию"""
+    config = {
+        'ERROR_RATE': 0.01,
+        'MIN_CAPACITY': 10000,
+        'REFRESH_INTERVAL': 5.0,
+        'PRELOAD': True,
+    }
+    config.update(getattr(settings, 'AVAILABILITY', {}))
+    return config
+
+
+class BloomFilter:
+    """Фильтр Блума на bytearray; k хешей получаются из одного blake2b (двойное хеширование)"""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+def normalize(field, value):
+    """Ключ фильтра: без учёта регистра, чтобы не пропустить ни одного совпадения в БД"""
+    value = value.strip()
+    if field == 'username':
+        value = User.normalize_username(value)
+    return value.lower()
+
+
+class AvailabilityIndex:
+    """Фильтры Блума по username и email для одного процесса"""
+
+    def __init__(self):
+        self.config = get_availability_config()
+        self.filters = None
+        self.cursor = 0
+        self.synced_at = 0.0
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'checks': 0, 'db_checks': 0, 'false_positives': 0}
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def load(self):
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        """Полное построение фильтров по таблице пользователей"""
+        cursor = latest_cursor()
+        rows = User.objects.values_list(*FIELDS)
+        capacity = max(self.config['MIN_CAPACITY'], 2 * rows.count())
+        filters = {field: BloomFilter(capacity, self.config['ERROR_RATE']) for field in FIELDS}
+        for username, email in rows.iterator(chunk_size=5000):
+            filters['username'].add(normalize('username', username))
+            if email:
+                filters['email'].add(normalize('email', email))
+        self.filters = filters
+        self.cursor = cursor
+        self.synced_at = time.monotonic()
+
+    def add(self, username, email):
+        """Значения нового или изменённого пользователя"""
+        filters = self.filters
+        if filters is None:
+            return
+        filters['username'].add(normalize('username', username))
+        if email:
+            filters['email'].add(normalize('email', email))
+        if filters['username'].count > filters['username'].capacity:
+            # Переполненный фильтр даёт слишком много ложных срабатываний — строим заново
+            self.filters = None
+
+    def _sync(self):
+        """Значения, добавленные другими воркерами, — из журнала изменений"""
+        cursor, has_more = self.cursor, True
+        while has_more:
+            cursor, has_more, changes = read_changes(cursor, 1000)
+            for change in changes:
+                if change['user'] is not None:
+                    self.add(change['user']['username'], change['user']['email'])
+        self.cursor = cursor
+        self.synced_at = time.monotonic()
+
+    def _sync_due(self):
+        return time.monotonic() - self.synced_at >= self.config['REFRESH_INTERVAL']
+
+    def ensure_loaded(self):
+        """Фильтры, построенные и догнавшие журнал изменений"""
+        filters = self.filters
+        if filters is not None and not self._sync_due():
+            return filters
+        with self._lock:
+            if self.filters is not None and self._sync_due():
+                self._sync()
+            if self.filters is None:
+                self._load()
+            return self.filters
+
+    def is_taken(self, field, value):
+        """Занято ли значение; БД читается только при положительном ответе фильтра"""
+        filters = self.ensure_loaded()
+        self._count('checks')
+        if normalize(field, value) not in filters[field]:
+            return False
+        self._count('db_checks')
+        if field == 'username':
+            taken = User.objects.filter(username=User.normalize_username(value.strip())).exists()
+        else:
+            taken = User.objects.filter(email__iexact=value.strip()).exists()
+        if not taken:
+            self._count('false_positives')
+        return taken
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,24 @@
+# main/backends.py
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+from .tracing import span
+
+
+class TracedModelBackend(ModelBackend):
+    """Стандартный ModelBackend с замером аутентификации"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        with span('auth'):
+            return super().authenticate(request, username=username, password=password, **kwargs)
+
+
+class TracedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-хешер с замером хеширования.
+    Алгоритм тот же (pbkdf2_sha256), поэтому существующие хеши остаются валидными.
+    """
+
+    def encode(self, password, salt, iterations=None):
+        with span('hash'):
+            return super().encode(password, salt, iterations)
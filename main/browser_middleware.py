@@ -0,0 +1,48 @@
+# main/browser_middleware.py
+"""
+Облегчённая обработка запросов к API с токеном.
+
+Запросы к API с заголовком `Authorization: Token ...` не используют сессию,
+CSRF-защиту (API с токеном от неё освобождён), сообщения и X-Frame-Options.
+TokenAPIMiddleware стоит последним в MIDDLEWARE: к этому моменту сессия и
+хранилище сообщений — ещё не загруженные ленивые объекты, и для запроса
+с токеном они просто убираются, поэтому сессия не читается из хранилища и
+cookie не трогаются. Стандартные middleware остаются в цепочке под своими
+именами — `check --deploy` их находит, а браузерные запросы (HTML-страницы,
+админка, браузерный API с сессией) обрабатываются как раньше.
+"""
+from django.conf import settings
+
+from .authentication import ExpiringTokenAuthentication
+
+
+def is_token_api_request(request):
+    """Запрос к API с токеном в заголовке Authorization"""
+    if not request.path_info.startswith(settings.API_PATH_PREFIX):
+        return False
+    keyword = request.META.get('HTTP_AUTHORIZATION', '').split(' ', 1)[0]
+    return keyword.lower() == ExpiringTokenAuthentication.keyword.lower()
+
+
+class TokenAPIMiddleware:
+    """
+    Для запросов к API с токеном: без сессии и сообщений, без проверки CSRF
+    в process_view и без заголовка X-Frame-Options. request.user для них
+    выставляет аутентификация DRF.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_token_api_request(request):
+            return self.get_response(request)
+        # SessionMiddleware и MessageMiddleware пропускают запрос без этих атрибутов
+        request.__dict__.pop('session', None)
+        request.__dict__.pop('_messages', None)
+        # Тот же флаг, которым Django отключает проверку CSRF в тестовом клиенте
+        request._dont_enforce_csrf_checks = True
+        response = self.get_response(request)
+        # Внутренний middleware видит ответ раньше XFrameOptionsMiddleware
+        response.xframe_options_exempt = True
+        return response
@@ -0,0 +1,369 @@
+# main/cache.py
+"""
+Двухуровневый кеш: L1 в памяти процесса и общий для воркеров L2.
+
+L1 — ограниченный LRU-словарь с коротким TTL, чтение без ввода-вывода.
+L2 — любой кеш Django из settings.CACHES (файловый, БД, Redis), в нём
+живут значения и версии тегов. Бэкенд подключается как обычный кеш
+Django, поэтому django.core.cache.cache работает через оба уровня.
+
+Дополнительно к API Django:
+- set(..., tags=[...]) и invalidate_tags(*tags) — инвалидация по тегам;
+  если значение читается из БД до записи, версии снимаются заранее:
+  versions = tag_snapshot(tags), затем set(..., tag_versions=versions);
+- get_or_set(...) с защитой от «набега»: внутри процесса одинаковые
+  промахи объединяются (main.singleflight), между воркерами значение
+  пересчитывает один владелец блокировки в L2, остальные ждут его или
+  отдают старое значение; перед истечением срока пересчёт начинается
+  заранее (XFetch). Блокировка — add() в L2: атомарен в Redis и БД, у
+  файлового кеша нет, и пересчитать значение могут несколько воркеров
+  (perfcheck выдаёт perf.W005);
+- stats() — доли попаданий по уровням.
+
+L1, локальные копии версий тегов, счётчики и объединение промахов общие для
+всех потоков процесса: Django создаёт отдельный экземпляр бэкенда на каждый
+поток (и асинхронный контекст), поэтому состояние хранится на уровне модуля
+по имени LOCATION, как у LocMemCache (без LOCATION — по SHARED_ALIAS).
+
+Согласованность между воркерами: удалённое или перезаписанное в другом
+процессе значение может жить в L1 до L1_TTL секунд; значения с тегами
+устаревают не дольше TAG_TTL секунд после invalidate_tags().
+"""
+import math
+import pickle
+import random
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .singleflight import SingleFlight
+
+# Значение в L2: сам объект, абсолютный срок жизни, время вычисления и версии тегов
+CacheEntry = namedtuple('CacheEntry', 'value expires_at delta tags')
+
+TAG_KEY_PREFIX = 'tiered-tag:'
+LOCK_KEY_SUFFIX = ':lock'
+
+# Состояние процесса по имени кеша: L1, версии тегов, блокировка, single-flight, счётчики
+_l1_caches = {}
+_tag_versions = {}
+_locks = {}
+_flights = {}
+_stats = {}
+_state_lock = threading.Lock()
+
+
+def _new_stats():
+    return {
+        'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'stale': 0,
+        'sets': 0, 'recomputes': 0, 'coalesced': 0,
+    }
+
+
+class TieredCache(BaseCache):
+    """Кеш-бэкенд Django: L1 в процессе поверх общего L2"""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED_ALIAS', 'shared')
+        self.l1_max_entries = int(options.get('L1_MAX_ENTRIES', 10000))
+        self.l1_ttl = float(options.get('L1_TTL', 5))
+        self.tag_ttl = float(options.get('TAG_TTL', 1))
+        self.lock_timeout = float(options.get('LOCK_TIMEOUT', 10))
+        self.lock_poll = float(options.get('LOCK_POLL', 0.05))
+        self.early_refresh_beta = float(options.get('EARLY_REFRESH_BETA', 1.0))
+
+        name = location or self.shared_alias
+        with _state_lock:
+            self._l1 = _l1_caches.setdefault(name, OrderedDict())
+            self._tag_versions = _tag_versions.setdefault(name, {})
+            self._lock = _locks.setdefault(name, threading.Lock())
+            self._flight = _flights.setdefault(name, SingleFlight())
+            self._stats = _stats.setdefault(name, _new_stats())
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    # --- L1 ---
+
+    def _l1_get(self, key):
+        with self._lock:
+            item = self._l1.get(key)
+            if item is None:
+                return None
+            data, l1_expires_at = item
+            if l1_expires_at <= time.monotonic():
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+        return pickle.loads(data)
+
+    def _l1_set(self, key, entry):
+        ttl = self.l1_ttl
+        if entry.expires_at is not None:
+            ttl = min(ttl, entry.expires_at - time.time())
+        if ttl <= 0:
+            return
+        # В L1 хранится копия: объект из кеша можно менять, не портя кеш
+        data = pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[key] = (data, time.monotonic() + ttl)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    # --- Теги ---
+
+    def _current_tag_versions(self, tags):
+        """Версии тегов: из локальной копии (не старше TAG_TTL) или из L2"""
+        now = time.monotonic()
+        versions, missing = {}, []
+        with self._lock:
+            for tag in tags:
+                cached = self._tag_versions.get(tag)
+                if cached is not None and cached[1] > now:
+                    versions[tag] = cached[0]
+                else:
+                    missing.append(tag)
+        if missing:
+            keys = {TAG_KEY_PREFIX + tag: tag for tag in missing}
+            found = self.shared.get_many(list(keys))
+            for key, tag in keys.items():
+                version = found.get(key)
+                if version is None:
+                    # После вытеснения из L2 тег получает новую уникальную версию,
+                    # поэтому записи со старыми версиями не оживают
+                    version = time.time_ns()
+                    if not self.shared.add(key, version, None):
+                        version = self.shared.get(key, version)
+                versions[tag] = version
+            with self._lock:
+                for tag in missing:
+                    self._tag_versions[tag] = (versions[tag], now + self.tag_ttl)
+        return versions
+
+    def invalidate_tags(self, *tags):
+        """Делает недействительными все значения, записанные с любым из тегов"""
+        if not tags:
+            return
+        version = time.time_ns()
+        self.shared.set_many({TAG_KEY_PREFIX + tag: version for tag in tags}, None)
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] = (version, time.monotonic() + self.tag_ttl)
+
+    def _is_valid(self, entry):
+        if entry.expires_at is not None and entry.expires_at <= time.time():
+            return False
+        if entry.tags:
+            current = self._current_tag_versions(entry.tags)
+            if any(current[tag] != version for tag, version in entry.tags.items()):
+                return False
+        return True
+
+    # --- Записи ---
+
+    def _get_entry(self, key):
+        entry = self._l1_get(key)
+        if entry is not None:
+            if self._is_valid(entry):
+                self._count('l1_hits')
+                return entry
+            self._l1_delete(key)
+
+        entry = self.shared.get(key)
+        if isinstance(entry, CacheEntry):
+            if self._is_valid(entry):
+                self._l1_set(key, entry)
+                self._count('l2_hits')
+                return entry
+            self._count('stale')
+        elif entry is not None:
+            # Значение записано в L2 напрямую (например, incr на общем кеше)
+            self._count('l2_hits')
+            return CacheEntry(entry, None, 0, None)
+        self._count('misses')
+        return None
+
+    def tag_snapshot(self, tags):
+        """Версии тегов для новой записи; снимаются до вычисления значения"""
+        return self._current_tag_versions(tags) if tags else None
+
+    def _make_entry(self, value, timeout, tag_versions, delta=0.0):
+        return CacheEntry(value, self.get_backend_timeout(timeout), delta, tag_versions)
+
+    def _store(self, key, entry):
+        self._count('sets')
+        timeout = None if entry.expires_at is None else entry.expires_at - time.time()
+        if timeout is not None and timeout <= 0:
+            self.delete_entry(key)
+            return
+        self.shared.set(key, entry, timeout)
+        self._l1_set(key, entry)
+
+    def delete_entry(self, key):
+        self._l1_delete(key)
+        return self.shared.delete(key)
+
+    # --- API кеша Django ---
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        entry = self._get_entry(key)
+        return default if entry is None else entry.value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, tags=None, tag_versions=None):
+        """
+        tag_versions — снимок tag_snapshot(), сделанный до чтения данных: изменение
+        между чтением и записью сделает запись устаревшей. Без него снимок
+        берётся сейчас, по tags.
+        """
+        key = self.make_and_validate_key(key, version=version)
+        if tag_versions is None:
+            tag_versions = self.tag_snapshot(tags)
+        self._store(key, self._make_entry(value, timeout, tag_versions))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, tags=None):
+        key = self.make_and_validate_key(key, version=version)
+        if self._get_entry(key) is not None:
+            return False
+        entry = self._make_entry(value, timeout, self.tag_snapshot(tags))
+        timeout = None if entry.expires_at is None else entry.expires_at - time.time()
+        added = self.shared.add(key, entry, timeout)
+        if added:
+            self._count('sets')
+            self._l1_set(key, entry)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        entry = self._get_entry(key)
+        if entry is None:
+            return False
+        self._store(key, entry._replace(expires_at=self.get_backend_timeout(timeout)))
+        return True
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.delete_entry(key)
+
+    def get_many(self, keys, version=None):
+        result = {}
+        for key in keys:
+            value = self.get(key, self._missing_key, version=version)
+            if value is not self._missing_key:
+                result[key] = value
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+            self._tag_versions.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None, tags=None):
+        """
+        Значение из кеша или результат default() с защитой от «набега»:
+        пересчитывает только владелец блокировки в L2, остальные отдают
+        старое значение или ждут новое не дольше LOCK_TIMEOUT.
+        """
+        full_key = self.make_and_validate_key(key, version=version)
+        entry = self._get_entry(full_key)
+        if entry is not None:
+            if not self._should_refresh_early(entry):
+                return entry.value
+            return self._fill(full_key, entry, default, timeout, tags)
+
+        # Параллельные промахи в этом процессе ждут один вызов _fill
+        value, shared = self._flight.do(
+            full_key, lambda: self._fill(full_key, None, default, timeout, tags),
+        )
+        if shared:
+            self._count('coalesced')
+            # Каждый поток получает свою копию, как при чтении из L1
+            value = pickle.loads(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        return value
+
+    def _fill(self, full_key, entry, default, timeout, tags):
+        """Пересчёт под блокировкой в L2 или ожидание чужого пересчёта"""
+        lock_key = full_key + LOCK_KEY_SUFFIX
+        if self.shared.add(lock_key, 1, self.lock_timeout):
+            try:
+                return self._recompute(full_key, default, timeout, tags)
+            finally:
+                self.shared.delete(lock_key)
+
+        if entry is not None:
+            # Пересчёт уже идёт в другом воркере — отдаём текущее значение
+            return entry.value
+
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.lock_poll)
+            entry = self._get_entry(full_key)
+            if entry is not None:
+                return entry.value
+            if self.shared.get(lock_key) is None:
+                break
+        return self._recompute(full_key, default, timeout, tags)
+
+    def _should_refresh_early(self, entry):
+        """Вероятностный ранний пересчёт (XFetch): чем ближе срок, тем вероятнее"""
+        if entry.expires_at is None or not entry.delta:
+            return False
+        jitter = -entry.delta * self.early_refresh_beta * math.log(1.0 - random.random())
+        return time.time() + jitter >= entry.expires_at
+
+    def _recompute(self, full_key, default, timeout, tags):
+        self._count('recomputes')
+        # Если теги инвалидируют во время вычисления, запись сразу окажется устаревшей
+        tag_versions = self.tag_snapshot(tags)
+        start = time.monotonic()
+        value = default() if callable(default) else default
+        self._store(full_key, self._make_entry(value, timeout, tag_versions, delta=time.monotonic() - start))
+        return value
+
+    def stats(self):
+        """Счётчики попаданий процесса (всех потоков) и доли попаданий по уровням"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['l1_entries'] = len(self._l1)
+        lookups = stats['l1_hits'] + stats['l2_hits'] + stats['misses'] + stats['stale']
+        stats['l1_hit_ratio'] = stats['l1_hits'] / lookups if lookups else 0.0
+        stats['hit_ratio'] = (stats['l1_hits'] + stats['l2_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+# Теги кеша проекта
+
+USER_LIST_TAG = 'user_list'
+USER_FULL_LIST_TAG = 'user_full_list'
+
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+
+def token_tag(key):
+    return f'token:{key}'
@@ -0,0 +1,70 @@
+# main/change_feed.py
+"""
+Чтение журнала изменений пользователей (main.models.UserChange).
+
+Общая часть для API инкрементальной синхронизации (/api/users/changes/) и
+потока событий (main.events): изменения после курсора, свёрнутые до
+последнего состояния каждого пользователя.
+
+id журнала выдаются при вставке, а видны после фиксации транзакции, поэтому
+запись с меньшим id может появиться позже записи с большим. Курсор не
+переходит через такую «дыру»: страница обрывается перед записью, за которой
+не хватает id, пока этой записи меньше CHANGE_FEED_GAP_SECONDS секунд. Дыра
+старше считается откатом транзакции и пропускается — то есть изменение из
+транзакции, которая фиксируется дольше CHANGE_FEED_GAP_SECONDS после вставки
+в журнал, клиенты не получат. Записи моложе CHANGE_FEED_SETTLE_SECONDS не
+отдаются совсем.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .models import UserChange
+from .serializers import UserDetailSerializer
+
+
+def read_changes(cursor, limit):
+    """
+    Изменения после курсора: (новый курсор, есть ли ещё, список изменений).
+    Каждое изменение — {'id', 'action', 'user'}; user=None у удалённых.
+    """
+    now = timezone.now()
+    settled_before = now - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+    gap_expired_before = now - timedelta(seconds=settings.CHANGE_FEED_GAP_SECONDS)
+    rows = UserChange.objects.filter(id__gt=cursor).order_by('id')
+    rows = list(rows.values_list('id', 'user_id', 'action', 'created_at')[:limit + 1])
+
+    changes, previous, held = [], cursor, False
+    for change_id, user_id, action, created_at in rows[:limit]:
+        # Свежие записи и записи за недавней дырой в id придерживаются: транзакция
+        # с меньшим id может ещё не быть видна. Перед первой записью с cursor=0
+        # дыра — это начало журнала
+        in_gap = previous and change_id != previous + 1 and created_at > gap_expired_before
+        if created_at > settled_before or in_gap:
+            held = True
+            break
+        changes.append((change_id, user_id, action))
+        previous = change_id
+    has_more = not held and len(rows) > limit
+
+    # Последнее действие по каждому пользователю в пределах страницы
+    latest = {user_id: action for _, user_id, action in changes}
+    users = User.objects.in_bulk(list(latest))
+    results = []
+    for user_id, action in latest.items():
+        user = users.get(user_id)
+        if user is None:
+            action = UserChange.DELETED
+        results.append({
+            'id': user_id,
+            'action': action,
+            'user': UserDetailSerializer(user).data if user is not None else None,
+        })
+    return (changes[-1][0] if changes else cursor), has_more, results
+
+
+def latest_cursor():
+    """Курсор на конец журнала"""
+    return UserChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
@@ -0,0 +1,225 @@
+# main/checks.py
+"""
+Проверки настроек, схемы БД и URL на известные проблемы производительности.
+
+Проверки зарегистрированы в системе checks Django с тегом 'performance' как
+проверки развёртывания: они выполняются в `manage.py check --deploy`
+(проверки схемы — ещё и с `--database default`) и в `manage.py perfcheck`,
+где выводятся с уровнями и в формате JSON. Отдельную проверку можно
+отключить через SILENCED_SYSTEM_CHECKS.
+"""
+from django.conf import settings
+from django.core.checks import Error, Info, Tags, Warning, register
+from django.db import connections
+from django.urls import URLPattern, URLResolver, get_resolver
+
+PERFORMANCE = 'performance'
+
+# Индексы из main/migrations/0004_user_search_indexes, включая выражения (UPPER(email))
+USER_EMAIL_INDEXES = {'main_user_email_upper_idx', 'main_user_email_nocase_idx', 'main_user_email_idx'}
+
+NON_SHARED_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+# add() проверяет наличие файла и пишет его без блокировки между процессами
+NON_ATOMIC_ADD_CACHE_BACKENDS = {
+    'django.core.cache.backends.filebased.FileBasedCache',
+}
+
+
+def _settings_obj(name):
+    return f'settings.{name}'
+
+
+@register(PERFORMANCE, deploy=True)
+def check_debug(app_configs, **kwargs):
+    if settings.DEBUG:
+        return [Error(
+            'DEBUG=True: каждый SQL-запрос сохраняется в памяти, ошибки отдаются '
+            'медленными страницами отладки.',
+            hint='Задайте DEBUG=False в окружении продакшена.',
+            obj=_settings_obj('DEBUG'), id='perf.E001',
+        )]
+    return []
+
+
+@register(PERFORMANCE, deploy=True)
+def check_caches(app_configs, **kwargs):
+    caches = settings.CACHES
+    default = caches.get('default', {})
+    backend = default.get('BACKEND', '')
+    if backend == 'django.core.cache.backends.dummy.DummyCache':
+        return [Error(
+            'Кеш по умолчанию — DummyCache: кеш API, токенов и страниц не работает.',
+            hint='Настройте CACHES (CACHE_BACKEND=file|db|redis).',
+            obj=_settings_obj('CACHES'), id='perf.E002',
+        )]
+    if backend == 'main.cache.TieredCache':
+        alias = default.get('OPTIONS', {}).get('SHARED_ALIAS', 'shared')
+        backend = caches.get(alias, {}).get('BACKEND', '')
+    if backend in NON_SHARED_CACHE_BACKENDS:
+        return [Warning(
+            f'Общий кеш ({backend.rsplit(".", 1)[-1]}) живёт в памяти процесса: у каждого '
+            f'воркера своя копия, инвалидация по тегам не доходит до других воркеров.',
+            hint='Используйте CACHE_BACKEND=redis или db.',
+            obj=_settings_obj('CACHES'), id='perf.W002',
+        )]
+    if backend in NON_ATOMIC_ADD_CACHE_BACKENDS:
+        return [Warning(
+            f'Общий кеш ({backend.rsplit(".", 1)[-1]}) выполняет add() не атомарно: блокировки '
+            f'пересчёта get_or_set и Idempotency-Key между воркерами не гарантированы, '
+            f'один и тот же запрос может выполниться в двух воркерах.',
+            hint='Используйте CACHE_BACKEND=redis или db.',
+            obj=_settings_obj('CACHES'), id='perf.W005',
+        )]
+    return []
+
+
+@register(PERFORMANCE, deploy=True)
+def check_persistent_connections(app_configs, **kwargs):
+    messages = []
+    for alias, database in settings.DATABASES.items():
+        # С пулом соединений (OPTIONS["pool"], PostgreSQL) Django требует CONN_MAX_AGE=0
+        if database.get('OPTIONS', {}).get('pool'):
+            continue
+        if not database.get('CONN_MAX_AGE'):
+            messages.append(Warning(
+                f'База "{alias}": CONN_MAX_AGE=0, соединение открывается заново на каждый запрос.',
+                hint='Задайте DB_CONN_MAX_AGE (например, 60) или используйте пул соединений.',
+                obj=_settings_obj('DATABASES'), id='perf.W003',
+            ))
+    return messages
+
+
+@register(PERFORMANCE, deploy=True)
+def check_template_loaders(app_configs, **kwargs):
+    messages = []
+    for engine in settings.TEMPLATES:
+        if engine['BACKEND'] != 'django.template.backends.django.DjangoTemplates':
+            continue
+        loaders = engine.get('OPTIONS', {}).get('loaders')
+        # Без явного списка загрузчиков Django сам оборачивает их в cached.Loader
+        if loaders is None:
+            continue
+        names = [loader[0] if isinstance(loader, (list, tuple)) else loader for loader in loaders]
+        if 'django.template.loaders.cached.Loader' not in names:
+            messages.append(Warning(
+                'Шаблоны загружаются без cached.Loader: каждый рендер заново читает '
+                'и компилирует файлы шаблонов.',
+                hint='Задайте TEMPLATE_CACHE=True.',
+                obj=_settings_obj('TEMPLATES'), id='perf.W004',
+            ))
+    return messages
+
+
+@register(PERFORMANCE, deploy=True)
+def check_session_engine(app_configs, **kwargs):
+    if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.db':
+        return [Info(
+            'Сессии хранятся только в БД: запрос с сессией читает django_session, '
+            'изменение сессии пишет в неё.',
+            hint='SESSION_MODE=cache — сессии в общем кеше с фоновой записью в БД.',
+            obj=_settings_obj('SESSION_ENGINE'), id='perf.I005',
+        )]
+    return []
+
+
+@register(PERFORMANCE, deploy=True)
+def check_profiling(app_configs, **kwargs):
+    messages = []
+    if settings.MEMORY_PROFILER.get('ENABLED'):
+        messages.append(Warning(
+            'Профилировщик памяти включён: tracemalloc замедляет каждый запрос.',
+            hint='Включайте MEMORY_PROFILER_ENABLED только на время расследования.',
+            obj=_settings_obj('MEMORY_PROFILER'), id='perf.W006',
+        ))
+    tracing = settings.TRACING
+    if tracing.get('ENABLED') and tracing.get('FILE') and tracing.get('SAMPLE_RATE', 0) >= 1:
+        messages.append(Warning(
+            'Трассировка пишет в файл каждый запрос (TRACING_SAMPLE_RATE=1).',
+            hint='Уменьшите TRACING_SAMPLE_RATE (например, до 0.01).',
+            obj=_settings_obj('TRACING'), id='perf.W007',
+        ))
+    return messages
+
+
+@register(PERFORMANCE, deploy=True)
+def check_task_queue(app_configs, **kwargs):
+    if getattr(settings, 'TASK_QUEUE', {}).get('MODE') == 'sync':
+        return [Warning(
+            'Фоновые задачи выполняются синхронно: регистрация ждёт отправки письма '
+            'и остальной работы после запроса.',
+            hint='TASK_QUEUE_MODE=thread (один узел) или db с manage.py task_worker.',
+            obj=_settings_obj('TASK_QUEUE'), id='perf.W008',
+        )]
+    return []
+
+
+@register(PERFORMANCE, Tags.database, deploy=True)
+def check_user_indexes(app_configs, databases=None, **kwargs):
+    """Индексы auth_user, без которых поиск в админке и задачи обслуживания читают всю таблицу"""
+    messages = []
+    for alias in databases or []:
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if 'auth_user' not in connection.introspection.table_names(cursor):
+                continue
+            constraints = connection.introspection.get_constraints(cursor, 'auth_user')
+        indexed = {
+            info['columns'][0] for info in constraints.values()
+            if (info['index'] or info['unique']) and info['columns']
+        }
+        if 'email' not in indexed and not USER_EMAIL_INDEXES & set(constraints):
+            messages.append(Warning(
+                f'База "{alias}": нет индекса по auth_user.email — вход и поиск по email '
+                f'читают всю таблицу.',
+                hint='Примените миграции: python manage.py migrate main.',
+                obj='auth_user.email', id='perf.W010',
+            ))
+        if 'last_login' not in indexed:
+            messages.append(Warning(
+                f'База "{alias}": нет индекса по auth_user.last_login — '
+                f'archive_inactive_users читает всю таблицу.',
+                hint='Примените миграции: python manage.py migrate main.',
+                obj='auth_user.last_login', id='perf.W011',
+            ))
+    return messages
+
+
+def iter_url_views(patterns=None, prefix=''):
+    """(маршрут, класс представления) для всех URL с представлениями-классами"""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from iter_url_views(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            view_class = getattr(pattern.callback, 'cls', None) or getattr(pattern.callback, 'view_class', None)
+            if view_class is not None:
+                yield route, view_class
+
+
+@register(PERFORMANCE, Tags.urls, deploy=True)
+def check_unpaginated_lists(app_configs, **kwargs):
+    """Списки без пагинации: ответ и время запроса растут вместе с таблицей"""
+    from django.views.generic.list import MultipleObjectMixin
+    from rest_framework.mixins import ListModelMixin
+
+    messages = []
+    for route, view_class in iter_url_views():
+        if issubclass(view_class, ListModelMixin):
+            unpaginated = getattr(view_class, 'pagination_class', None) is None
+        elif issubclass(view_class, MultipleObjectMixin):
+            unpaginated = not view_class.paginate_by
+        else:
+            continue
+        if unpaginated:
+            messages.append(Warning(
+                f'/{route}: список без пагинации — ответ содержит все строки таблицы.',
+                hint='Задайте pagination_class (или paginate_by) либо отдавайте '
+                     'изменения через /api/users/changes/.',
+                obj=f'{view_class.__module__}.{view_class.__qualname__}', id='perf.W020',
+            ))
+    return messages
@@ -0,0 +1,109 @@
+# main/db_routers.py
+"""
+Маршрутизация чтения на реплики с «прилипанием» к основной БД после записи.
+
+Безопасные чтения внутри HTTP-запроса уходят на одну из реплик
+(settings.DATABASE_REPLICAS). После записи клиент на REPLICA_PIN_SECONDS
+закрепляется за основной БД, чтобы не увидеть устаревший профиль:
+браузер — через cookie, API-клиент — через отметку в кеше по заголовку
+Authorization. Вне HTTP-запросов (команды, фоновые задачи) всё читается
+с основной БД.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE_NAME = 'replica_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = ContextVar('replica_state', default=None)
+
+
+class RoutingState:
+    """Состояние маршрутизации текущего запроса"""
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def _pin_cache_key(credentials):
+    return 'replica_pin:' + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def pin_credentials(credentials):
+    """Закрепляет за основной БД клиента с заголовком Authorization == credentials"""
+    cache.set(_pin_cache_key(credentials), True, settings.REPLICA_PIN_SECONDS)
+
+
+def pin_token(key):
+    """Закрепляет за основной БД клиента с только что выданным токеном"""
+    if settings.DATABASE_REPLICAS:
+        pin_credentials(f'Token {key}')
+
+
+class PrimaryReplicaRouter:
+    """Запись — в основную БД, безопасное чтение — на случайную реплику"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.pinned or state.wrote or not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        # Чтение внутри транзакции должно видеть её же записи
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaPinningMiddleware:
+    """
+    Определяет, закреплён ли клиент за основной БД, и закрепляет его после записи.
+    Должен стоять до SessionMiddleware и AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        credentials = request.META.get('HTTP_AUTHORIZATION')
+        pinned = (
+            request.method not in SAFE_METHODS
+            or PIN_COOKIE_NAME in request.COOKIES
+            or (credentials is not None and cache.get(_pin_cache_key(credentials), False))
+        )
+        state = RoutingState(pinned)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if request.method not in SAFE_METHODS or state.wrote:
+            response.set_cookie(
+                PIN_COOKIE_NAME, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+            if credentials is not None:
+                pin_credentials(credentials)
+        return response
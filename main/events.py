@@ -0,0 +1,302 @@
+# main/events.py
+"""
+Поток событий об изменениях пользователей (Server-Sent Events поверх ASGI).
+
+GET /api/events/users/ (токен в заголовке Authorization или ?ticket=) держит
+соединение и отправляет события created / updated / deactivated / deleted.
+EventSource в браузере не умеет слать заголовки, поэтому клиент сначала
+получает билет POST /api/events/ticket/ с токеном в заголовке: подписанный
+ID пользователя, действующий TICKET_TTL секунд и годный только для потока.
+Сам токен в URL не передаётся и в журналы доступа не попадает.
+
+В каждом воркере один Broadcaster: он раз в POLL_INTERVAL (или сразу после
+локального изменения — сигналы в этом же процессе будят его) читает журнал
+UserChange одним запросом и раздаёт уже закодированное событие очередям
+подписчиков. Нагрузка на БД не зависит от числа подписчиков, внешний брокер
+не нужен: изменения из других воркеров приходят через общий журнал.
+Подписчик — корутина, ждущая свою очередь, поэтому тысячи простаивающих
+соединений почти ничего не стоят. Переподключение с Last-Event-ID
+досылает пропущенные события из журнала. Ошибка чтения журнала (например,
+сбой БД) не останавливает раздатчик: он пишет её в лог и повторяет чтение с
+того же курсора с растущей паузой (до ERROR_BACKOFF_MAX секунд), так что
+после восстановления подписчики получают все пропущенные изменения.
+
+Работает только в режиме ASGI (GUNICORN_MODE=asgi).
+"""
+import asyncio
+import json
+import logging
+import weakref
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import ExpiringTokenAuthentication
+from .change_feed import latest_cursor, read_changes
+
+logger = logging.getLogger(__name__)
+
+RESET = object()
+TICKET_SALT = 'main.events.ticket'
+
+_broadcasters = weakref.WeakKeyDictionary()
+
+
+def get_events_config():
+    """Настройки потока событий с значениями по умолчанию"""
+    config = {
+        'PATH': '/api/events/users/',
+        'POLL_INTERVAL': 1.0,
+        'HEARTBEAT': 15.0,
+        'QUEUE_SIZE': 100,
+        'BATCH_SIZE': 500,
+        'REPLAY_LIMIT': 1000,
+        'RETRY_MS': 3000,
+        'TICKET_TTL': 60,
+        'ERROR_BACKOFF_MAX': 30.0,
+    }
+    config.update(getattr(settings, 'USER_EVENTS', {}))
+    return config
+
+
+def issue_ticket(user):
+    """Билет для открытия потока событий в EventSource"""
+    return signing.dumps(user.pk, salt=TICKET_SALT)
+
+
+def read_ticket(ticket, max_age):
+    """Активный пользователь по билету или None, если билет подделан или истёк"""
+    try:
+        user_id = signing.loads(ticket, salt=TICKET_SALT, max_age=max_age)
+    except signing.BadSignature:
+        return None
+    return User.objects.filter(pk=user_id, is_active=True).first()
+
+
+def encode_batch(cursor, changes):
+    """
+    Пачка изменений в формате SSE. id (курсор журнала) есть только у последнего
+    события пачки: после переподключения клиент продолжит с конца пачки.
+    """
+    chunks = []
+    for index, change in enumerate(changes):
+        lines = [f'event: {change["action"]}']
+        if index == len(changes) - 1:
+            lines.append(f'id: {cursor}')
+        lines.append('data: ' + json.dumps(change, cls=DjangoJSONEncoder, ensure_ascii=False))
+        chunks.append('\n'.join(lines) + '\n\n')
+    return ''.join(chunks).encode()
+
+
+class Subscriber:
+    """Очередь событий одного соединения; события с курсором не новее skip_until пропускаются"""
+
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.skip_until = 0
+
+    def push(self, cursor, payload):
+        if cursor <= self.skip_until:
+            return True
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # Медленный клиент: очередь сбрасывается, клиенту уходит reset
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+            return False
+        return True
+
+
+class Broadcaster:
+    """Единственный в воркере (на event loop) читатель журнала и раздатчик событий"""
+
+    def __init__(self, config):
+        self.config = config
+        self.subscribers = set()
+        self.cursor = None
+        self.task = None
+        self.wakeup = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+
+    async def subscribe(self):
+        subscriber = Subscriber(self.config['QUEUE_SIZE'])
+        if self.cursor is None:
+            self.cursor = await sync_to_async(latest_cursor)()
+        self.subscribers.add(subscriber)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+        if not self.subscribers:
+            self.wakeup.set()
+
+    def notify(self):
+        """Будит опрос журнала; можно вызывать из любого потока"""
+        self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    async def run(self):
+        failures = 0
+        while self.subscribers:
+            delay = self.config['POLL_INTERVAL']
+            if failures:
+                delay = min(delay * 2 ** failures, self.config['ERROR_BACKOFF_MAX'])
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            if not self.subscribers:
+                break
+            try:
+                await self.poll()
+            except Exception:
+                failures += 1
+                logger.exception('Ошибка чтения журнала изменений (попытка %s), повтор с курсора %s',
+                                 failures, self.cursor)
+                # Соединение, сломанное сбоем БД, закрывается до следующей попытки
+                await sync_to_async(close_old_connections)()
+                continue
+            failures = 0
+        # Без подписчиков журнал не читается; следующий подписчик начнёт с конца журнала
+        self.cursor = None
+
+    async def poll(self):
+        """Чтение журнала после курсора до конца и раздача событий"""
+        has_more = True
+        while has_more:
+            cursor, has_more, changes = await sync_to_async(read_changes)(
+                self.cursor, self.config['BATCH_SIZE'],
+            )
+            if changes:
+                self.publish(cursor, encode_batch(cursor, changes))
+            self.cursor = cursor
+
+    def publish(self, cursor, payload):
+        for subscriber in list(self.subscribers):
+            if not subscriber.push(cursor, payload):
+                self.subscribers.discard(subscriber)
+
+
+def get_broadcaster():
+    loop = asyncio.get_running_loop()
+    broadcaster = _broadcasters.get(loop)
+    if broadcaster is None:
+        broadcaster = _broadcasters[loop] = Broadcaster(get_events_config())
+    return broadcaster
+
+
+def notify_broadcasters():
+    """Локальное изменение: разбудить раздатчики событий этого процесса"""
+    for broadcaster in list(_broadcasters.values()):
+        if broadcaster.subscribers:
+            broadcaster.notify()
+
+
+class UserEventsApp:
+    """ASGI-приложение: SSE на PATH, остальные запросы — в Django"""
+
+    def __init__(self, django_app):
+        self.django_app = django_app
+        self.config = get_events_config()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != self.config['PATH']:
+            return await self.django_app(scope, receive, send)
+        if scope['method'] != 'GET':
+            return await self.respond(send, 405, b'{"error": "Method not allowed"}')
+
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        query = parse_qs(scope.get('query_string', b'').decode())
+        if not await self.authenticate(headers, query):
+            return await self.respond(send, 401, b'{"detail": "Invalid token."}')
+
+        await self.stream(send, receive, headers.get('last-event-id') or (query.get('last_event_id') or [None])[0])
+
+    async def authenticate(self, headers, query):
+        keyword, _, key = headers.get('authorization', '').partition(' ')
+        if keyword.lower() != ExpiringTokenAuthentication.keyword.lower():
+            ticket = (query.get('ticket') or [''])[0]
+            if not ticket:
+                return False
+            return await sync_to_async(read_ticket)(ticket, self.config['TICKET_TTL']) is not None
+        try:
+            await sync_to_async(ExpiringTokenAuthentication().authenticate_credentials)(key.strip())
+        except AuthenticationFailed:
+            return False
+        return True
+
+    @staticmethod
+    async def respond(send, status, body):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def replay(self, subscriber, last_event_id, until):
+        """Досылка изменений после Last-Event-ID до текущего курсора раздатчика"""
+        chunks, cursor, replayed = [], last_event_id, 0
+        while cursor < until:
+            cursor, has_more, changes = await sync_to_async(read_changes)(cursor, self.config['BATCH_SIZE'])
+            if changes:
+                chunks.append(encode_batch(cursor, changes))
+                replayed += len(changes)
+            if not has_more or replayed > self.config['REPLAY_LIMIT']:
+                break
+        if replayed > self.config['REPLAY_LIMIT']:
+            return None
+        subscriber.skip_until = cursor
+        return b''.join(chunks)
+
+    async def stream(self, send, receive, last_event_id):
+        broadcaster = get_broadcaster()
+        subscriber = await broadcaster.subscribe()
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ]})
+            first = f'retry: {self.config["RETRY_MS"]}\n\n'.encode()
+            if last_event_id is not None and last_event_id.isdigit():
+                replayed = await self.replay(subscriber, int(last_event_id), broadcaster.cursor or 0)
+                # Слишком большой разрыв: клиент должен синхронизироваться через /api/users/changes/
+                first += b'event: reset\ndata: {}\n\n' if replayed is None else replayed
+            await send({'type': 'http.response.body', 'body': first, 'more_body': True})
+            await self.pump(send, receive, subscriber)
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    async def pump(self, send, receive, subscriber):
+        disconnected = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            while True:
+                event = asyncio.ensure_future(subscriber.queue.get())
+                done, _ = await asyncio.wait({event, disconnected}, timeout=self.config['HEARTBEAT'],
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if event not in done:
+                    event.cancel()
+                    if disconnected in done:
+                        return
+                    body = b': ping\n\n'
+                elif event.result() is RESET:
+                    await send({'type': 'http.response.body', 'body': b'event: reset\ndata: {}\n\n'})
+                    return
+                else:
+                    body = event.result()
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        finally:
+            disconnected.cancel()
+
+    @staticmethod
+    async def wait_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
@@ -0,0 +1,98 @@
+# main/health.py
+"""
+Проверки живости и готовности для балансировщика и оркестратора.
+
+Middleware стоит первым в MIDDLEWARE и отвечает на свои пути раньше
+остальных: без сессии, CSRF, сообщений, аутентификации и проверки Host.
+- LIVE_PATH — процесс жив и обрабатывает запросы; ответ из памяти, без ввода-вывода;
+- READY_PATH — плюс доступна основная БД. Результат проверки БД кешируется
+  на READY_CACHE_SECONDS, так что частые пробы почти не нагружают базу.
+  Причина недоступности пишется только в лог: текст ошибки драйвера
+  содержит адрес, имя БД и пользователя, а эндпоинт открыт без аутентификации.
+"""
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+_LIVE_BODY = json.dumps({'status': 'ok'}).encode()
+
+
+def get_health_config():
+    """Настройки проверок с значениями по умолчанию"""
+    config = {
+        'LIVE_PATH': '/healthz/live',
+        'READY_PATH': '/healthz/ready',
+        'READY_CACHE_SECONDS': 5.0,
+        'DATABASE': 'default',
+    }
+    config.update(getattr(settings, 'HEALTH_CHECK', {}))
+    return config
+
+
+class ReadinessCheck:
+    """Кешированная проверка доступности БД в пределах процесса"""
+
+    def __init__(self, alias, cache_seconds):
+        self.alias = alias
+        self.cache_seconds = cache_seconds
+        self._lock = threading.Lock()
+        self._result = None
+        self._checked_at = None
+
+    def _check_database(self):
+        try:
+            with connections[self.alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError:
+            logger.exception('Проверка готовности: БД "%s" недоступна', self.alias)
+            return {'status': 'unavailable', 'database': 'unavailable'}
+        return {'status': 'ok', 'database': 'ok'}
+
+    def result(self):
+        """Результат последней проверки; пересчитывается, если устарел"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.cache_seconds:
+            return self._result
+        # БД проверяет один поток, остальные отдают предыдущий результат
+        if not self._lock.acquire(blocking=self._result is None):
+            return self._result
+        try:
+            if self._checked_at is None or time.monotonic() - self._checked_at >= self.cache_seconds:
+                self._result = self._check_database()
+                self._checked_at = time.monotonic()
+            return self._result
+        finally:
+            self._lock.release()
+
+
+class HealthCheckMiddleware:
+    """Отвечает на пути проверок, не пропуская запрос дальше по цепочке"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = get_health_config()
+        self.live_path = config['LIVE_PATH']
+        self.ready_path = config['READY_PATH']
+        self.readiness = ReadinessCheck(config['DATABASE'], float(config['READY_CACHE_SECONDS']))
+
+    def __call__(self, request):
+        if request.path_info == self.live_path:
+            return self._response(_LIVE_BODY, 200)
+        if request.path_info == self.ready_path:
+            result = self.readiness.result()
+            status = 200 if result['status'] == 'ok' else 503
+            return self._response(json.dumps(result).encode(), status)
+        return self.get_response(request)
+
+    @staticmethod
+    def _response(body, status):
+        response = HttpResponse(body, status=status, content_type='application/json')
+        response['Cache-Control'] = 'no-store'
+        return response
@@ -0,0 +1,164 @@
+# main/idempotency.py
+"""
+Повтор запросов API с заголовком Idempotency-Key.
+
+Клиент, повторяющий запрос после таймаута, присылает тот же ключ. Первый
+ответ (кроме 5xx) сохраняется в кеше на TTL секунд, повтор получает его
+без повторной проверки и хеширования пароля, с заголовком
+Idempotent-Replayed: true. Пока исходный запрос выполняется, дубликаты
+(в том числе в других воркерах) ждут его результата не дольше LOCK_TIMEOUT
+секунд, а затем получают 409.
+
+Ключ действует в пределах метода, пути и пользователя; тот же ключ с другим
+телом запроса — ошибка 422. Тело запроса хранится только HMAC с SECRET_KEY:
+в нём бывают пароли, и простой хеш известной JSON-структуры перебирается
+офлайн. Секреты ответа (поля idempotent_private_fields view, например токен)
+в кеш не пишутся: при повторе их заново выдаёт view.restore_idempotent_fields()
+по несекретному response.idempotent_context, сохранённому с записью.
+Параллельный дубликат в том же процессе получает исходный ответ целиком.
+
+Дубликаты в одном процессе объединяет main.singleflight, между воркерами —
+add() общего кеша (атомарен в Redis и БД; у файлового кеша add() не атомарен,
+и одновременные дубликаты в разных воркерах могут выполниться оба).
+"""
+import hashlib
+import json
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
+from rest_framework import status
+from rest_framework.response import Response
+
+from .singleflight import SingleFlight
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+
+_flight = SingleFlight()
+
+
+def get_idempotency_config():
+    """Настройки повторов по Idempotency-Key с значениями по умолчанию"""
+    config = {
+        'TTL': 24 * 3600,
+        'LOCK_TIMEOUT': 30.0,
+        'POLL_INTERVAL': 0.05,
+    }
+    config.update(getattr(settings, 'IDEMPOTENCY', {}))
+    return config
+
+
+def _cache_key(request, key):
+    user_id = request.user.pk if request.user.is_authenticated else ''
+    scope = f'{request.method}:{request.path}:{user_id}:{key}'
+    return 'idempotency:' + hashlib.sha256(scope.encode()).hexdigest()
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return salted_hmac('main.idempotency', body, secret=settings.SECRET_KEY, algorithm='sha256').hexdigest()
+
+
+def _record(view, response, fingerprint):
+    """Запись для повторов: ответ без полей idempotent_private_fields"""
+    data, private = response.data, []
+    fields = getattr(view, 'idempotent_private_fields', ())
+    if fields and isinstance(data, dict):
+        private = [name for name in fields if name in data]
+        data = {name: value for name, value in data.items() if name not in private}
+    return {
+        'fingerprint': fingerprint, 'status': response.status_code, 'data': data, 'private': private,
+        'context': getattr(response, 'idempotent_context', None) or {},
+    }
+
+
+def _replay(view, request, record, fingerprint):
+    if record['fingerprint'] != fingerprint:
+        return Response({
+            'error': 'Idempotency-Key уже использован для запроса с другими данными'
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    data = record['data']
+    if record.get('private'):
+        data = view.restore_idempotent_fields(request, dict(data), record['context'])
+    return Response(data, status=record['status'], headers={'Idempotent-Replayed': 'true'})
+
+
+def _execute(view, handler, request, args, kwargs, cache_key, fingerprint, config):
+    """
+    Исходный запрос под блокировкой в общем кеше: (запись для повторов, ответ).
+    Если ответ уже сохранил другой воркер — (запись, None).
+    """
+    lock_key = cache_key + ':lock'
+    # Блокировка — прямо в общем уровне кеша, мимо L1 с его задержкой видимости
+    locks = getattr(cache, 'shared', cache)
+    deadline = time.monotonic() + config['LOCK_TIMEOUT']
+    while not locks.add(lock_key, fingerprint, config['LOCK_TIMEOUT']):
+        if time.monotonic() >= deadline:
+            return None, Response({
+                'error': 'Запрос с этим Idempotency-Key ещё выполняется'
+            }, status=status.HTTP_409_CONFLICT)
+        time.sleep(config['POLL_INTERVAL'])
+        record = cache.get(cache_key)
+        if record is not None:
+            return record, None
+
+    try:
+        record = cache.get(cache_key)
+        if record is not None:
+            return record, None
+        try:
+            response = handler(view, request, *args, **kwargs)
+        except Exception as exc:
+            # Ошибки валидации тоже ответ: повтор получит тот же 400
+            response = view.handle_exception(exc)
+        record = None
+        if response.status_code < 500:
+            record = _record(view, response, fingerprint)
+            cache.set(cache_key, record, config['TTL'])
+        return record, response
+    finally:
+        locks.delete(lock_key)
+
+
+def idempotent(handler):
+    """Декоратор метода APIView (post, put, ...): повтор с тем же Idempotency-Key отдаёт первый ответ"""
+
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({
+                'error': f'Idempotency-Key длиннее {MAX_KEY_LENGTH} символов'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        config = get_idempotency_config()
+        cache_key = _cache_key(request, key)
+        fingerprint = _fingerprint(request)
+        record = cache.get(cache_key)
+        if record is not None:
+            return _replay(self, request, record, fingerprint)
+
+        # Дубликаты в этом процессе ждут исходный запрос через single-flight,
+        # в других воркерах — через блокировку в общем кеше
+        (record, response), shared = _flight.do(cache_key, lambda: _execute(
+            self, handler, request, args, kwargs, cache_key, fingerprint, config,
+        ))
+        if response is not None:
+            if not shared:
+                return response
+            if record is not None and record['fingerprint'] == fingerprint:
+                # Дубликат в этом процессе: исходный ответ из памяти, вместе с секретами
+                return Response(response.data, status=response.status_code,
+                                headers={'Idempotent-Replayed': 'true'})
+        if record is None:
+            return Response({
+                'error': 'Исходный запрос с этим Idempotency-Key не завершился, повторите запрос'
+            }, status=status.HTTP_409_CONFLICT)
+        return _replay(self, request, record, fingerprint)
+
+    return wrapper
@@ -0,0 +1,90 @@
+# main/jsonlog.py
+"""
+Фоновая запись JSONL-файлов с ротацией.
+
+Запрос только кладёт запись в очередь, на диск её пишет отдельный поток
+(logging.handlers.QueueListener + RotatingFileHandler). При переполнении
+очереди записи отбрасываются, а не блокируют обработку запроса.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueListener, RotatingFileHandler
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+class JsonlWriter:
+    """Неблокирующий писатель JSONL-файла с ротацией по размеру"""
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backup_count=5, queue_size=10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.pid = None
+        self.listener = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        """Запуск фонового потока; после fork (gunicorn --preload) поток создаётся заново"""
+        with self._lock:
+            if self.pid == os.getpid():
+                return
+            handler = RotatingFileHandler(
+                self.path,
+                maxBytes=self.max_bytes,
+                backupCount=self.backup_count,
+                encoding='utf-8',
+                delay=True,
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.queue = queue.Queue(self.queue_size)
+            self.listener = QueueListener(self.queue, handler)
+            self.listener.start()
+            self.pid = os.getpid()
+
+    def write(self, record):
+        """Ставит словарь record в очередь на запись, не дожидаясь диска"""
+        if self.pid != os.getpid():
+            self._start()
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        try:
+            self.queue.put_nowait(logging.makeLogRecord({'msg': line}))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Ожидает, пока фоновый поток запишет все поставленные записи"""
+        if self.pid == os.getpid():
+            self.queue.join()
+
+    def stop(self):
+        if self.pid == os.getpid() and self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.pid = None
+
+
+def get_writer(path, max_bytes=10 * 1024 * 1024, backup_count=5):
+    """Один писатель на файл в пределах процесса"""
+    writer = _writers.get(path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(path)
+            if writer is None:
+                writer = JsonlWriter(path, max_bytes=max_bytes, backup_count=backup_count)
+                _writers[path] = writer
+    return writer
+
+
+@atexit.register
+def _stop_writers():
+    for writer in list(_writers.values()):
+        writer.stop()
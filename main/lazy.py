@@ -0,0 +1,76 @@
+# main/lazy.py
+"""
+Отложенная загрузка редко используемых частей проекта (режим LEAN_STARTUP).
+
+В этом режиме воркер при старте не импортирует админку и HTML-представления:
+модули загружаются при первом запросе, который к ним обращается.
+"""
+import threading
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class LazyURLPatterns(Sequence):
+    """Список URL-шаблонов, который строится загрузчиком при первом обращении"""
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._patterns = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._patterns is None:
+            with self._lock:
+                if self._patterns is None:
+                    self._patterns = list(self._loader())
+        return self._patterns
+
+    def __getitem__(self, index):
+        return self._load()[index]
+
+    def __len__(self):
+        return len(self._load())
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __reversed__(self):
+        return reversed(self._load())
+
+
+def lazy_view(dotted_path):
+    """View, модуль которого импортируется при первом вызове"""
+    module_path, name = dotted_path.rsplit('.', 1)
+    resolved = []
+
+    def view(request, *args, **kwargs):
+        if not resolved:
+            resolved.append(import_string(dotted_path))
+        return resolved[0](request, *args, **kwargs)
+
+    view.__name__ = view.__qualname__ = name
+    view.__module__ = module_path
+    return view
+
+
+def view(dotted_path):
+    """Функция-представление по пути: отложенно в режиме LEAN_STARTUP, иначе сразу"""
+    if settings.LEAN_STARTUP:
+        return lazy_view(dotted_path)
+    return import_string(dotted_path)
+
+
+def admin_urls():
+    """URL админки для path(); в режиме LEAN_STARTUP admin.py модули грузятся при первом обращении"""
+    from django.contrib import admin
+
+    if not settings.LEAN_STARTUP:
+        return admin.site.urls
+
+    def load():
+        admin.autodiscover()
+        return admin.site.get_urls()
+
+    return LazyURLPatterns(load), 'admin', admin.site.name
@@ -0,0 +1,303 @@
+# main/maintenance.py
+"""
+Задачи обслуживания БД, которые выполняются пачками.
+
+Вместо одного большого DELETE/UPDATE задача выбирает до BATCH_SIZE первичных
+ключей (по возрастанию, после последнего обработанного) и обрабатывает их
+в короткой транзакции, затем делает паузу SLEEP секунд. Блокировки держатся
+недолго, реплики успевают догонять основную БД, а задачу можно запускать
+в рабочее время.
+
+После каждой пачки в той же транзакции сохраняется позиция
+(main.models.MaintenanceCheckpoint): прерванная задача при следующем запуске
+продолжается с неё.
+
+Команды: purge_sessions, archive_inactive_users, cleartokens,
+prune_user_changes. Массовые
+действия админки (main.admin) выполняются через очередь задач
+(main.tasks.run_user_job): выбранные ID хранятся в аргументах задачи, и
+прерванное действие продолжается после перезапуска.
+"""
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .cache import USER_FULL_LIST_TAG, USER_LIST_TAG, user_tag
+from .events import notify_broadcasters
+from .models import AuthToken, MaintenanceCheckpoint, UserChange
+
+
+def get_maintenance_config():
+    """Настройки задач обслуживания с значениями по умолчанию"""
+    config = {
+        'BATCH_SIZE': 1000,
+        'SLEEP': 0.1,
+        'INACTIVE_DAYS': 365,
+        'CHANGE_FEED_DAYS': 30,
+    }
+    config.update(getattr(settings, 'MAINTENANCE', {}))
+    return config
+
+
+@dataclass
+class JobResult:
+    processed: int = 0
+    batches: int = 0
+    finished: bool = False
+
+
+class BatchJob:
+    """
+    Базовая задача: get_queryset() — что обработать, process(pks) — обработка
+    одной пачки, возвращает количество обработанных строк.
+    """
+    name = None
+    description = None
+
+    def __init__(self, batch_size=None, sleep=None):
+        config = get_maintenance_config()
+        self.batch_size = batch_size or config['BATCH_SIZE']
+        self.sleep = config['SLEEP'] if sleep is None else sleep
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def process(self, pks):
+        raise NotImplementedError
+
+    def after_batch(self, pks):
+        """Действия после фиксации транзакции пачки (сброс кеша и т. п.)"""
+
+    def pending(self):
+        return self.get_queryset().count()
+
+    def checkpoint(self):
+        return MaintenanceCheckpoint.objects.filter(job=self.name).first()
+
+    def reset(self):
+        MaintenanceCheckpoint.objects.filter(job=self.name).delete()
+
+    def run(self, max_batches=None, progress=None):
+        """
+        Обработка пачками с места последней остановки. progress(result, last_pk)
+        вызывается после каждой пачки.
+        """
+        checkpoint = self.checkpoint()
+        pk_field = self.get_queryset().model._meta.pk
+        last_pk = pk_field.to_python(checkpoint.last_pk) if checkpoint else None
+        result = JobResult(processed=checkpoint.processed if checkpoint else 0)
+
+        while max_batches is None or result.batches < max_batches:
+            queryset = self.get_queryset()
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:self.batch_size])
+            if not pks:
+                result.finished = True
+                break
+
+            with transaction.atomic():
+                result.processed += self.process(pks)
+                last_pk = pks[-1]
+                MaintenanceCheckpoint.objects.update_or_create(
+                    job=self.name, defaults={'last_pk': str(last_pk), 'processed': result.processed},
+                )
+            result.batches += 1
+            self.after_batch(pks)
+            if progress:
+                progress(result, last_pk)
+
+            if len(pks) < self.batch_size:
+                result.finished = True
+                break
+            if self.sleep:
+                time.sleep(self.sleep)
+
+        if result.finished:
+            self.reset()
+        return result
+
+
+class PurgeSessionsJob(BatchJob):
+    """Удаление истёкших сессий из django_session (замена clearsessions)"""
+    name = 'purge_sessions'
+    description = 'Истёкших сессий'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.now = timezone.now()
+
+    def get_queryset(self):
+        return Session.objects.filter(expire_date__lt=self.now)
+
+    def process(self, pks):
+        count, _ = Session.objects.filter(pk__in=pks).delete()
+        return count
+
+
+class DeactivateUsersJob(BatchJob):
+    """Деактивация пользователей из queryset (массовое действие админки)"""
+    name = 'deactivate_users'
+    description = 'Пользователей к деактивации'
+
+    def __init__(self, queryset=None, name=None, **kwargs):
+        super().__init__(**kwargs)
+        self.queryset = queryset
+        self.name = name or self.name
+
+    def get_queryset(self):
+        return self.queryset.filter(is_active=True)
+
+    def process(self, pks):
+        # update() не шлёт сигналы: журнал изменений пополняется здесь же
+        user_ids = list(self.get_queryset().filter(pk__in=pks).select_for_update().values_list('pk', flat=True))
+        User.objects.filter(pk__in=user_ids).update(is_active=False)
+        UserChange.record(user_ids, UserChange.DEACTIVATED)
+        transaction.on_commit(notify_broadcasters)
+        return len(user_ids)
+
+    def after_batch(self, pks):
+        cache.invalidate_tags(*(user_tag(pk) for pk in pks), USER_LIST_TAG, USER_FULL_LIST_TAG)
+
+
+class ArchiveInactiveUsersJob(DeactivateUsersJob):
+    """
+    Деактивация пользователей, которые не входили дольше INACTIVE_DAYS дней
+    (или не входили ни разу с регистрации). Сотрудники не затрагиваются.
+    Клиенты API с продлеваемым токеном не обновляют last_login, поэтому
+    пользователи с действующим токеном активными считаются тоже.
+    """
+    name = 'archive_inactive_users'
+    description = 'Неактивных пользователей'
+
+    def __init__(self, days=None, **kwargs):
+        super().__init__(**kwargs)
+        days = get_maintenance_config()['INACTIVE_DAYS'] if days is None else days
+        self.now = timezone.now()
+        self.cutoff = self.now - timedelta(days=days)
+
+    def get_queryset(self):
+        live_tokens = AuthToken.objects.filter(user=OuterRef('pk'), expires_at__gt=self.now)
+        return User.objects.filter(
+            Q(last_login__lt=self.cutoff) | Q(last_login__isnull=True, date_joined__lt=self.cutoff),
+            ~Exists(live_tokens),
+            is_active=True, is_staff=False, is_superuser=False,
+        )
+
+
+class ClearTokensJob(BatchJob):
+    """Удаление истёкших токенов API"""
+    name = 'cleartokens'
+    description = 'Истёкших токенов'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.now = timezone.now()
+
+    def get_queryset(self):
+        return AuthToken.objects.filter(expires_at__lte=self.now)
+
+    def process(self, pks):
+        # delete() через ORM: сигнал post_delete сбрасывает токены из кеша
+        count, _ = AuthToken.objects.filter(pk__in=pks).delete()
+        return count
+
+
+class ResetTokensJob(BatchJob):
+    """Удаление всех токенов API пользователей из queryset (массовое действие админки)"""
+    name = 'reset_tokens'
+    description = 'Пользователей для сброса токенов'
+
+    def __init__(self, queryset=None, name=None, **kwargs):
+        super().__init__(**kwargs)
+        self.queryset = queryset
+        self.name = name or self.name
+
+    def get_queryset(self):
+        return self.queryset
+
+    def process(self, pks):
+        AuthToken.objects.filter(user_id__in=pks).delete()
+        return len(pks)
+
+
+class PruneUserChangesJob(BatchJob):
+    """
+    Удаление записей журнала изменений (main.change_feed) старше
+    CHANGE_FEED_DAYS дней. Клиент потока событий, отставший дольше срока
+    хранения, пропустит изменения и должен заново загрузить список. Последняя
+    запись не удаляется: SQLite и MySQL иначе могут выдать её id повторно.
+    """
+    name = 'prune_user_changes'
+    description = 'Старых записей журнала изменений'
+
+    def __init__(self, days=None, **kwargs):
+        super().__init__(**kwargs)
+        days = get_maintenance_config()['CHANGE_FEED_DAYS'] if days is None else days
+        self.cutoff = timezone.now() - timedelta(days=days)
+        self.latest_id = UserChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def get_queryset(self):
+        return UserChange.objects.filter(created_at__lt=self.cutoff, id__lt=self.latest_id)
+
+    def process(self, pks):
+        count, _ = UserChange.objects.filter(pk__in=pks).delete()
+        return count
+
+
+class BatchJobCommand(BaseCommand):
+    """Команда управления для задачи job_class с общими параметрами пачек"""
+    job_class = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Строк в одной пачке (MAINTENANCE["BATCH_SIZE"])')
+        parser.add_argument('--sleep', type=float, help='Пауза между пачками, секунд (MAINTENANCE["SLEEP"])')
+        parser.add_argument('--max-batches', type=int, help='Остановиться после N пачек (продолжить можно позже)')
+        parser.add_argument('--restart', action='store_true', help='Начать сначала, забыв сохранённую позицию')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать, сколько строк обработать')
+
+    def get_job(self, options):
+        return self.job_class(batch_size=options['batch_size'], sleep=options['sleep'])
+
+    def handle(self, *args, **options):
+        job = self.get_job(options)
+        if options['dry_run']:
+            self.stdout.write(f'{job.description}: {job.pending()}')
+            return
+        if options['restart']:
+            job.reset()
+
+        checkpoint = job.checkpoint()
+        if checkpoint:
+            self.stdout.write(f'Продолжение с ключа {checkpoint.last_pk} (обработано {checkpoint.processed})')
+        total = job.pending()
+        self.stdout.write(f'{job.description}: {total}, пачки по {job.batch_size}')
+
+        start = time.monotonic()
+
+        def progress(result, last_pk):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  пачка {result.batches}: обработано {result.processed}, '
+                                  f'ключ {last_pk}, {time.monotonic() - start:.1f} с')
+
+        try:
+            result = job.run(max_batches=options['max_batches'], progress=progress)
+        except KeyboardInterrupt:
+            self.stderr.write('Прервано: повторный запуск продолжит с сохранённой позиции')
+            return
+
+        message = (f'Обработано: {result.processed} за {result.batches} пачек, '
+                   f'{time.monotonic() - start:.1f} с')
+        if result.finished:
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(self.style.WARNING(message + '; остаток обработает следующий запуск'))
@@ -0,0 +1,19 @@
+# main/management/commands/archive_inactive_users.py
+"""
+Деактивация давно не входивших пользователей пачками (main.maintenance).
+
+    python manage.py archive_inactive_users --days 365 --max-batches 50
+"""
+from main.maintenance import ArchiveInactiveUsersJob, BatchJobCommand
+
+
+class Command(BatchJobCommand):
+    help = 'Деактивирует пользователей, не входивших дольше заданного срока'
+    job_class = ArchiveInactiveUsersJob
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--days', type=int, help='Срок без входа, дней (MAINTENANCE["INACTIVE_DAYS"])')
+
+    def get_job(self, options):
+        return self.job_class(days=options['days'], batch_size=options['batch_size'], sleep=options['sleep'])
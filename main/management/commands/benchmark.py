@@ -0,0 +1,274 @@
+# main/management/commands/benchmark.py
+"""
+Замер задержки запросов через настоящий WSGI-обработчик Django.
+
+В отличие от тестового клиента, здесь работают сигналы request_started /
+request_finished, поэтому видна разница между новым соединением с БД на
+каждый запрос и постоянным соединением (CONN_MAX_AGE). Сценарии update,
+login и register пишут в БД; вместе с --processes они показывают поведение
+под конкурентной записью из нескольких воркеров.
+
+Команда создаёт пользователя со случайным паролем и токеном, а сценарий
+register — новых пользователей; в конце прогона все они удаляются. Запуск
+разрешён только с DEBUG=True или на тестовой БД, чтобы не оставить
+учётные записи в рабочей базе.
+
+    python manage.py benchmark --path /api/users/{user_id}/ --conn-max-age 0 --conn-max-age 60
+    python manage.py benchmark --scenario update --processes 4 --concurrency 4 --requests 2000
+    python manage.py benchmark --middleware both --requests 2000
+"""
+import io
+import json
+import multiprocessing
+import secrets
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import nullcontext
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from main.models import AuthToken
+
+BENCHMARK_HOST = 'benchmark.local'
+# Пользователи прогона: bench_<id прогона>_..., удаляются по этому префиксу
+BENCHMARK_USER_PREFIX = 'bench_'
+SCENARIOS = ('detail', 'update', 'login', 'register')
+MIDDLEWARE_CHOICES = ('current', 'full', 'lean', 'both')
+LEAN_MIDDLEWARE = 'main.browser_middleware.TokenAPIMiddleware'
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def split(count, parts):
+    return [count // parts + (1 if i < count % parts else 0) for i in range(parts)]
+
+
+def is_test_database(connection):
+    """Тестовая БД Django: test_<имя>, TEST["NAME"] или SQLite в памяти"""
+    name = str(connection.settings_dict['NAME'])
+    test_name = connection.settings_dict.get('TEST', {}).get('NAME')
+    return (name.startswith('test_') or (test_name is not None and name == str(test_name))
+            or (connection.vendor == 'sqlite' and connection.is_in_memory_db()))
+
+
+def check_target():
+    """Замеры создают пользователей и токены: только для DEBUG или тестовой БД"""
+    if not settings.DEBUG and not is_test_database(connections['default']):
+        raise CommandError('Замеры создают пользователей и токены в БД: запустите с DEBUG=True '
+                           'или на тестовой БД.')
+
+
+def new_password():
+    return secrets.token_urlsafe(18)
+
+
+def create_benchmark_user(prefix):
+    """Пользователь прогона со случайным паролем и токеном: (пользователь, пароль, токен)"""
+    password = new_password()
+    username = f'{prefix}user'
+    user = User.objects.create_user(username, f'{username}@example.com', password)
+    return user, password, AuthToken.objects.issue(user, 'benchmark').key
+
+
+def delete_benchmark_users(prefix):
+    """Удаление пользователей прогона вместе с токенами; возвращает их количество"""
+    users = User.objects.filter(username__startswith=prefix)
+    count = users.count()
+    users.delete()
+    return count
+
+
+class Command(BaseCommand):
+    help = 'Замер задержки запросов к приложению через WSGI-обработчик'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', choices=SCENARIOS, default='detail',
+                            help='detail — GET по --path, update — PATCH профиля, '
+                                 'login — вход через API, register — регистрация')
+        parser.add_argument('--path', default='/api/users/{user_id}/',
+                            help='URL для сценария detail; {user_id} заменяется на ID тестового пользователя')
+        parser.add_argument('--requests', type=int, default=500, help='Количество замеряемых запросов')
+        parser.add_argument('--warmup', type=int, default=20, help='Количество разогревочных запросов')
+        parser.add_argument('--concurrency', type=int, default=1, help='Количество потоков в каждом процессе')
+        parser.add_argument('--processes', type=int, default=1, help='Количество процессов (как воркеры gunicorn)')
+        parser.add_argument('--anonymous', action='store_true', help='Без заголовка Authorization')
+        parser.add_argument('--conn-max-age', type=int, action='append', dest='conn_max_age',
+                            help='Значение CONN_MAX_AGE для прогона; можно указать несколько раз для сравнения')
+        parser.add_argument('--middleware', choices=MIDDLEWARE_CHOICES, default='current',
+                            help='Цепочка middleware: current — из настроек, full — все middleware для всех '
+                                 'запросов, lean — браузерные пропускаются для API с токеном, both — сравнение')
+
+    def handle(self, *args, **options):
+        if BENCHMARK_HOST not in settings.ALLOWED_HOSTS:
+            settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, BENCHMARK_HOST]
+
+        check_target()
+        self.options = options
+        self.prefix = f'{BENCHMARK_USER_PREFIX}{uuid.uuid4().hex[:8]}_'
+        self.user, self.password, self.token = create_benchmark_user(self.prefix)
+        try:
+            self.run_variants(options)
+        finally:
+            connections.close_all()
+            deleted = delete_benchmark_users(self.prefix)
+            self.stdout.write(f'Удалено пользователей прогона: {deleted}')
+
+    def run_variants(self, options):
+        variants = options['conn_max_age'] or [connections['default'].settings_dict['CONN_MAX_AGE']]
+        self.stdout.write(f'Сценарий {options["scenario"]}: {options["requests"]} запросов, '
+                          f'{options["processes"]} процессов x {options["concurrency"]} потоков, '
+                          f'БД {connections["default"].vendor}')
+        for pipeline, middleware in self.middleware_variants(options['middleware']):
+            settings.MIDDLEWARE = middleware
+            self.handler = WSGIHandler()
+            for conn_max_age in variants:
+                self.set_conn_max_age(conn_max_age)
+                self.run_thread(options['warmup'], [], Counter())
+                timings, statuses, elapsed = self.run(options['requests'], options['concurrency'],
+                                                      options['processes'])
+                self.report(f'middleware={pipeline}, CONN_MAX_AGE={conn_max_age}', timings, statuses, elapsed)
+
+    def middleware_variants(self, choice):
+        """Пары (название, MIDDLEWARE) для прогонов"""
+        if choice == 'current':
+            return [('current', list(settings.MIDDLEWARE))]
+        full = [name for name in settings.MIDDLEWARE if name != LEAN_MIDDLEWARE]
+        lean = full + [LEAN_MIDDLEWARE]
+        variants = {'full': full, 'lean': lean}
+        if choice == 'both':
+            return list(variants.items())
+        return [(choice, variants[choice])]
+
+    def set_conn_max_age(self, conn_max_age):
+        for alias in connections:
+            connections[alias].settings_dict['CONN_MAX_AGE'] = conn_max_age
+        connections.close_all()
+
+    def build_request(self):
+        """Метод, путь, тело и заголовки очередного запроса сценария"""
+        scenario = self.options['scenario']
+        headers = {}
+        if scenario == 'detail':
+            if not self.options['anonymous']:
+                headers['HTTP_AUTHORIZATION'] = f'Token {self.token}'
+            return 'GET', self.options['path'].format(user_id=self.user.id), None, headers
+        if scenario == 'update':
+            headers['HTTP_AUTHORIZATION'] = f'Token {self.token}'
+            return 'PATCH', '/api/profile/', {'first_name': uuid.uuid4().hex[:12]}, headers
+        if scenario == 'login':
+            return 'POST', '/api/login/', {'username': self.user.username, 'password': self.password}, headers
+        username = f'{self.prefix}{uuid.uuid4().hex[:16]}'
+        password = new_password()
+        return 'POST', '/api/register/', {
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': password,
+            'password2': password,
+        }, headers
+
+    def request(self):
+        method, path, data, headers = self.build_request()
+        body = json.dumps(data).encode() if data is not None else b''
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'HTTP_HOST': BENCHMARK_HOST,
+            'SERVER_NAME': BENCHMARK_HOST,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            **headers,
+        }
+        setup_testing_defaults(environ)
+        status_holder = []
+
+        def start_response(status, response_headers, exc_info=None):
+            status_holder.append(int(status.split()[0]))
+
+        start = time.perf_counter()
+        response = self.handler(environ, start_response)
+        for _ in response:
+            pass
+        # close() отправляет request_finished: здесь закрываются устаревшие соединения
+        response.close()
+        return (time.perf_counter() - start) * 1000, status_holder[0]
+
+    def run_thread(self, count, timings, statuses, lock=None):
+        local_timings, local_statuses = [], Counter()
+        for _ in range(count):
+            duration, status = self.request()
+            local_timings.append(duration)
+            local_statuses[status] += 1
+        connections.close_all()
+        with lock or nullcontext():
+            timings.extend(local_timings)
+            statuses.update(local_statuses)
+
+    def run_threads(self, count, concurrency):
+        timings, statuses = [], Counter()
+        if concurrency == 1:
+            self.run_thread(count, timings, statuses)
+            return timings, statuses
+
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(target=self.run_thread, args=(n, timings, statuses, lock))
+            for n in split(count, concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, statuses
+
+    def run_process(self, count, concurrency, results):
+        results.put(self.run_threads(count, concurrency))
+
+    def run(self, count, concurrency, processes):
+        start = time.perf_counter()
+        if processes == 1:
+            timings, statuses = self.run_threads(count, concurrency)
+            return timings, statuses, time.perf_counter() - start
+
+        # Соединения не должны переходить в дочерние процессы через fork
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [
+            context.Process(target=self.run_process, args=(n, concurrency, results))
+            for n in split(count, processes)
+        ]
+        for worker in workers:
+            worker.start()
+        timings, statuses = [], Counter()
+        for _ in workers:
+            worker_timings, worker_statuses = results.get()
+            timings.extend(worker_timings)
+            statuses.update(worker_statuses)
+        for worker in workers:
+            worker.join()
+        return timings, statuses, time.perf_counter() - start
+
+    def report(self, label, timings, statuses, elapsed):
+        if not timings:
+            return
+        self.stdout.write(self.style.SUCCESS(label))
+        self.stdout.write(
+            f'  среднее {statistics.mean(timings):.2f} мс | p50 {percentile(timings, 0.5):.2f} мс | '
+            f'p95 {percentile(timings, 0.95):.2f} мс | p99 {percentile(timings, 0.99):.2f} мс | '
+            f'{len(timings) / elapsed:.0f} запросов/с | статусы {dict(statuses)}'
+        )
@@ -0,0 +1,12 @@
+# main/management/commands/cleartokens.py
+"""
+Удаление истёкших токенов API пачками (main.maintenance).
+
+    python manage.py cleartokens --batch-size 1000 --sleep 0.1
+"""
+from main.maintenance import BatchJobCommand, ClearTokensJob
+
+
+class Command(BatchJobCommand):
+    help = 'Удаляет истёкшие токены API пачками'
+    job_class = ClearTokensJob
@@ -0,0 +1,94 @@
+# main/management/commands/loadtest.py
+"""
+Нагрузочный тест запущенного HTTP-сервера (gunicorn, runserver).
+
+Потоки держат keep-alive соединения и без пауз шлют запросы в течение
+--duration секунд. Токен выдаётся пользователю прогона, созданному, как в
+команде benchmark, в той же БД, что и у сервера (только DEBUG=True или
+тестовая БД); в конце пользователь удаляется.
+
+    python manage.py loadtest --url http://127.0.0.1:8000 --concurrency 32 --duration 20
+"""
+import http.client
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+from .benchmark import (
+    BENCHMARK_USER_PREFIX, check_target, create_benchmark_user, delete_benchmark_users, percentile,
+)
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест запущенного HTTP-сервера'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адрес сервера')
+        parser.add_argument('--path', default='/api/users/{user_id}/',
+                            help='URL запроса; {user_id} заменяется на ID тестового пользователя')
+        parser.add_argument('--concurrency', type=int, default=16, help='Количество параллельных соединений')
+        parser.add_argument('--duration', type=float, default=10, help='Длительность теста, секунд')
+        parser.add_argument('--anonymous', action='store_true', help='Без заголовка Authorization')
+
+    def handle(self, *args, **options):
+        check_target()
+        prefix = f'{BENCHMARK_USER_PREFIX}{uuid.uuid4().hex[:8]}_'
+        user, _, token = create_benchmark_user(prefix)
+        try:
+            self.run_load(options, user, token)
+        finally:
+            delete_benchmark_users(prefix)
+
+    def run_load(self, options, user, token):
+        target = urlsplit(options['url'])
+        path = options['path'].format(user_id=user.id)
+        headers = {} if options['anonymous'] else {'Authorization': f'Token {token}'}
+        deadline = time.perf_counter() + options['duration']
+
+        timings, statuses = [], Counter()
+        lock = threading.Lock()
+
+        def worker():
+            local_timings, local_statuses = [], Counter()
+            connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    local_statuses[response.status] += 1
+                    if response.getheader('Connection', '').lower() == 'close':
+                        connection.close()
+                except (OSError, http.client.HTTPException) as error:
+                    local_statuses[type(error).__name__] += 1
+                    connection.close()
+                local_timings.append((time.perf_counter() - start) * 1000)
+            connection.close()
+            with lock:
+                timings.extend(local_timings)
+                statuses.update(local_statuses)
+
+        self.stdout.write(f'GET {options["url"]}{path}: {options["concurrency"]} соединений, '
+                          f'{options["duration"]:.0f} с')
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        if not timings:
+            return
+        self.stdout.write(self.style.SUCCESS(f'{len(timings) / elapsed:.0f} запросов/с'))
+        self.stdout.write(
+            f'  среднее {statistics.mean(timings):.2f} мс | p50 {percentile(timings, 0.5):.2f} мс | '
+            f'p95 {percentile(timings, 0.95):.2f} мс | p99 {percentile(timings, 0.99):.2f} мс | '
+            f'статусы {dict(statuses)}'
+        )
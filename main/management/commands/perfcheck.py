@@ -0,0 +1,78 @@
+# main/management/commands/perfcheck.py
+"""
+Проверка развёртывания на известные проблемы производительности (main.checks).
+
+Выводит найденные проблемы с уровнями; код возврата 1, если есть проблемы
+не ниже --fail-level. --format json — для CI и мониторинга.
+
+    python manage.py perfcheck
+    python manage.py perfcheck --format json --fail-level ERROR
+"""
+import json
+
+from django.core import checks
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from main.checks import PERFORMANCE
+
+LEVELS = {
+    'DEBUG': checks.DEBUG,
+    'INFO': checks.INFO,
+    'WARNING': checks.WARNING,
+    'ERROR': checks.ERROR,
+    'CRITICAL': checks.CRITICAL,
+}
+LEVEL_NAMES = {level: name.lower() for name, level in LEVELS.items()}
+
+
+class Command(BaseCommand):
+    help = 'Проверяет настройки, схему БД и URL на проблемы производительности'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=('text', 'json'), default='text', help='Формат вывода')
+        parser.add_argument('--fail-level', choices=list(LEVELS), default='WARNING',
+                            help='Минимальный уровень, при котором команда завершается с ошибкой')
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='Проверить схему этих БД (по умолчанию — всех)')
+
+    def handle(self, *args, **options):
+        databases = options['databases'] or list(connections)
+        messages = checks.run_checks(tags=[PERFORMANCE], include_deployment_checks=True, databases=databases)
+        messages.sort(key=lambda message: (-message.level, message.id or ''))
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps([self.as_dict(message) for message in messages],
+                                         ensure_ascii=False, indent=2))
+        else:
+            self.write_text(messages)
+
+        fail_level = LEVELS[options['fail_level']]
+        failed = [message for message in messages if message.level >= fail_level]
+        if failed:
+            raise CommandError(f'Проблем уровня {options["fail_level"]} и выше: {len(failed)}')
+
+    @staticmethod
+    def as_dict(message):
+        return {
+            'id': message.id,
+            'level': LEVEL_NAMES.get(message.level, str(message.level)),
+            'object': str(message.obj) if message.obj is not None else None,
+            'message': message.msg,
+            'hint': message.hint,
+        }
+
+    def write_text(self, messages):
+        if not messages:
+            self.stdout.write(self.style.SUCCESS('Проблем производительности не найдено'))
+            return
+        styles = {
+            checks.CRITICAL: self.style.ERROR, checks.ERROR: self.style.ERROR,
+            checks.WARNING: self.style.WARNING,
+        }
+        for message in messages:
+            style = styles.get(message.level, str)
+            self.stdout.write(style(f'[{LEVEL_NAMES.get(message.level)}] {message.id} {message.obj}: {message.msg}'))
+            if message.hint:
+                self.stdout.write(f'    {message.hint}')
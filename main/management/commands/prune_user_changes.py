@@ -0,0 +1,18 @@
+"""
+Удаление старых записей журнала изменений пользователей пачками (main.maintenance).
+
+    python manage.py prune_user_changes --days 30 --max-batches 50
+"""
+from main.maintenance import BatchJobCommand, PruneUserChangesJob
+
+
+class Command(BatchJobCommand):
+    help = 'Удаляет записи журнала изменений пользователей старше заданного срока'
+    job_class = PruneUserChangesJob
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--days', type=int, help='Срок хранения, дней (MAINTENANCE["CHANGE_FEED_DAYS"])')
+
+    def get_job(self, options):
+        return self.job_class(days=options['days'], batch_size=options['batch_size'], sleep=options['sleep'])
@@ -0,0 +1,13 @@
+# main/management/commands/purge_sessions.py
+"""
+Удаление истёкших сессий из БД пачками (main.maintenance) — замена
+clearsessions, которая удаляет всё одним DELETE.
+
+    python manage.py purge_sessions --batch-size 5000 --sleep 0.2 -v 2
+"""
+from main.maintenance import BatchJobCommand, PurgeSessionsJob
+
+
+class Command(BatchJobCommand):
+    help = 'Удаляет истёкшие сессии пачками'
+    job_class = PurgeSessionsJob
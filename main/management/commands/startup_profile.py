@@ -0,0 +1,132 @@
+# main/management/commands/startup_profile.py
+"""
+Профилирование холодного старта WSGI-приложения.
+
+Каждый прогон — отдельный процесс `python -X importtime`, который по фазам
+замеряет загрузку настроек, django.setup() (готовность приложений), создание
+WSGI-обработчика и первые запросы. По выводу importtime строится рейтинг
+модулей и пакетов по времени импорта. По умолчанию сравниваются обычный
+режим и LEAN_STARTUP=True.
+
+    python manage.py startup_profile --runs 5 --top 15
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+PHASES = ('settings', 'apps_ready', 'wsgi_handler', 'first_request', 'total')
+
+# Выполняется в дочернем процессе; печатает JSON с длительностями фаз в мс
+PROFILE_SCRIPT = '''
+import io, json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DjangoUsersProject.settings')
+from django.conf import settings
+settings.INSTALLED_APPS
+after_settings = time.perf_counter()
+import django
+django.setup(set_prefix=False)
+after_setup = time.perf_counter()
+from django.core.handlers.wsgi import WSGIHandler
+handler = WSGIHandler()
+after_handler = time.perf_counter()
+settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'startup.local']
+requests = {}
+for path in sys.argv[1:]:
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'SERVER_NAME': 'startup.local',
+        'SERVER_PORT': '80', 'HTTP_HOST': 'startup.local', 'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(b''), 'wsgi.errors': sys.stderr,
+    }
+    request_start = time.perf_counter()
+    response = handler(environ, lambda status, headers, exc_info=None: None)
+    b''.join(response)
+    response.close()
+    requests[path] = (time.perf_counter() - request_start) * 1000
+end = time.perf_counter()
+first = next(iter(requests.values()), 0.0)
+print(json.dumps({
+    'settings': (after_settings - start) * 1000,
+    'apps_ready': (after_setup - after_settings) * 1000,
+    'wsgi_handler': (after_handler - after_setup) * 1000,
+    'first_request': first,
+    'total': (after_handler - start) * 1000 + first,
+    'requests': requests,
+}))
+'''
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$')
+
+
+def parse_importtime(stderr):
+    """Модули из вывода -X importtime: имя -> (собственное время, накопленное время), мкс"""
+    modules = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+class Command(BaseCommand):
+    help = 'Время импорта модулей и фаз холодного старта WSGI-приложения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Количество прогонов на режим (берётся медиана)')
+        parser.add_argument('--top', type=int, default=20, help='Сколько модулей и пакетов показать')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='URL первых запросов (по умолчанию /api/users/ и /)')
+        parser.add_argument('--mode', choices=('both', 'default', 'lean'), default='both',
+                            help='Какие режимы старта замерять')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/users/', '/']
+        modes = {'default': 'False', 'lean': 'True'}
+        if options['mode'] != 'both':
+            modes = {options['mode']: modes[options['mode']]}
+
+        results = {}
+        for mode, lean in modes.items():
+            runs = [self.profile_once(lean, paths) for _ in range(options['runs'])]
+            results[mode] = runs
+            self.report_phases(mode, [phases for phases, _ in runs], paths)
+
+        mode, runs = next(iter(results.items()))
+        self.report_imports(mode, runs[-1][1], options['top'])
+
+    def profile_once(self, lean, paths):
+        env = {**os.environ, 'LEAN_STARTUP': lean, 'PYTHONDONTWRITEBYTECODE': ''}
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROFILE_SCRIPT, *paths],
+            capture_output=True, text=True, env=env, check=True,
+        )
+        phases = json.loads(completed.stdout.strip().splitlines()[-1])
+        return phases, parse_importtime(completed.stderr)
+
+    def report_phases(self, mode, runs, paths):
+        self.stdout.write(self.style.SUCCESS(f'Режим {mode} (медиана {len(runs)} прогонов), мс'))
+        for phase in PHASES:
+            self.stdout.write(f'  {phase:<14} {statistics.median(run[phase] for run in runs):8.1f}')
+        for path in paths:
+            self.stdout.write(f'  GET {path:<10} {statistics.median(run["requests"][path] for run in runs):8.1f}')
+
+    def report_imports(self, mode, modules, top):
+        packages = defaultdict(int)
+        for name, (self_us, _) in modules.items():
+            packages[name.split('.')[0]] += self_us
+
+        self.stdout.write(self.style.SUCCESS(f'\nПакеты по суммарному времени импорта ({mode}), мс'))
+        for name, total_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {total_us / 1000:8.1f}  {name}')
+
+        self.stdout.write(self.style.SUCCESS(f'\nМодули по накопленному времени импорта ({mode}), мс'))
+        ranked = sorted(modules.items(), key=lambda item: -item[1][1])[:top]
+        for name, (self_us, cumulative_us) in ranked:
+            self.stdout.write(f'  {cumulative_us / 1000:8.1f}  (собственное {self_us / 1000:6.1f})  {name}')
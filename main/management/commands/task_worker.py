@@ -0,0 +1,59 @@
+# main/management/commands/task_worker.py
+"""
+Воркер очереди задач (main.task_queue, TASK_QUEUE["MODE"] = "db").
+
+Берёт готовые задачи пачками и выполняет их; когда очередь пуста, ждёт
+--poll-interval секунд. По SIGTERM/Ctrl+C дорабатывает текущую пачку и
+завершается. Воркеров можно запускать несколько — задача достаётся одному.
+
+    python manage.py task_worker
+    python manage.py task_worker --once          # выполнить накопленное и выйти
+    python manage.py task_worker --retry-failed  # вернуть в очередь упавшие задачи
+"""
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from main.task_queue import Worker, get_task_queue_config, retry_failed
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из таблицы очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Задач в пачке (по умолчанию TASK_QUEUE["BATCH_SIZE"])')
+        parser.add_argument('--poll-interval', type=float,
+                            help='Пауза при пустой очереди, секунд (по умолчанию TASK_QUEUE["POLL_INTERVAL"])')
+        parser.add_argument('--once', action='store_true', help='Выйти, когда очередь опустеет')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Вернуть задачи со статусом failed в очередь и выйти')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            self.stdout.write(f'Возвращено в очередь: {retry_failed()}')
+            return
+
+        config = get_task_queue_config()
+        poll_interval = options['poll_interval'] or config['POLL_INTERVAL']
+        worker = Worker(batch_size=options['batch_size'])
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *args: stop.set())
+
+        processed = 0
+        try:
+            while not stop.is_set():
+                count = worker.run_batch()
+                processed += count
+                if count and options['verbosity'] >= 2:
+                    self.stdout.write(f'  пачка: {count}, всего {processed}')
+                if not count:
+                    if options['once']:
+                        break
+                    close_old_connections()
+                    stop.wait(poll_interval)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Обработано задач: {processed}'))
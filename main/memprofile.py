@@ -0,0 +1,214 @@
+# main/memprofile.py
+"""
+Профилирование памяти воркеров на основе tracemalloc.
+
+Для каждого запроса дёшево учитывается прирост и пик отслеживаемой памяти
+по имени view. С частотой SAMPLE_RATE после запроса снимается снимок
+аллокаций и сравнивается с предыдущим снимком и с базовым (первым) —
+так видно, какие места кода растут со временем и после каких view.
+Отчёт доступен админам через API и пишется в файл по сигналу (SIGUSR2).
+
+tracemalloc считает память всего процесса: при нескольких потоках воркера
+(GUNICORN_THREADS > 1) прирост и пик запроса включают аллокации запросов,
+выполнявшихся одновременно с ним. Такие запросы учитываются в
+overlapped_requests — точными можно считать только цифры по остальным.
+"""
+import json
+import linecache
+import os
+import random
+import signal
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+def get_memprofile_config():
+    """Настройки профилировщика памяти с значениями по умолчанию"""
+    config = {
+        'ENABLED': False,
+        'SAMPLE_RATE': 0.01,
+        'FRAMES': 5,
+        'TOP': 20,
+        'DUMP_DIR': '.',
+        'SIGNAL': 'SIGUSR2',
+    }
+    config.update(getattr(settings, 'MEMORY_PROFILER', {}))
+    return config
+
+
+def _stat_to_dict(stat):
+    frame = stat.traceback[0]
+    return {
+        'site': f'{frame.filename}:{frame.lineno}',
+        'traceback': [f'{f.filename}:{f.lineno}' for f in stat.traceback],
+        'size_diff': stat.size_diff,
+        'size': stat.size,
+        'count_diff': stat.count_diff,
+        'count': stat.count,
+    }
+
+
+class MemoryProfiler:
+    """Состояние профилировщика в пределах процесса"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Запросы в работе и счётчик начатых: для пометки пересекающихся запросов
+        self.active = 0
+        self.started = 0
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+            self.recent_by_view = {}
+            self.baseline = None
+            self.last_snapshot = None
+            self.samples = 0
+
+    def start(self, frames):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def enter(self):
+        """Начало запроса; возвращает метку для leave()"""
+        with self.lock:
+            self.active += 1
+            self.started += 1
+            return self.started, self.active > 1
+
+    def leave(self, mark):
+        """Конец запроса: True, если в это время выполнялись другие запросы процесса"""
+        started, overlapped = mark
+        with self.lock:
+            self.active -= 1
+            return overlapped or self.active > 0 or self.started != started
+
+    def record(self, view, net_bytes, peak_bytes, overlapped=False):
+        """Дешёвый учёт каждого запроса: прирост и пик памяти на view"""
+        with self.lock:
+            stats = self.views.setdefault(view, {
+                'requests': 0, 'overlapped_requests': 0, 'net_bytes': 0, 'max_peak_bytes': 0,
+            })
+            stats['requests'] += 1
+            stats['overlapped_requests'] += overlapped
+            stats['net_bytes'] += net_bytes
+            stats['max_peak_bytes'] = max(stats['max_peak_bytes'], peak_bytes)
+
+    def sample(self, view, top):
+        """Снимок аллокаций после запроса к view и разница с предыдущим снимком"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        with self.lock:
+            previous = self.last_snapshot
+            if self.baseline is None:
+                self.baseline = snapshot
+            self.last_snapshot = snapshot
+            self.samples += 1
+        if previous is not None:
+            diff = snapshot.compare_to(previous, 'traceback')[:top]
+            with self.lock:
+                self.recent_by_view[view] = {
+                    'ts': time.time(),
+                    'top': [_stat_to_dict(stat) for stat in diff],
+                }
+
+    def report(self, top=20):
+        """Сводка: память процесса, статистика по view и рост с базового снимка"""
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self.lock:
+            baseline, last = self.baseline, self.last_snapshot
+            report = {
+                'pid': os.getpid(),
+                'tracing': tracemalloc.is_tracing(),
+                'traced_current_bytes': current,
+                'traced_peak_bytes': peak,
+                'samples': self.samples,
+                'views': dict(self.views),
+                'recent_by_view': dict(self.recent_by_view),
+            }
+        if baseline is not None and last is not None and baseline is not last:
+            report['growth_since_baseline'] = [
+                _stat_to_dict(stat) for stat in last.compare_to(baseline, 'traceback')[:top]
+            ]
+        else:
+            report['growth_since_baseline'] = []
+        return report
+
+    def dump(self, directory, top=20):
+        """Пишет отчёт в JSON-файл и возвращает путь к нему"""
+        path = os.path.join(directory, f'memprofile-{os.getpid()}-{int(time.time())}.json')
+        with open(path, 'w', encoding='utf-8') as dump_file:
+            json.dump(self.report(top), dump_file, ensure_ascii=False, indent=2)
+        return path
+
+
+profiler = MemoryProfiler()
+
+
+def install_signal_handler():
+    """
+    Дамп отчёта по сигналу (по умолчанию SIGUSR2). Вызывается из главного
+    потока процесса: в MainConfig.ready() и в хуке post_worker_init gunicorn.
+    """
+    config = get_memprofile_config()
+    if not config['ENABLED']:
+        return False
+    signum = getattr(signal, config['SIGNAL'], None)
+    if signum is None:
+        return False
+
+    def handler(signum, frame):
+        threading.Thread(
+            target=profiler.dump, args=(config['DUMP_DIR'], config['TOP']), daemon=True
+        ).start()
+
+    try:
+        signal.signal(signum, handler)
+    except ValueError:
+        # Не главный поток: сигнал установить нельзя, остаётся только API
+        return False
+    profiler.start(config['FRAMES'])
+    return True
+
+
+class MemoryProfilerMiddleware:
+    """Учитывает память по view и снимает снимки аллокаций с частотой SAMPLE_RATE"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_memprofile_config()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        profiler.start(self.config['FRAMES'])
+
+    def __call__(self, request):
+        if not tracemalloc.is_tracing():
+            return self.get_response(request)
+
+        mark = profiler.enter()
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            response = self.get_response(request)
+        finally:
+            overlapped = profiler.leave(mark)
+        after, peak = tracemalloc.get_traced_memory()
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None and match.view_name else request.path
+        profiler.record(view, after - before, max(peak - before, 0), overlapped)
+        if random.random() < self.config['SAMPLE_RATE']:
+            profiler.sample(view, self.config['TOP'])
+        return response
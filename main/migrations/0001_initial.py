@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_existing_users(apps, schema_editor):
+    """Существующие пользователи попадают в журнал, чтобы курсор 0 означал полную синхронизацию"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserChange = apps.get_model('main', 'UserChange')
+    user_ids = User.objects.order_by('id').values_list('id', flat=True)
+    UserChange.objects.bulk_create(
+        (UserChange(user_id=user_id, action='created') for user_id in user_ids.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('user_id', models.IntegerField(verbose_name='ID пользователя')),
+                ('action', models.CharField(choices=[('created', 'Создан'), ('updated', 'Изменён'), ('deactivated', 'Деактивирован'), ('deleted', 'Удалён')], max_length=16, verbose_name='Действие')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время изменения')),
+            ],
+            options={
+                'verbose_name': 'Изменение пользователя',
+                'verbose_name_plural': 'Изменения пользователей',
+            },
+        ),
+        migrations.RunPython(backfill_existing_users, migrations.RunPython.noop),
+    ]
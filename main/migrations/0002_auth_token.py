@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:14
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_drf_tokens(apps, schema_editor):
+    """Выданные ранее токены DRF продолжают работать: срок отсчитывается от миграции"""
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('main', 'AuthToken')
+    ttl = settings.AUTH_TOKEN_TTL
+    expires_at = timezone.now() + timedelta(seconds=ttl) if ttl else None
+    AuthToken.objects.bulk_create(
+        (AuthToken(key=token.key, user_id=token.user_id, created=token.created, expires_at=expires_at)
+         for token in Token.objects.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0001_initial'),
+        ('authtoken', '0003_tokenproxy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('device', models.CharField(blank=True, max_length=100, verbose_name='Устройство')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('expires_at', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Истекает')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Токен',
+                'verbose_name_plural': 'Токены',
+            },
+        ),
+        migrations.RunPython(copy_drf_tokens, migrations.RunPython.noop),
+    ]
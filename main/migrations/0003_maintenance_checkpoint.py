@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_auth_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceCheckpoint',
+            fields=[
+                ('job', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Задача')),
+                ('last_pk', models.CharField(max_length=255, verbose_name='Последний ключ')),
+                ('processed', models.BigIntegerField(default=0, verbose_name='Обработано')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Начата')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлена')),
+            ],
+            options={
+                'verbose_name': 'Позиция задачи обслуживания',
+                'verbose_name_plural': 'Позиции задач обслуживания',
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations
+
+# Индексы таблицы auth_user для админки и задач обслуживания.
+# Поиск в админке: username — по началу строки без учёта регистра (^username),
+# email — точное совпадение без учёта регистра (=email).
+# В PostgreSQL индексы строятся CONCURRENTLY, вне транзакции: запись в большую
+# таблицу пользователей не блокируется на время построения.
+POSTGRESQL_INDEXES = {
+    'main_user_username_upper_idx': 'UPPER(username::text) text_pattern_ops',
+    'main_user_email_upper_idx': 'UPPER(email::text)',
+    'main_user_last_login_idx': 'last_login',
+    'main_user_date_joined_idx': 'date_joined',
+}
+
+# В SQLite LIKE без учёта регистра использует индекс только с COLLATE NOCASE
+SQLITE_INDEXES = {
+    'main_user_username_nocase_idx': 'username COLLATE NOCASE',
+    'main_user_email_nocase_idx': 'email COLLATE NOCASE',
+    'main_user_last_login_idx': 'last_login',
+    'main_user_date_joined_idx': 'date_joined',
+}
+
+OTHER_INDEXES = {
+    'main_user_email_idx': 'email',
+    'main_user_last_login_idx': 'last_login',
+    'main_user_date_joined_idx': 'date_joined',
+}
+
+
+def vendor_indexes(schema_editor):
+    return {
+        'postgresql': POSTGRESQL_INDEXES,
+        'sqlite': SQLITE_INDEXES,
+    }.get(schema_editor.connection.vendor, OTHER_INDEXES)
+
+
+def is_invalid_index(schema_editor, name):
+    """Недостроенный индекс, оставшийся от прерванного CREATE INDEX CONCURRENTLY"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT NOT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid '
+            'WHERE c.relname = %s', [name],
+        )
+        row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def create_indexes(apps, schema_editor):
+    table = schema_editor.quote_name('auth_user')
+    postgresql = schema_editor.connection.vendor == 'postgresql'
+    for name, expression in vendor_indexes(schema_editor).items():
+        quoted = schema_editor.quote_name(name)
+        if not postgresql:
+            schema_editor.execute(f'CREATE INDEX {quoted} ON {table} ({expression})')
+            continue
+        if is_invalid_index(schema_editor, name):
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY {quoted}')
+        schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {quoted} ON {table} ({expression})')
+
+
+def drop_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for name in vendor_indexes(schema_editor):
+        quoted = schema_editor.quote_name(name)
+        if vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {quoted}')
+        else:
+            schema_editor.execute(f'DROP INDEX {quoted}' + (' ON auth_user' if vendor == 'mysql' else ''))
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY не выполняется внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ('main', '0003_maintenance_checkpoint'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_duplicate_device_tokens(apps, schema_editor):
+    """Раньше каждый вход создавал токен: для устройства остаётся самый свежий"""
+    AuthToken = apps.get_model('main', 'AuthToken')
+    rows = AuthToken.objects.order_by('user_id', 'device', '-created').values_list('key', 'user_id', 'device')
+    seen, stale = set(), []
+    for key, user_id, device in rows.iterator(chunk_size=5000):
+        if (user_id, device) in seen:
+            stale.append(key)
+        else:
+            seen.add((user_id, device))
+    for start in range(0, len(stale), 1000):
+        AuthToken.objects.filter(key__in=stale[start:start + 1000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_task_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_device_tokens, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='authtoken',
+            constraint=models.UniqueConstraint(fields=('user', 'device'), name='main_authtoken_user_device_uniq'),
+        ),
+    ]
@@ -1,3 +1,197 @@
-from django.db import models
+import binascii
+import os
+from datetime import timedelta
 
-# Create your models here.
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+
+class UserChange(models.Model):
+    """
+    Журнал изменений пользователей для инкрементальной синхронизации.
+
+    id — монотонная последовательность: клиент хранит последний полученный id
+    как курсор и запрашивает только более поздние изменения.
+    Пользователь хранится числом, а не внешним ключом: записи об удалённых
+    пользователях остаются в журнале.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DEACTIVATED = 'deactivated'
+    DELETED = 'deleted'
+    ACTION_CHOICES = [
+        (CREATED, 'Создан'),
+        (UPDATED, 'Изменён'),
+        (DEACTIVATED, 'Деактивирован'),
+        (DELETED, 'Удалён'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    user_id = models.IntegerField('ID пользователя')
+    action = models.CharField('Действие', max_length=16, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField('Время изменения', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Изменение пользователя'
+        verbose_name_plural = 'Изменения пользователей'
+
+    def __str__(self):
+        return f'#{self.id} {self.action} user={self.user_id}'
+
+    @classmethod
+    def record(cls, user_ids, action):
+        """Запись изменений пачкой — для массовых update(), которые не шлют сигналы"""
+        cls.objects.bulk_create([cls(user_id=user_id, action=action) for user_id in user_ids])
+
+
+class AuthTokenManager(models.Manager):
+
+    def issue(self, user, device=''):
+        """
+        Новый токен для устройства. Прежний токен этого же устройства
+        заменяется (повторный вход не занимает новое место и не вытесняет
+        токены других устройств). Старые токены пользователя сверх
+        AUTH_TOKEN_MAX_PER_USER удаляются, начиная с самых давних.
+        """
+        device = device[:100]
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    self.filter(user=user, device=device).delete()
+                    token = self.create(user=user, device=device)
+                break
+            except IntegrityError:
+                # Параллельный вход с того же устройства успел создать свой токен:
+                # заменяем и его, побеждает последний вход
+                if attempt:
+                    raise
+        limit = settings.AUTH_TOKEN_MAX_PER_USER
+        if limit:
+            stale = self.filter(user=user).order_by('-created').values_list('key', flat=True)[limit:]
+            stale = list(stale)
+            if stale:
+                self.filter(key__in=stale).delete()
+        return token
+
+
+class AuthToken(models.Model):
+    """
+    Токен API для одного устройства пользователя.
+
+    В отличие от rest_framework.authtoken.Token у пользователя может быть
+    несколько токенов, и у каждого есть срок действия (AUTH_TOKEN_TTL), который
+    продлевается при использовании (AUTH_TOKEN_SLIDING). Поиск — по первичному ключу.
+    На одно устройство (user, device) — один токен.
+    """
+    key = models.CharField('Ключ', max_length=40, primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='auth_tokens',
+        on_delete=models.CASCADE, verbose_name='Пользователь',
+    )
+    device = models.CharField('Устройство', max_length=100, blank=True)
+    created = models.DateTimeField('Создан', auto_now_add=True)
+    expires_at = models.DateTimeField('Истекает', null=True, blank=True, db_index=True)
+
+    objects = AuthTokenManager()
+
+    class Meta:
+        verbose_name = 'Токен'
+        verbose_name_plural = 'Токены'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'device'], name='main_authtoken_user_device_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.device or self.key[:8]}'
+
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = self.generate_key()
+        if self.expires_at is None and self._state.adding:
+            self.expires_at = self.expiry_from(timezone.now())
+        return super().save(*args, **kwargs)
+
+    @staticmethod
+    def generate_key():
+        return binascii.hexlify(os.urandom(20)).decode()
+
+    @staticmethod
+    def expiry_from(now):
+        """Срок действия токена, выданного или продлённого в момент now (None — бессрочно)"""
+        ttl = settings.AUTH_TOKEN_TTL
+        return now + timedelta(seconds=ttl) if ttl else None
+
+    def is_expired(self, now):
+        return self.expires_at is not None and self.expires_at <= now
+
+    def needs_renewal(self, now):
+        """Продление не чаще, чем раз в половину срока: иначе запись в БД на каждый запрос"""
+        ttl = settings.AUTH_TOKEN_TTL
+        return (settings.AUTH_TOKEN_SLIDING and ttl and self.expires_at is not None
+                and (self.expires_at - now).total_seconds() < ttl / 2)
+
+    def renew(self, now):
+        self.expires_at = self.expiry_from(now)
+        AuthToken.objects.filter(key=self.key).update(expires_at=self.expires_at)
+
+
+class MaintenanceCheckpoint(models.Model):
+    """
+    Позиция незавершённой задачи обслуживания (main.maintenance).
+
+    Пачки обрабатываются по возрастанию первичного ключа; после каждой пачки
+    здесь сохраняется последний обработанный ключ, и прерванный запуск
+    продолжается с него. Запись удаляется, когда задача дошла до конца.
+    """
+    job = models.CharField('Задача', max_length=64, primary_key=True)
+    last_pk = models.CharField('Последний ключ', max_length=255)
+    processed = models.BigIntegerField('Обработано', default=0)
+    started_at = models.DateTimeField('Начата', auto_now_add=True)
+    updated_at = models.DateTimeField('Обновлена', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Позиция задачи обслуживания'
+        verbose_name_plural = 'Позиции задач обслуживания'
+
+    def __str__(self):
+        return f'{self.job}: {self.last_pk} ({self.processed})'
+
+
+class Task(models.Model):
+    """
+    Отложенная задача очереди main.task_queue (режим db).
+
+    Строка вставляется в транзакции запроса и становится видна воркеру
+    (manage.py task_worker) только после её фиксации. Воркер захватывает
+    задачу на LEASE секунд (status=running, locked_until); задача упавшего
+    воркера после истечения захвата выполняется снова.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField('Задача', max_length=200)
+    kwargs = models.JSONField('Аргументы', default=dict)
+    status = models.CharField('Статус', max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Максимум попыток', default=3)
+    run_after = models.DateTimeField('Не раньше', default=timezone.now)
+    locked_until = models.DateTimeField('Захвачена до', null=True, blank=True)
+    claim = models.CharField('Захват', max_length=32, blank=True, db_index=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [models.Index(fields=['status', 'run_after'], name='main_task_due_idx')]
+
+    def __str__(self):
+        return f'#{self.id} {self.name} ({self.status})'
@@ -0,0 +1,78 @@
+# main/page_cache.py
+"""
+Кеш целых HTML-страниц для анонимных посетителей.
+
+Страница кешируется по пути и языку только для GET/HEAD без query string
+и без cookie сессии и сообщений: такой запрос заведомо анонимный, и для
+ответа из кеша не нужно ни загружать сессию, ни обращаться к request.user.
+Из сохранённой копии CSRF-токен формы вырезается и при каждой отдаче
+подставляется свежий токен текущего посетителя (в cookie, без сессии).
+Кешируются только ответы 200: редиректы login_required и ошибки
+всегда формируются заново. Запросы с параметрами (/?x=1, /?x=2, ...)
+не кешируются: иначе любой посетитель мог бы заполнить общий кеш
+произвольными ключами и вытеснить из него сессии и блокировки.
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_vary_headers
+from django.utils.translation import get_language
+
+CSRF_PLACEHOLDER = b'__csrf_token__'
+_CSRF_INPUT = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def _cache_key(request):
+    path = hashlib.md5(request.path.encode()).hexdigest()
+    return f'page:{get_language()}:{path}'
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD') or request.GET:
+        return False
+    cookies = request.COOKIES
+    return settings.SESSION_COOKIE_NAME not in cookies and CookieStorage.cookie_name not in cookies
+
+
+def _build_response(content, content_type, request, state):
+    if CSRF_PLACEHOLDER in content:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request).encode())
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = state
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def cache_anonymous_page(view_func):
+    """Декоратор view: анонимные GET-запросы отдаются из кеша страниц"""
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        timeout = settings.PAGE_CACHE_TIMEOUT
+        if not timeout or not _is_cacheable_request(request):
+            return view_func(request, *args, **kwargs)
+
+        key = _cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            return _build_response(*cached, request, 'hit')
+
+        response = view_func(request, *args, **kwargs)
+        if (response.status_code != 200 or response.streaming
+                or response.has_header('Set-Cookie') or response.cookies):
+            return response
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        content = _CSRF_INPUT.sub(rb'\1' + CSRF_PLACEHOLDER + rb'\2', response.content)
+        cache.set(key, (content, response['Content-Type']), timeout)
+        response['X-Page-Cache'] = 'miss'
+        patch_vary_headers(response, ['Cookie'])
+        return response
+
+    return wrapper
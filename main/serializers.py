@@ -2,15 +2,17 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
+from .tracing import TracedListSerializer, TracedSerializerMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для просмотра информации о пользователе"""
 
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'date_joined', 'last_login']
         read_only_fields = ['id', 'date_joined', 'last_login']
+        list_serializer_class = TracedListSerializer
 
 
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -64,13 +66,14 @@ class ChangePasswordSerializer(serializers.Serializer):
         return attrs
 
 
-class UserListSerializer(serializers.ModelSerializer):
+class UserListSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     """Упрощенный сериализатор для списка пользователей (только id и username)"""
     class Meta:
         model = User
         fields = ['id', 'username']  # Только ID и имя пользователя
+        list_serializer_class = TracedListSerializer
 
-class UserDetailSerializer(serializers.ModelSerializer):
+class UserDetailSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     """Детальный сериализатор для информации о пользователе по ID"""
     class Meta:
         model = User
@@ -0,0 +1,212 @@
+# main/sessions.py
+"""
+Движок сессий: общий кеш с отложенной записью в БД (SESSION_ENGINE = 'main.sessions').
+
+Сессия читается и пишется в общий уровень кеша (SESSION_CACHE_ALIAS), а в
+таблицу django_session изменения попадают фоновым потоком: раз в
+FLUSH_INTERVAL все накопленные изменения пишутся одной транзакцией, повторные
+изменения одной сессии схлопываются в одно. Запрос не ждёт записи в БД;
+таблица остаётся запасным хранилищем на случай вытеснения из кеша.
+Удаление (выход, cycle_key) не откладывается: строка удаляется из БД сразу,
+а в общем кеше на SESSION_COOKIE_AGE остаётся отметка об удалении. Её
+проверяет чтение в любом воркере, поэтому сессия не «оживает» ни из БД, ни
+из ещё не записанного изменения другого воркера. При аварийном завершении
+процесса теряются изменения не более чем за FLUSH_INTERVAL — только в БД,
+в кеше они уже есть.
+
+Неизменённые сессии не сохраняются вовсе (SESSION_SAVE_EVERY_REQUEST=False).
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError, UpdateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.db import DatabaseError, close_old_connections, router, transaction
+
+logger = logging.getLogger(__name__)
+
+DELETED = object()
+MISSING = object()
+
+# Отметка об удалённой сессии в общем кеше: ключ сессии + суффикс
+TOMBSTONE_SUFFIX = ':deleted'
+
+
+def get_write_behind_config():
+    """Настройки отложенной записи с значениями по умолчанию"""
+    config = {
+        'ENABLED': True,
+        'FLUSH_INTERVAL': 0.5,
+        'MAX_PENDING': 5000,
+    }
+    config.update(getattr(settings, 'SESSION_WRITE_BEHIND', {}))
+    return config
+
+
+class SessionWriter:
+    """
+    Накопитель изменений сессий: ключ -> (данные, срок) или DELETED.
+    Пишет в БД фоновым потоком (background=True) или по вызову flush().
+    """
+
+    def __init__(self, flush_interval, max_pending, background=True):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.background = background
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._inflight = {}
+        self._pid = None
+
+    def _ensure_started(self):
+        # После fork поток писателя не наследуется: запускаем свой в каждом процессе
+        if not self.background or self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._pending, self._inflight = {}, {}
+        threading.Thread(target=self._run, name='session-writer', daemon=True).start()
+
+    def enqueue(self, session_key, value):
+        with self._condition:
+            self._ensure_started()
+            self._pending[session_key] = value
+            if len(self._pending) >= self.max_pending:
+                self._condition.notify()
+
+    def pending(self, session_key):
+        """Ещё не записанное в БД изменение сессии или MISSING"""
+        with self._condition:
+            value = self._pending.get(session_key, MISSING)
+            if value is MISSING:
+                value = self._inflight.get(session_key, MISSING)
+            return value
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait(self.flush_interval)
+            self.flush()
+            close_old_connections()
+
+    def flush(self):
+        with self._condition:
+            batch, self._pending = self._pending, {}
+            self._inflight = batch
+        if not batch:
+            return
+        try:
+            self._write(batch)
+        except DatabaseError:
+            logger.exception('Ошибка записи %d сессий в БД, повтор при следующем сбросе', len(batch))
+            with self._condition:
+                for session_key, value in batch.items():
+                    self._pending.setdefault(session_key, value)
+        finally:
+            with self._condition:
+                self._inflight = {}
+
+    @staticmethod
+    def _write(batch):
+        model = DBStore.get_model_class()
+        using = router.db_for_write(model)
+        saves = [
+            model(session_key=session_key, session_data=value[0], expire_date=value[1])
+            for session_key, value in batch.items() if value is not DELETED
+        ]
+        deletes = [session_key for session_key, value in batch.items() if value is DELETED]
+        with transaction.atomic(using=using):
+            if saves:
+                model.objects.using(using).bulk_create(
+                    saves, update_conflicts=True, unique_fields=['session_key'],
+                    update_fields=['session_data', 'expire_date'],
+                )
+            if deletes:
+                model.objects.using(using).filter(session_key__in=deletes).delete()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                config = get_write_behind_config()
+                _writer = SessionWriter(config['FLUSH_INTERVAL'], config['MAX_PENDING'])
+                atexit.register(_writer.flush)
+    return _writer
+
+
+class SessionStore(CachedDBStore):
+    """Сессии в общем кеше; запись в БД — отложенная (или сразу, если ENABLED=False)"""
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._write_behind = get_write_behind_config()['ENABLED']
+
+    def _tombstone_key(self, session_key):
+        return self.cache_key_prefix + session_key + TOMBSTONE_SUFFIX
+
+    def load(self):
+        if self._write_behind and self.session_key is not None:
+            pending = get_writer().pending(self.session_key)
+            if pending is DELETED:
+                return {}
+            # Значение и отметка об удалении — одним обращением к кешу
+            tombstone_key = self._tombstone_key(self.session_key)
+            cached = self._cache.get_many([self.cache_key, tombstone_key])
+            if tombstone_key in cached:
+                return {}
+            if self.cache_key in cached:
+                return cached[self.cache_key]
+            if pending is not MISSING:
+                return self.decode(pending[0])
+        return super().load()
+
+    def _is_known(self, session_key):
+        pending = get_writer().pending(session_key)
+        if pending is not MISSING:
+            return pending is not DELETED
+        cached = self._cache.get_many([self.cache_key_prefix + session_key, self._tombstone_key(session_key)])
+        if self._tombstone_key(session_key) in cached:
+            return False
+        return bool(cached) or DBStore.exists(self, session_key)
+
+    def save(self, must_create=False):
+        if not self._write_behind:
+            return super().save(must_create)
+        if self.session_key is None:
+            return self.create()
+
+        data = self._get_session(no_load=must_create)
+        expiry_age = self.get_expiry_age()
+        if must_create:
+            if not self._cache.add(self.cache_key, data, expiry_age):
+                raise CreateError
+        else:
+            # Сессию удалили (выход в другой вкладке) — как UpdateError в движке БД
+            if not self._is_known(self.session_key):
+                raise UpdateError
+            self._cache.set(self.cache_key, data, expiry_age)
+        get_writer().enqueue(self.session_key, (self.encode(data), self.get_expiry_date()))
+
+    def delete(self, session_key=None):
+        if not self._write_behind:
+            return super().delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        # Отметка — до удаления из кеша и БД: параллельное чтение в другом воркере
+        # не вернёт сессию в кеш из ещё не удалённой строки
+        self._cache.set(self._tombstone_key(session_key), True, settings.SESSION_COOKIE_AGE)
+        self._cache.delete(self.cache_key_prefix + session_key)
+        # Несохранённое изменение этой сессии в своём процессе отменяется
+        get_writer().enqueue(session_key, DELETED)
+        DBStore.delete(self, session_key)
@@ -0,0 +1,66 @@
+# main/signals.py
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .availability import availability_index
+from .cache import USER_FULL_LIST_TAG, USER_LIST_TAG, token_tag, user_tag
+from .events import notify_broadcasters
+from .models import AuthToken, UserChange
+
+# Поля, которые не попадают в упрощённый список пользователей
+LIST_IRRELEVANT_FIELDS = {'last_login', 'password'}
+
+# Поля, изменение которых не публикуется в журнал изменений
+FEED_IRRELEVANT_FIELDS = {'last_login'}
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_cache(sender, instance, update_fields=None, **kwargs):
+    """Сброс кеша пользователя и списков после сохранения"""
+    tags = [user_tag(instance.pk), USER_FULL_LIST_TAG]
+    if update_fields is None or not set(update_fields) <= LIST_IRRELEVANT_FIELDS:
+        tags.append(USER_LIST_TAG)
+    cache.invalidate_tags(*tags)
+
+
+@receiver(post_save, sender=User)
+def update_availability_index(sender, instance, update_fields=None, **kwargs):
+    """Новые username и email сразу видны проверке занятости в этом процессе"""
+    if update_fields is None or {'username', 'email'} & set(update_fields):
+        availability_index.add(instance.username, instance.email)
+
+
+@receiver(post_save, sender=User)
+def record_user_change(sender, instance, created, update_fields=None, **kwargs):
+    """Запись в журнал изменений: регистрация, профиль (API и сайт), админка"""
+    if update_fields is not None and set(update_fields) <= FEED_IRRELEVANT_FIELDS:
+        return
+    if created:
+        action = UserChange.CREATED
+    elif not instance.is_active:
+        action = UserChange.DEACTIVATED
+    else:
+        action = UserChange.UPDATED
+    UserChange.objects.create(user_id=instance.pk, action=action)
+    # Подписчики SSE в этом процессе получают событие без ожидания очередного опроса
+    transaction.on_commit(notify_broadcasters)
+
+
+@receiver(post_delete, sender=User)
+def record_user_deletion(sender, instance, **kwargs):
+    UserChange.objects.create(user_id=instance.pk, action=UserChange.DELETED)
+    transaction.on_commit(notify_broadcasters)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_cache(sender, instance, **kwargs):
+    cache.invalidate_tags(user_tag(instance.pk), USER_LIST_TAG, USER_FULL_LIST_TAG)
+
+
+@receiver(post_delete, sender=AuthToken)
+def invalidate_token_cache(sender, instance, **kwargs):
+    """Удалённый токен сразу перестаёт приниматься из кеша"""
+    cache.invalidate_tags(token_tag(instance.key))
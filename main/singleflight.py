@@ -0,0 +1,55 @@
+# main/singleflight.py
+"""
+Объединение одинаковых параллельных вызовов (single-flight).
+
+Пока первый поток вычисляет значение по ключу, остальные потоки с тем же
+ключом не начинают свою работу, а ждут и получают его результат (или его
+исключение). Работает в пределах процесса; между воркерами вызовы
+объединяет блокировка в общем кеше (main.cache.TieredCache.get_or_set).
+"""
+import threading
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Группа вызовов, объединяемых по ключу"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        Вызывает fn() один раз на все параллельные вызовы с ключом key.
+        Возвращает (результат, shared); shared=True у потоков, получивших чужой результат.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
@@ -0,0 +1,145 @@
+# main/slowlog.py
+"""
+Журнал медленных запросов.
+
+Для каждого запроса собираются SQL, параметры, время и место вызова
+(первый кадр стека из кода проекта). Если запрос обрабатывался дольше
+порога THRESHOLD_MS, всё собранное пишется в JSONL-файл с ротацией
+фоновым потоком. Работает без DEBUG и покрывает и API, и HTML-страницы.
+"""
+import os
+import re
+import sys
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .jsonlog import get_writer
+
+# Значения, похожие на хеши паролей, ключи токенов и сессий, в журнал не попадают
+REDACT_PATTERNS = [
+    re.compile(r'^[a-z0-9_]+\$\d+\$'),
+    re.compile(r'^[0-9a-f]{40}$'),
+    re.compile(r'^[a-z0-9]{32}$'),
+]
+
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def get_slowlog_config():
+    """Настройки журнала медленных запросов с значениями по умолчанию"""
+    config = {
+        'ENABLED': False,
+        'THRESHOLD_MS': 500,
+        'FILE': 'slow_requests.jsonl',
+        'MAX_BYTES': 10 * 1024 * 1024,
+        'BACKUP_COUNT': 5,
+        'MAX_QUERIES': 100,
+        'MAX_PARAM_LENGTH': 200,
+    }
+    config.update(getattr(settings, 'SLOW_REQUEST_LOG', {}))
+    return config
+
+
+def _origin():
+    """Первый кадр стека из кода проекта (не Django и не сторонние пакеты)"""
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(base_dir) and filename != _THIS_FILE
+                and 'site-packages' not in filename):
+            return f'{os.path.relpath(filename, base_dir)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def _format_param(value, max_length):
+    if isinstance(value, str):
+        if any(pattern.match(value) for pattern in REDACT_PATTERNS):
+            return '<redacted>'
+        return value[:max_length]
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    return repr(value)[:max_length]
+
+
+class QueryCollector:
+    """execute_wrapper, запоминающий запросы текущего HTTP-запроса"""
+
+    def __init__(self, max_queries, max_param_length):
+        self.max_queries = max_queries
+        self.max_param_length = max_param_length
+        self.queries = []
+        self.total = 0
+        self.total_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.total += 1
+            self.total_ms += duration_ms
+            if len(self.queries) < self.max_queries:
+                self.queries.append({
+                    'sql': sql,
+                    'params': self._params(params, many),
+                    'ms': round(duration_ms, 3),
+                    'origin': _origin(),
+                    'alias': context['connection'].alias,
+                })
+
+    def _params(self, params, many):
+        if params is None:
+            return None
+        if many:
+            return f'<executemany: {len(params)} rows>' if hasattr(params, '__len__') else '<executemany>'
+        if isinstance(params, dict):
+            return {key: _format_param(value, self.max_param_length) for key, value in params.items()}
+        return [_format_param(value, self.max_param_length) for value in params]
+
+
+class SlowRequestMiddleware:
+    """Пишет в журнал запросы, обработка которых заняла больше THRESHOLD_MS"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_slowlog_config()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.writer = get_writer(
+            self.config['FILE'],
+            max_bytes=self.config['MAX_BYTES'],
+            backup_count=self.config['BACKUP_COUNT'],
+        )
+
+    def __call__(self, request):
+        collector = QueryCollector(self.config['MAX_QUERIES'], self.config['MAX_PARAM_LENGTH'])
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(collector))
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        if duration_ms >= self.config['THRESHOLD_MS']:
+            user = getattr(request, 'user', None)
+            self.writer.write({
+                'ts': time.time(),
+                'method': request.method,
+                'path': request.path,
+                'query_string': request.META.get('QUERY_STRING', ''),
+                'status': response.status_code,
+                'user_id': user.pk if user is not None and user.is_authenticated else None,
+                'duration_ms': round(duration_ms, 3),
+                'db_ms': round(collector.total_ms, 3),
+                'query_count': collector.total,
+                'queries_truncated': collector.total - len(collector.queries),
+                'queries': collector.queries,
+            })
+        return response
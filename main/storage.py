@@ -0,0 +1,49 @@
+# main/storage.py
+"""
+Хранилище статики для продакшена.
+
+collectstatic копирует файлы в STATIC_ROOT, минифицирует CSS проекта
+(из STATICFILES_DIRS), затем WhiteNoise добавляет к именам хеш содержимого,
+пишет манифест и готовит сжатые копии (.gz, .br при установленном brotli).
+Файлы с хешем в имени отдаются с Cache-Control на год (immutable).
+"""
+import re
+from pathlib import Path
+
+from django.conf import settings
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_STRING = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+_CSS_SPACES = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_CSS_COLON = re.compile(r':\s+')
+
+
+def minify_css(css):
+    """Удаляет комментарии и лишние пробелы; строки в кавычках не меняются"""
+    parts = _CSS_STRING.split(_CSS_COMMENT.sub('', css))
+    for index in range(0, len(parts), 2):
+        part = _CSS_SPACES.sub(' ', parts[index])
+        part = _CSS_PUNCTUATION.sub(r'\1', part)
+        parts[index] = _CSS_COLON.sub(':', part).replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+class MinifiedStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """Манифест с хешами и сжатые копии; CSS проекта минифицируется до хеширования"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = dict(paths)
+            project_dirs = {Path(directory).resolve() for directory in settings.STATICFILES_DIRS}
+            for name, (storage, path) in paths.items():
+                if name.endswith('.css') and Path(storage.location).resolve() in project_dirs:
+                    self.minify(name)
+                    # Хеш и сжатые копии считаются по минифицированной копии, а не по исходнику
+                    paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def minify(self, name):
+        target = Path(self.path(name))
+        target.write_text(minify_css(target.read_text(encoding='utf-8')), encoding='utf-8')
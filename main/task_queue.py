@@ -0,0 +1,293 @@
+# main/task_queue.py
+"""
+Очередь фоновых задач для работы, которую запрос может не ждать: письма,
+записи журнала аудита, прогрев кеша.
+
+Задача — функция с декоратором @task, view ставит её в очередь вызовом
+func.enqueue(**kwargs); аргументы должны сериализоваться в JSON (ID, а не
+объекты моделей). Режим выполнения — TASK_QUEUE["MODE"]:
+
+- db — строка main.models.Task вставляется в текущей транзакции: задача
+  появится, только если транзакция зафиксирована, и переживёт перезапуск.
+  Выполняет её отдельный процесс manage.py task_worker.
+- thread — пул из THREADS потоков в процессе веб-сервера, задача попадает
+  в него после фиксации транзакции (transaction.on_commit). Для установки
+  на одном узле без отдельного воркера; невыполненные задачи теряются при
+  остановке процесса.
+- sync — выполнение после фиксации транзакции в том же потоке (тесты, отладка).
+
+Упавшая задача повторяется до max_attempts раз (MAX_ATTEMPTS) с паузой
+RETRY_DELAY * 2**(n-1) секунд после n-й попытки. Воркер берёт задачи пачками
+по BATCH_SIZE; задача с batched=True получает список аргументов всех своих
+задач пачки одним вызовом.
+"""
+import json
+import logging
+import os
+import threading
+import traceback
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import update_wrapper
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+MODES = ('db', 'thread', 'sync')
+
+_registry = {}
+
+
+def get_task_queue_config():
+    """Настройки очереди задач с значениями по умолчанию"""
+    config = {
+        'MODE': 'thread',
+        'THREADS': 2,
+        'BATCH_SIZE': 100,
+        'POLL_INTERVAL': 1.0,
+        'LEASE': 300,
+        'MAX_ATTEMPTS': 3,
+        'RETRY_DELAY': 10.0,
+    }
+    config.update(getattr(settings, 'TASK_QUEUE', {}))
+    return config
+
+
+def retry_delay(attempt, config=None):
+    """Пауза перед повтором после попытки attempt: экспоненциальный рост"""
+    config = config or get_task_queue_config()
+    return config['RETRY_DELAY'] * 2 ** (attempt - 1)
+
+
+class TaskFunction:
+    """Функция-задача: обычный вызов выполняет её сразу, enqueue() — в фоне"""
+
+    def __init__(self, func, max_attempts=None, batched=False):
+        update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.batched = batched
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<task {self.name}>'
+
+    def run(self, kwargs_list):
+        """Выполнение задач с аргументами kwargs_list: одним вызовом, если batched"""
+        if self.batched:
+            self.func(kwargs_list)
+        else:
+            for kwargs in kwargs_list:
+                self.func(**kwargs)
+
+    def enqueue(self, **kwargs):
+        return enqueue(self, kwargs)
+
+
+def task(func=None, *, max_attempts=None, batched=False):
+    """
+    Декоратор задачи: @task или @task(max_attempts=5, batched=True).
+    Функция batched-задачи принимает список словарей аргументов.
+    """
+    def decorator(func):
+        task_func = TaskFunction(func, max_attempts=max_attempts, batched=batched)
+        _registry[task_func.name] = task_func
+        return task_func
+
+    return decorator(func) if func is not None else decorator
+
+
+def get_task(name):
+    """Задача по имени; модуль задачи импортируется, если ещё не загружен"""
+    if name not in _registry:
+        import_string(name)
+    return _registry[name]
+
+
+def enqueue(task_func, kwargs):
+    """
+    Постановка задачи в очередь с учётом текущей транзакции.
+    В режиме db возвращает созданную строку Task, в остальных — None.
+    """
+    config = get_task_queue_config()
+    mode = config['MODE']
+    if mode not in MODES:
+        raise ValueError(f'TASK_QUEUE["MODE"] должен быть одним из {MODES}, а не {mode!r}')
+    # Аргументы проходят через JSON во всех режимах: задача, работающая в sync,
+    # не сломается при переходе на db
+    kwargs = json.loads(json.dumps(kwargs, cls=DjangoJSONEncoder))
+    max_attempts = task_func.max_attempts or config['MAX_ATTEMPTS']
+
+    if mode == 'db':
+        return Task.objects.create(name=task_func.name, kwargs=kwargs, max_attempts=max_attempts)
+    if mode == 'thread':
+        transaction.on_commit(lambda: thread_runner.submit(task_func, kwargs, max_attempts))
+    else:
+        transaction.on_commit(lambda: run_with_retries(task_func, kwargs, max_attempts))
+    return None
+
+
+def run_with_retries(task_func, kwargs, max_attempts):
+    """Режим sync: повторы сразу, без пауз; ошибка после последней попытки только пишется в лог"""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            task_func.run([kwargs])
+            return True
+        except Exception:
+            logger.exception('Задача %s: попытка %s из %s завершилась ошибкой',
+                             task_func.name, attempt, max_attempts)
+    return False
+
+
+class ThreadRunner:
+    """Пул потоков процесса для режима thread; после fork создаётся заново"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=get_task_queue_config()['THREADS'], thread_name_prefix='task',
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, task_func, kwargs, max_attempts, attempt=1):
+        return self._get_executor().submit(self._run, task_func, kwargs, max_attempts, attempt)
+
+    def _run(self, task_func, kwargs, max_attempts, attempt):
+        # Соединения с БД в потоках пула живут по тем же правилам, что в запросах
+        close_old_connections()
+        try:
+            task_func.run([kwargs])
+        except Exception:
+            if attempt >= max_attempts:
+                logger.exception('Задача %s не выполнена за %s попыток', task_func.name, max_attempts)
+                return
+            delay = retry_delay(attempt)
+            logger.warning('Задача %s: попытка %s завершилась ошибкой, повтор через %.0f с',
+                           task_func.name, attempt, delay, exc_info=True)
+            timer = threading.Timer(delay, self.submit, args=(task_func, kwargs, max_attempts, attempt + 1))
+            timer.daemon = True
+            timer.start()
+        finally:
+            close_old_connections()
+
+    def shutdown(self, wait=True):
+        """Завершение пула после выполнения уже поставленных задач"""
+        with self._lock:
+            executor, self._executor, self._pid = self._executor, None, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+thread_runner = ThreadRunner()
+
+
+class Worker:
+    """
+    Выполнение задач из таблицы Task (режим db) пачками.
+
+    Захват — условным UPDATE с уникальной меткой, поэтому несколько воркеров
+    не выполнят одну задачу дважды на любой СУБД. Задача, захват которой истёк
+    (воркер упал), снова становится доступной, пока не исчерпаны попытки;
+    если упала последняя попытка — получает статус failed.
+    """
+
+    def __init__(self, batch_size=None, lease=None):
+        self.config = get_task_queue_config()
+        self.batch_size = batch_size or self.config['BATCH_SIZE']
+        self.lease = lease or self.config['LEASE']
+
+    def _due(self, now):
+        return (Q(status=Task.PENDING, run_after__lte=now)
+                | Q(status=Task.RUNNING, locked_until__lt=now, attempts__lt=F('max_attempts')))
+
+    def expire_leases(self, now=None):
+        """Задачи, воркер которых упал на последней попытке, — в failed; возвращает их количество"""
+        return Task.objects.filter(
+            status=Task.RUNNING, locked_until__lt=now or timezone.now(), attempts__gte=F('max_attempts'),
+        ).update(status=Task.FAILED, last_error='lease expired', locked_until=None, claim='')
+
+    def claim(self):
+        """Захват до batch_size задач, готовых к выполнению"""
+        now = timezone.now()
+        self.expire_leases(now)
+        due = self._due(now)
+        pks = list(Task.objects.filter(due).order_by('run_after', 'pk').values_list('pk', flat=True)[:self.batch_size])
+        if not pks:
+            return []
+        claim = uuid.uuid4().hex
+        Task.objects.filter(due, pk__in=pks).update(
+            status=Task.RUNNING, claim=claim, attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=self.lease),
+        )
+        return list(Task.objects.filter(claim=claim).order_by('pk'))
+
+    def run_batch(self):
+        """Одна пачка: возвращает количество захваченных задач (0 — очередь пуста)"""
+        tasks = self.claim()
+        groups = defaultdict(list)
+        for task_row in tasks:
+            groups[task_row.name].append(task_row)
+
+        done = []
+        for name, group in groups.items():
+            try:
+                task_func = get_task(name)
+            except (ImportError, KeyError) as exc:
+                for task_row in group:
+                    self._failed(task_row, f'Задача не найдена: {exc}', retry=False)
+                continue
+            units = [group] if task_func.batched else [[task_row] for task_row in group]
+            for unit in units:
+                try:
+                    task_func.run([task_row.kwargs for task_row in unit])
+                except Exception:
+                    logger.warning('Задача %s завершилась ошибкой', name, exc_info=True)
+                    error = traceback.format_exc()
+                    for task_row in unit:
+                        self._failed(task_row, error)
+                else:
+                    done.extend(unit)
+
+        if done:
+            # Выполненные задачи не хранятся; claim защищает задачу, уже перехваченную
+            # другим воркером после истечения захвата
+            Task.objects.filter(pk__in=[task_row.pk for task_row in done], claim=done[0].claim).delete()
+        return len(tasks)
+
+    def _failed(self, task_row, error, retry=True):
+        fields = {'last_error': error[-5000:], 'locked_until': None, 'claim': ''}
+        if retry and task_row.attempts < task_row.max_attempts:
+            fields.update(status=Task.PENDING,
+                          run_after=timezone.now() + timedelta(seconds=retry_delay(task_row.attempts, self.config)))
+        else:
+            fields.update(status=Task.FAILED)
+            logger.error('Задача %s #%s не выполнена за %s попыток', task_row.name, task_row.pk, task_row.attempts)
+        Task.objects.filter(pk=task_row.pk, claim=task_row.claim).update(**fields)
+
+
+def retry_failed(queryset=None):
+    """Возврат задач со статусом failed в очередь с новым набором попыток"""
+    queryset = Task.objects.all() if queryset is None else queryset
+    return queryset.filter(status=Task.FAILED).update(
+        status=Task.PENDING, attempts=0, run_after=timezone.now(), last_error='',
+    )
@@ -0,0 +1,101 @@
+# main/tasks.py
+"""
+Фоновые задачи проекта (main.task_queue): работа после регистрации,
+которую ответ не ждёт, и массовые действия админки.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.mail import send_mail
+
+from .cache import user_tag
+from .maintenance import DeactivateUsersJob, ResetTokensJob, get_maintenance_config
+from .serializers import UserDetailSerializer
+from .task_queue import task
+
+audit_logger = logging.getLogger('main.audit')
+
+# Массовые действия админки над выбранными пользователями
+USER_JOBS = {job_class.name: job_class for job_class in (DeactivateUsersJob, ResetTokensJob)}
+# Пачек BATCH_SIZE в одной задаче: задача укладывается в срок захвата воркером (LEASE),
+# а список ID в аргументах остаётся небольшим
+USER_JOB_BATCHES = 10
+
+
+@task(max_attempts=5)
+def send_welcome_email(user_id):
+    """Приветственное письмо; почтовый сервер бывает недоступен — попыток больше обычного"""
+    user = User.objects.filter(pk=user_id).only('username', 'email', 'first_name').first()
+    if user is None or not user.email:
+        return
+    send_mail(
+        'Добро пожаловать!',
+        f'Здравствуйте, {user.first_name or user.username}!\n\n'
+        f'Вы зарегистрированы с именем пользователя {user.username}.',
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+    )
+
+
+@task
+def audit_registration(user_id, ip, device, source):
+    """Запись журнала аудита о регистрации (логгер main.audit)"""
+    audit_logger.info(
+        'registration user_id=%s ip=%s source=%s device=%r', user_id, ip, source, device,
+        extra={'event': 'registration', 'user_id': user_id, 'ip': ip, 'device': device, 'source': source},
+    )
+
+
+@task(batched=True)
+def warm_user_cache(kwargs_list):
+    """
+    Прогрев кеша карточек пользователей (ключ UserDetailAPIView):
+    пачка задач читает всех своих пользователей одним запросом
+    """
+    user_ids = {kwargs['user_id'] for kwargs in kwargs_list}
+    # Версии тегов — до чтения, как в get_or_set: изменение пользователя между
+    # чтением и записью сделает прогретую запись устаревшей
+    snapshots = {user_id: cache.tag_snapshot([user_tag(user_id)]) for user_id in user_ids}
+    for user in User.objects.filter(pk__in=user_ids):
+        cache.set(f'user_detail:{user.pk}', UserDetailSerializer(user).data, tag_versions=snapshots[user.pk])
+
+
+def after_registration(user, request, source):
+    """Постановка в очередь работы после регистрации; выполнится после фиксации транзакции"""
+    send_welcome_email.enqueue(user_id=user.pk)
+    audit_registration.enqueue(
+        user_id=user.pk, ip=request.META.get('REMOTE_ADDR', ''),
+        device=request.META.get('HTTP_USER_AGENT', '')[:100], source=source,
+    )
+    warm_user_cache.enqueue(user_id=user.pk)
+
+
+@task
+def run_user_job(job, name, user_ids):
+    """
+    Часть массового действия админки: задача обслуживания по списку ID.
+    Позиция сохраняется в MaintenanceCheckpoint с именем name, поэтому
+    повтор задачи после сбоя продолжает с места остановки.
+    """
+    queryset = User.objects.filter(pk__in=user_ids)
+    USER_JOBS[job](queryset=queryset, name=name).run()
+
+
+def enqueue_user_job(job, name, user_ids):
+    """
+    Постановка массового действия в очередь: по задаче на каждые
+    BATCH_SIZE * USER_JOB_BATCHES выбранных ID. Возвращает число задач.
+    """
+    chunk_size = get_maintenance_config()['BATCH_SIZE'] * USER_JOB_BATCHES
+    chunk, parts = [], 0
+    for user_id in user_ids:
+        chunk.append(user_id)
+        if len(chunk) == chunk_size:
+            run_user_job.enqueue(job=job, name=f'{name}:{parts}', user_ids=chunk)
+            chunk, parts = [], parts + 1
+    if chunk:
+        run_user_job.enqueue(job=job, name=f'{name}:{parts}', user_ids=chunk)
+        parts += 1
+    return parts
@@ -0,0 +1,26 @@
+# main/template_warmup.py
+"""
+Предварительная компиляция шаблонов проекта.
+
+С cached.Loader скомпилированный шаблон хранится в памяти процесса, но
+первый запрос к каждой странице всё равно платит за чтение и разбор файла.
+precompile_templates() делает это при старте: при preload в gunicorn — один
+раз в мастере, и воркеры получают готовые шаблоны через fork.
+"""
+from pathlib import Path
+
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+
+
+def precompile_templates():
+    """Компилирует шаблоны из DIRS движков Django; возвращает их количество"""
+    count = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for directory in engine.engine.dirs:
+            for path in sorted(Path(directory).rglob('*.html')):
+                engine.get_template(path.relative_to(directory).as_posix())
+                count += 1
+    return count
@@ -1,8 +1,37 @@
 import pytest
+from django.core.cache import caches
 from rest_framework.test import APIClient
 from .factories import UserFactory, AdminFactory
 
 
+@pytest.fixture(autouse=True)
+def plain_static_storage(settings):
+    """Тесты не требуют collectstatic: статика без манифеста и хешей"""
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
+
+
+@pytest.fixture(autouse=True)
+def sync_session_writes(settings):
+    """Фоновый поток записи сессий не пишет в тестовую БД параллельно с тестом"""
+    settings.SESSION_WRITE_BEHIND = {**settings.SESSION_WRITE_BEHIND, 'ENABLED': False}
+
+
+@pytest.fixture(autouse=True)
+def sync_task_queue(settings):
+    """Фоновые задачи выполняются сразу после транзакции, в потоке теста"""
+    settings.TASK_QUEUE = {**settings.TASK_QUEUE, 'MODE': 'sync'}
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Очистка кешей перед каждым тестом: ID пользователей в тестовой БД переиспользуются"""
+    for cache in caches.all():
+        cache.clear()
+
+
 @pytest.fixture
 def api_client():
     """Фикстура для API клиента"""
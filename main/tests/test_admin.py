@@ -0,0 +1,134 @@
+import pytest
+import allure
+from django.contrib.auth.models import User
+
+from main import admin as main_admin
+from main.maintenance import ResetTokensJob
+from main.models import AuthToken, MaintenanceCheckpoint, Task, UserChange
+from main.task_queue import Worker
+from .factories import UserFactory
+
+CHANGELIST_URL = '/admin/auth/user/'
+
+
+@pytest.fixture
+def admin_browser(client, test_admin):
+    client.force_login(test_admin)
+    return client
+
+
+@pytest.fixture
+def sync_jobs(settings):
+    settings.MAINTENANCE = {**settings.MAINTENANCE, 'SLEEP': 0}
+
+
+@pytest.mark.django_db
+@allure.feature('Админка')
+class TestUserAdmin:
+    """Тесты админки пользователей для больших таблиц"""
+
+    @allure.story('Поиск')
+    @allure.title('Поиск по началу имени и по email целиком')
+    def test_indexed_search(self, admin_browser):
+        UserFactory(username='alice_smith', email='alice@example.com')
+        UserFactory(username='bob', email='bob@example.com')
+
+        by_prefix = admin_browser.get(CHANGELIST_URL, {'q': 'ALI'})
+        by_email = admin_browser.get(CHANGELIST_URL, {'q': 'BOB@example.com'})
+        by_substring = admin_browser.get(CHANGELIST_URL, {'q': 'smith'})
+
+        assert [user.username for user in by_prefix.context['cl'].result_list] == ['alice_smith']
+        assert [user.username for user in by_email.context['cl'].result_list] == ['bob']
+        assert list(by_substring.context['cl'].result_list) == []
+
+    @allure.story('Количество строк')
+    @allure.title('Полное количество без фильтров не считается')
+    def test_no_full_result_count(self, admin_browser):
+        response = admin_browser.get(CHANGELIST_URL, {'is_active__exact': '1'})
+
+        assert response.status_code == 200
+        assert response.context['cl'].full_result_count is None
+
+    @allure.story('Количество строк')
+    @allure.title('Выше порога используется оценка, ниже — точный COUNT(*)')
+    def test_estimated_count_paginator(self, monkeypatch, settings, test_user):
+        settings.ADMIN_ESTIMATED_COUNT_THRESHOLD = 1000
+        queryset = User.objects.order_by('pk')
+
+        monkeypatch.setattr(main_admin, 'estimated_count', lambda queryset: 50000)
+        assert main_admin.EstimatedCountPaginator(queryset, 100).count == 50000
+
+        monkeypatch.setattr(main_admin, 'estimated_count', lambda queryset: 10)
+        assert main_admin.EstimatedCountPaginator(queryset, 100).count == 1
+
+    @allure.story('Массовые действия')
+    @allure.title('Стандартное массовое удаление недоступно')
+    def test_delete_selected_removed(self, admin_browser):
+        response = admin_browser.get(CHANGELIST_URL)
+
+        choices = [name for name, _ in response.context['action_form'].fields['action'].choices]
+        assert 'delete_selected' not in choices
+        assert {'deactivate_users', 'reset_tokens'} <= set(choices)
+
+    @allure.story('Массовые действия')
+    @allure.title('Деактивация выбранных пачками, кроме самого администратора')
+    def test_deactivate_action(self, admin_browser, test_admin, sync_jobs, settings,
+                               django_capture_on_commit_callbacks):
+        settings.MAINTENANCE = {**settings.MAINTENANCE, 'BATCH_SIZE': 2}
+        users = UserFactory.create_batch(3)
+        selected = [user.pk for user in users] + [test_admin.pk]
+
+        # Задачи очереди (режим sync) выполняются после фиксации транзакции
+        with django_capture_on_commit_callbacks(execute=True):
+            response = admin_browser.post(CHANGELIST_URL, {
+                'action': 'deactivate_users', '_selected_action': selected,
+            }, follow=True)
+
+        assert response.status_code == 200
+        assert not User.objects.filter(pk__in=[user.pk for user in users], is_active=True).exists()
+        assert User.objects.get(pk=test_admin.pk).is_active
+        assert UserChange.objects.filter(action=UserChange.DEACTIVATED).count() == 3
+
+    @allure.story('Массовые действия')
+    @allure.title('Сброс токенов выбранных пользователей')
+    def test_reset_tokens_action(self, admin_browser, sync_jobs, test_user, django_capture_on_commit_callbacks):
+        AuthToken.objects.issue(test_user, 'phone')
+        AuthToken.objects.issue(test_user, 'laptop')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            admin_browser.post(CHANGELIST_URL, {'action': 'reset_tokens', '_selected_action': [test_user.pk]})
+
+        assert not AuthToken.objects.filter(user=test_user).exists()
+
+
+@pytest.mark.django_db
+@allure.feature('Админка')
+class TestQueuedJobs:
+    """Тесты массовых действий через очередь задач (режим db)"""
+
+    @allure.story('Массовые действия')
+    @allure.title('Выбранные ID сохраняются в задачах, прерванная часть продолжается с позиции')
+    def test_action_survives_restart(self, admin_browser, settings, monkeypatch):
+        settings.TASK_QUEUE = {**settings.TASK_QUEUE, 'MODE': 'db', 'RETRY_DELAY': 0}
+        settings.MAINTENANCE = {**settings.MAINTENANCE, 'BATCH_SIZE': 2, 'SLEEP': 0}
+        monkeypatch.setattr('main.tasks.USER_JOB_BATCHES', 2)
+        users = UserFactory.create_batch(6)
+        for user in users:
+            AuthToken.objects.issue(user)
+
+        admin_browser.post(CHANGELIST_URL, {'action': 'reset_tokens', '_selected_action': [u.pk for u in users]})
+
+        # Две задачи по 4 и 2 ID; действие ещё не выполнено
+        assert sorted(len(row.kwargs['user_ids']) for row in Task.objects.all()) == [2, 4]
+        assert AuthToken.objects.count() == 6
+
+        # Воркер остановлен после первой пачки первой задачи: позиция сохранена
+        first = Task.objects.order_by('pk').first()
+        ResetTokensJob(queryset=User.objects.filter(pk__in=first.kwargs['user_ids']),
+                       name=first.kwargs['name']).run(max_batches=1)
+        assert MaintenanceCheckpoint.objects.filter(job=first.kwargs['name'], processed=2).exists()
+
+        assert Worker().run_batch() == 2
+        assert not AuthToken.objects.exists()
+        assert not Task.objects.exists()
+        assert not MaintenanceCheckpoint.objects.exists()
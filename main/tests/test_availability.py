@@ -0,0 +1,115 @@
+import pytest
+import allure
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.throttling import ScopedRateThrottle
+
+from main import availability
+from main.availability import AvailabilityIndex, BloomFilter
+from main.models import UserChange
+from .factories import UserFactory
+
+URL = '/api/availability/'
+
+
+@pytest.fixture(autouse=True)
+def fresh_index(monkeypatch):
+    """Индекс строится заново в каждом тесте: ID и имена в тестовой БД переиспользуются"""
+    index = AvailabilityIndex()
+    monkeypatch.setattr(availability, 'availability_index', index)
+    monkeypatch.setattr('main.api_views.availability_index', index)
+    monkeypatch.setattr('main.signals.availability_index', index)
+    return index
+
+
+@pytest.fixture(autouse=True)
+def no_settle(settings):
+    settings.CHANGE_FEED_SETTLE_SECONDS = 0
+
+
+@allure.feature('Проверка занятости')
+class TestBloomFilter:
+    """Тесты фильтра Блума"""
+
+    @allure.story('Фильтр Блума')
+    @allure.title('Нет ложноотрицательных ответов, ложноположительных — около заданной доли')
+    def test_membership(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'user{i}')
+
+        assert all(f'user{i}' in bloom for i in range(1000))
+        false_positives = sum(f'other{i}' in bloom for i in range(10000))
+        assert false_positives < 300
+
+
+@pytest.mark.django_db
+@allure.feature('Проверка занятости')
+class TestAvailabilityAPI:
+    """Тесты проверки занятости username и email"""
+
+    @allure.story('API')
+    @allure.title('Занятые и свободные значения')
+    def test_taken_and_available(self, api_client):
+        UserFactory(username='alice', email='alice@example.com')
+
+        response = api_client.get(URL, {'username': 'alice', 'email': 'ALICE@example.com'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['username'] == {'value': 'alice', 'available': False}
+        assert response.data['email']['available'] is False
+
+        response = api_client.get(URL, {'username': 'bob'})
+        assert response.data == {'username': {'value': 'bob', 'available': True}}
+
+    @allure.story('API')
+    @allure.title('Без параметров — ошибка 400')
+    def test_no_params(self, api_client):
+        assert api_client.get(URL).status_code == status.HTTP_400_BAD_REQUEST
+
+    @allure.story('API')
+    @allure.title('Частота проверок с одного IP ограничена, счётчик — в общем кеше')
+    def test_throttled(self, api_client, monkeypatch):
+        monkeypatch.setattr(ScopedRateThrottle, 'THROTTLE_RATES', {'availability': '3/min'})
+
+        statuses = [api_client.get(URL, {'email': f'user{i}@example.com'}).status_code for i in range(4)]
+
+        assert statuses == [status.HTTP_200_OK] * 3 + [status.HTTP_429_TOO_MANY_REQUESTS]
+        # Другой воркер видит ту же историю: она не в L1 процесса
+        assert caches['shared'].get('throttle_availability_127.0.0.1')
+
+    @allure.story('БД')
+    @allure.title('Свободное значение проверяется без запросов к БД')
+    def test_miss_without_queries(self, api_client, fresh_index, django_assert_num_queries):
+        UserFactory.create_batch(5)
+        fresh_index.load()
+
+        with django_assert_num_queries(0):
+            response = api_client.get(URL, {'username': 'nobody_here'})
+
+        assert response.data['username']['available'] is True
+        assert fresh_index.stats['db_checks'] == 0
+
+    @allure.story('Обновление')
+    @allure.title('Регистрация в этом процессе сразу видна проверке')
+    def test_registration_updates_index(self, api_client, fresh_index, user_data):
+        fresh_index.load()
+
+        assert api_client.post('/api/register/', user_data, format='json').status_code == status.HTTP_201_CREATED
+
+        response = api_client.get(URL, {'username': user_data['username']})
+        assert response.data['username']['available'] is False
+
+    @allure.story('Обновление')
+    @allure.title('Пользователи из других воркеров догружаются из журнала изменений')
+    def test_sync_from_change_feed(self, fresh_index):
+        fresh_index.load()
+        # Другой воркер: bulk_create не шлёт сигналы в этом процессе
+        user, = User.objects.bulk_create([User(username='remote_user', email='remote@example.com')])
+        UserChange.record([user.pk], UserChange.CREATED)
+        assert fresh_index.is_taken('username', 'remote_user') is False
+
+        fresh_index.synced_at = 0
+
+        assert fresh_index.is_taken('username', 'remote_user') is True
+        assert fresh_index.is_taken('email', 'remote@example.com') is True
@@ -0,0 +1,39 @@
+from io import StringIO
+
+import pytest
+import allure
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from main.management.commands import benchmark
+from main.models import AuthToken
+
+
+@pytest.mark.django_db(transaction=True)
+@allure.feature('Замеры производительности')
+class TestBenchmarkCommand:
+    """Тесты команды benchmark"""
+
+    @allure.story('Безопасность')
+    @allure.title('Без DEBUG на рабочей БД команда не запускается')
+    def test_refuses_production_database(self, settings, monkeypatch):
+        settings.DEBUG = False
+        monkeypatch.setattr(benchmark, 'is_test_database', lambda connection: False)
+
+        with pytest.raises(CommandError):
+            call_command('benchmark', '--requests', '1', stdout=StringIO())
+        with pytest.raises(CommandError):
+            call_command('loadtest', '--duration', '0', stdout=StringIO())
+        assert not User.objects.exists()
+
+    @allure.story('Безопасность')
+    @allure.title('Пользователи и токены прогона удаляются в конце')
+    def test_cleans_up(self):
+        for scenario, status in (('register', 201), ('login', 200)):
+            out = StringIO()
+            call_command('benchmark', '--scenario', scenario, '--requests', '3', '--warmup', '0', stdout=out)
+
+            assert f'статусы {{{status}: 3}}' in out.getvalue()
+        assert not User.objects.filter(username__startswith=benchmark.BENCHMARK_USER_PREFIX).exists()
+        assert not AuthToken.objects.exists()
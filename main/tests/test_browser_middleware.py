@@ -0,0 +1,63 @@
+import pytest
+import allure
+from django.contrib.sessions.backends.base import SessionBase
+from django.core import checks
+from django.test import Client
+from rest_framework import status
+
+from main.models import AuthToken
+
+
+@pytest.mark.django_db
+@allure.feature('Middleware')
+class TestBrowserOnlyMiddleware:
+    """Тесты пропуска браузерных middleware для API с токеном"""
+
+    @allure.story('Запросы с токеном')
+    @allure.title('Запрос с токеном не читает сессию и не получает браузерные заголовки')
+    def test_token_request_skips_browser_middleware(self, api_client, test_user, monkeypatch):
+        token = AuthToken.objects.issue(test_user)
+        api_client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        monkeypatch.setattr(SessionBase, '_get_session',
+                            lambda self, no_load=False: pytest.fail('сессия не должна загружаться'))
+
+        response = api_client.get('/api/profile/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['username'] == test_user.username
+        assert 'X-Frame-Options' not in response.headers
+
+    @allure.story('Запросы с токеном')
+    @allure.title('Выход по токену работает без сессии')
+    def test_token_logout(self, api_client, test_user):
+        token = AuthToken.objects.issue(test_user)
+        api_client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        response = api_client.post('/api/logout/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not AuthToken.objects.filter(user=test_user).exists()
+
+    @allure.story('Браузерные запросы')
+    @allure.title('Браузерный запрос проходит через все middleware')
+    def test_browser_request_keeps_middleware(self, client):
+        response = client.get('/api/users/')
+        assert response['X-Frame-Options'] == 'DENY'
+
+    @allure.story('Браузерные запросы')
+    @allure.title('CSRF проверяется для браузерных форм')
+    def test_browser_csrf_enforced(self):
+        client = Client(enforce_csrf_checks=True)
+
+        response = client.post('/sign-up/', {'username': 'csrf_user'})
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    @allure.story('Проверки развёртывания')
+    @allure.title('check --deploy находит CSRF и X-Frame-Options middleware')
+    def test_security_checks_find_middleware(self, settings):
+        assert settings.MIDDLEWARE[-1] == 'main.browser_middleware.TokenAPIMiddleware'
+
+        messages = checks.run_checks(tags=[checks.Tags.security], include_deployment_checks=True)
+
+        assert not {'security.W002', 'security.W003'} & {message.id for message in messages}
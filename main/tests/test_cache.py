@@ -0,0 +1,217 @@
+import threading
+import time
+import uuid
+
+import pytest
+import allure
+from django.core.cache import cache, caches
+from rest_framework import status
+
+from main.cache import TieredCache
+from main.singleflight import SingleFlight
+
+
+def make_worker_cache(**options):
+    """Кеш с отдельным состоянием процесса и тем же L2 — имитирует другой воркер"""
+    return TieredCache(f'worker-{uuid.uuid4().hex}', {'OPTIONS': {'SHARED_ALIAS': 'shared', **options}})
+
+
+def in_threads(target, count=5):
+    """Вызов target в count потоках; каждый поток получает свой экземпляр caches['default']"""
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@allure.feature('Кеширование')
+class TestTieredCache:
+    """Тесты двухуровневого кеша"""
+
+    @allure.story('Уровни кеша')
+    @allure.title('Значение читается из L1, а другой воркер получает его из L2')
+    def test_l1_and_l2_hits(self):
+        first, second = make_worker_cache(), make_worker_cache()
+        first.set('key', {'value': 1}, 60)
+
+        assert first.get('key') == {'value': 1}
+        assert first.stats()['l1_hits'] == 1
+
+        assert second.get('key') == {'value': 1}
+        assert second.stats()['l2_hits'] == 1
+
+    @allure.story('Инвалидация по тегам')
+    @allure.title('Инвалидация тега в одном воркере видна в другом')
+    def test_invalidate_tags_across_workers(self):
+        first, second = make_worker_cache(), make_worker_cache(TAG_TTL=0)
+        first.set('key', 'value', 60, tags=['user:1'])
+        assert second.get('key') == 'value'
+
+        first.invalidate_tags('user:1')
+
+        assert first.get('key') is None
+        assert second.get('key') is None
+
+    @allure.story('Уровни кеша')
+    @allure.title('L1 и счётчики общие для всех потоков процесса')
+    def test_l1_shared_between_threads(self):
+        cache.reset_stats()
+        cache.set('key', 'value', 60)
+        instances, results = [], []
+
+        def request():
+            instances.append(caches['default'])
+            results.append(caches['default'].get('key'))
+
+        in_threads(request)
+
+        # Django создаёт экземпляр бэкенда на поток, а L1 у них один
+        assert len({id(instance) for instance in instances}) == 5
+        assert results == ['value'] * 5
+        stats = cache.stats()
+        assert (stats['l1_hits'], stats['l2_hits']) == (5, 0)
+
+    @allure.story('Защита от набега')
+    @allure.title('Параллельные промахи в разных потоках вычисляют значение один раз')
+    def test_get_or_set_single_compute(self):
+        calls, results = [], []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        in_threads(lambda: results.append(caches['default'].get_or_set('key', compute, 60)))
+
+        assert len(calls) == 1
+        assert results == ['value'] * 5
+
+
+@pytest.mark.django_db
+@allure.feature('Кеширование')
+class TestApiCache:
+    """Тесты кеширования ответов API"""
+
+    @allure.story('Инвалидация по тегам')
+    @allure.title('Данные пользователя в кеше обновляются после изменения профиля')
+    @allure.severity(allure.severity_level.CRITICAL)
+    def test_detail_invalidated_after_update(self, authenticated_client, test_user):
+        url = f'/api/users/{test_user.id}/'
+        with allure.step("Первый запрос заполняет кеш"):
+            assert authenticated_client.get(url).data['first_name'] == test_user.first_name
+            assert cache.get(f'user_detail:{test_user.id}') is not None
+
+        with allure.step("Изменение профиля"):
+            response = authenticated_client.patch('/api/profile/', {'first_name': 'Обновлённое'}, format='json')
+            assert response.status_code == status.HTTP_200_OK
+
+        with allure.step("Ответ содержит новые данные"):
+            assert authenticated_client.get(url).data['first_name'] == 'Обновлённое'
+
+    @allure.story('Кеш аутентификации')
+    @allure.title('После выхода токен не принимается из кеша')
+    def test_token_cache_invalidated_on_logout(self, authenticated_client):
+        assert authenticated_client.get('/api/profile/').status_code == status.HTTP_200_OK
+
+        authenticated_client.post('/api/logout/')
+
+        response = authenticated_client.get('/api/profile/')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @allure.story('Защита от набега')
+    @allure.title('Отсутствующий пользователь не попадает в кеш')
+    def test_missing_user_not_cached(self, authenticated_client, django_user_model):
+        missing_id = django_user_model.objects.order_by('-id').first().id + 1
+        url = f'/api/users/{missing_id}/'
+        for _ in range(3):
+            assert authenticated_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+
+        assert f'user_detail:{missing_id}' not in cache
+
+        django_user_model.objects.create_user(id=missing_id, username='late_user', password='testpass123')
+
+        assert authenticated_client.get(url).status_code == status.HTTP_200_OK
+
+    @allure.story('Статистика')
+    @allure.title('Админ видит статистику кеша')
+    def test_cache_stats(self, admin_client):
+        response = admin_client.get('/api/admin/cache/')
+        assert response.status_code == status.HTTP_200_OK
+        assert 'hit_ratio' in response.data
+
+
+@allure.feature('Кеширование')
+class TestSingleFlight:
+    """Тесты объединения параллельных вызовов"""
+
+    @allure.story('Защита от набега')
+    @allure.title('Потоки с одним ключом получают результат одного вызова')
+    def test_concurrent_calls_share_result(self):
+        group = SingleFlight()
+        started = threading.Event()
+        calls, results = [], []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return 'value'
+
+        def call():
+            results.append(group.do('key', compute))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=call) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        for thread in [leader, *followers]:
+            thread.join()
+
+        assert len(calls) == 1
+        assert sorted(results) == [('value', False)] + [('value', True)] * 4
+
+    @allure.story('Защита от набега')
+    @allure.title('Исключение ведущего вызова получают все ожидающие')
+    def test_error_is_shared(self):
+        group = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def compute():
+            started.set()
+            time.sleep(0.1)
+            raise ValueError('boom')
+
+        def call():
+            try:
+                group.do('key', compute)
+            except ValueError as error:
+                errors.append(error)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        assert len(errors) == 2
+
+    @allure.story('Защита от набега')
+    @allure.title('Ожидающие потоки в кеше не опрашивают L2')
+    def test_cache_coalesces_in_process(self):
+        cache.reset_stats()
+
+        def compute():
+            time.sleep(0.2)
+            return ['value']
+
+        in_threads(lambda: caches['default'].get_or_set('key', compute, 60))
+
+        stats = cache.stats()
+        assert stats['recomputes'] == 1
+        assert stats['coalesced'] == 4
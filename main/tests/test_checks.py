@@ -0,0 +1,131 @@
+import json
+from io import StringIO
+
+import pytest
+import allure
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+
+from main import checks
+
+
+def ids(messages):
+    return [message.id for message in messages]
+
+
+@allure.feature('Проверки производительности')
+class TestPerformanceChecks:
+    """Тесты проверок настроек и URL"""
+
+    @allure.story('Настройки')
+    @allure.title('DEBUG=True — ошибка')
+    def test_debug(self, settings):
+        settings.DEBUG = True
+        assert ids(checks.check_debug(None)) == ['perf.E001']
+
+        settings.DEBUG = False
+        assert checks.check_debug(None) == []
+
+    @allure.story('Настройки')
+    @allure.title('Кеш: DummyCache — ошибка, общий уровень в памяти процесса или в файлах — предупреждение')
+    def test_caches(self, settings):
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        assert ids(checks.check_caches(None)) == ['perf.E002']
+
+        settings.CACHES = {
+            'default': {'BACKEND': 'main.cache.TieredCache', 'OPTIONS': {'SHARED_ALIAS': 'shared'}},
+            'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        }
+        assert ids(checks.check_caches(None)) == ['perf.W002']
+
+        settings.CACHES['shared'] = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache'}
+        assert ids(checks.check_caches(None)) == ['perf.W005']
+
+        for backend in ('redis.RedisCache', 'db.DatabaseCache'):
+            settings.CACHES['shared'] = {'BACKEND': f'django.core.cache.backends.{backend}'}
+            assert checks.check_caches(None) == []
+
+    @allure.story('Настройки')
+    @allure.title('Без CONN_MAX_AGE и cached.Loader — предупреждения')
+    def test_connections_and_templates(self, settings, monkeypatch):
+        monkeypatch.setitem(settings.DATABASES['default'], 'CONN_MAX_AGE', 0)
+        settings.TEMPLATES = [{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'OPTIONS': {'loaders': ['django.template.loaders.filesystem.Loader']},
+        }]
+
+        assert 'perf.W003' in ids(checks.check_persistent_connections(None))
+        assert ids(checks.check_template_loaders(None)) == ['perf.W004']
+
+    @allure.story('Настройки')
+    @allure.title('С пулом соединений CONN_MAX_AGE=0 не считается проблемой')
+    def test_connection_pool(self, settings, monkeypatch):
+        monkeypatch.setitem(settings.DATABASES, 'default', {
+            **settings.DATABASES['default'], 'CONN_MAX_AGE': 0, 'OPTIONS': {'pool': {'max_size': 8}},
+        })
+
+        assert 'perf.W003' not in ids(checks.check_persistent_connections(None))
+
+    @allure.story('URL')
+    @allure.title('Списки без пагинации находятся по URL-конфигурации')
+    def test_unpaginated_lists(self):
+        messages = checks.check_unpaginated_lists(None)
+
+        flagged = {message.obj for message in messages}
+        assert 'main.api_views.UserListAPIView' in flagged
+        assert 'main.api_views.UserDetailAPIView' not in flagged
+
+
+@pytest.mark.django_db
+@allure.feature('Проверки производительности')
+class TestSchemaChecks:
+    """Тесты проверок схемы БД"""
+
+    @allure.story('Схема БД')
+    @allure.title('После миграций индексы auth_user на месте')
+    def test_user_indexes_present(self):
+        assert checks.check_user_indexes(None, databases=['default']) == []
+
+    @allure.story('Схема БД')
+    @allure.title('Отсутствие индекса по email обнаруживается')
+    def test_missing_email_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX main_user_email_nocase_idx')
+        try:
+            assert ids(checks.check_user_indexes(None, databases=['default'])) == ['perf.W010']
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('CREATE INDEX main_user_email_nocase_idx ON auth_user (email COLLATE NOCASE)')
+
+
+@pytest.mark.django_db
+@allure.feature('Проверки производительности')
+class TestPerfcheckCommand:
+    """Тесты команды perfcheck"""
+
+    @allure.story('Команда')
+    @allure.title('JSON-вывод с уровнями и код возврата по --fail-level')
+    def test_json_output(self, settings):
+        settings.DEBUG = True
+        out = StringIO()
+
+        with pytest.raises(CommandError):
+            call_command('perfcheck', '--format', 'json', '--fail-level', 'ERROR', '--database', 'default', stdout=out)
+
+        findings = json.loads(out.getvalue())
+        assert findings[0] == {
+            'id': 'perf.E001', 'level': 'error', 'object': 'settings.DEBUG',
+            'message': findings[0]['message'], 'hint': findings[0]['hint'],
+        }
+        assert {'perf.E001', 'perf.W020'} <= {finding['id'] for finding in findings}
+
+    @allure.story('Команда')
+    @allure.title('Предупреждения не мешают, если --fail-level выше')
+    def test_fail_level(self, settings):
+        settings.DEBUG = False
+        out = StringIO()
+
+        call_command('perfcheck', '--fail-level', 'ERROR', '--database', 'default', stdout=out)
+
+        assert 'perf.W020' in out.getvalue()
@@ -0,0 +1,72 @@
+import pytest
+import allure
+from django.contrib.auth.models import User
+from rest_framework import status
+
+from main.db_routers import PIN_COOKIE_NAME, PrimaryReplicaRouter, RoutingState, _state
+
+
+@pytest.fixture
+def routing_state():
+    """Имитирует контекст HTTP-запроса для роутера"""
+    state = RoutingState(pinned=False)
+    token = _state.set(state)
+    yield state
+    _state.reset(token)
+
+
+@allure.feature('Реплики БД')
+class TestPrimaryReplicaRouter:
+    """Тесты выбора базы данных роутером"""
+
+    @allure.story('Маршрутизация чтения')
+    @allure.title('Без реплик всё читается с основной БД')
+    def test_no_replicas(self, settings, routing_state):
+        settings.DATABASE_REPLICAS = []
+        assert PrimaryReplicaRouter().db_for_read(User) == 'default'
+
+    @allure.story('Маршрутизация чтения')
+    @allure.title('Безопасное чтение уходит на реплику')
+    def test_read_from_replica(self, settings, routing_state):
+        settings.DATABASE_REPLICAS = ['replica1']
+        assert PrimaryReplicaRouter().db_for_read(User) == 'replica1'
+
+    @allure.story('Прилипание к основной БД')
+    @allure.title('После записи чтение в том же запросе идёт с основной БД')
+    def test_read_after_write(self, settings, routing_state):
+        settings.DATABASE_REPLICAS = ['replica1']
+        router = PrimaryReplicaRouter()
+        assert router.db_for_write(User) == 'default'
+        assert routing_state.wrote
+        assert router.db_for_read(User) == 'default'
+
+    @allure.story('Прилипание к основной БД')
+    @allure.title('Вне HTTP-запроса чтение идёт с основной БД')
+    def test_outside_request(self, settings):
+        settings.DATABASE_REPLICAS = ['replica1']
+        assert PrimaryReplicaRouter().db_for_read(User) == 'default'
+
+
+@pytest.mark.django_db(transaction=True)
+@allure.feature('Реплики БД')
+class TestReplicaPinning:
+    """Тесты закрепления клиента за основной БД после записи"""
+
+    @allure.story('Прилипание к основной БД')
+    @allure.title('После обновления профиля клиент читает свои данные с основной БД')
+    @allure.severity(allure.severity_level.CRITICAL)
+    def test_pin_after_profile_update(self, authenticated_client, settings):
+        with allure.step("Настройка реплики"):
+            settings.DATABASE_REPLICAS = ['replica1']
+
+        with allure.step("Обновление профиля"):
+            response = authenticated_client.patch('/api/profile/', {'first_name': 'Новое'}, format='json')
+            assert response.status_code == status.HTTP_200_OK
+            assert PIN_COOKIE_NAME in response.cookies
+
+        with allure.step("Чтение профиля сразу после записи"):
+            # Незакреплённый запрос ушёл бы на несуществующую реплику replica1
+            authenticated_client.cookies.clear()
+            response = authenticated_client.get('/api/profile/')
+            assert response.status_code == status.HTTP_200_OK
+            assert response.data['first_name'] == 'Новое'
@@ -0,0 +1,201 @@
+import asyncio
+import json
+
+import pytest
+import allure
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from rest_framework.test import APIClient
+
+from main.models import AuthToken
+from main import events
+from main.change_feed import latest_cursor, read_changes
+from main.events import RESET, Subscriber, UserEventsApp, issue_ticket
+
+EVENTS_PATH = '/api/events/users/'
+
+
+@pytest.fixture(autouse=True)
+def fast_events(settings):
+    settings.CHANGE_FEED_SETTLE_SECONDS = 0
+    settings.USER_EVENTS = {'POLL_INTERVAL': 0.05, 'HEARTBEAT': 5}
+
+
+async def not_found_app(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 404, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+class SSEClient:
+    """Клиент ASGI-приложения, собирающий отправленные части ответа"""
+
+    def __init__(self, headers=(), query=b''):
+        self.scope = {
+            'type': 'http', 'method': 'GET', 'path': EVENTS_PATH, 'query_string': query,
+            'headers': [(name.encode(), value.encode()) for name, value in headers],
+        }
+        self.incoming = asyncio.Queue()
+        self.messages = []
+        self.received = asyncio.Event()
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send(self, message):
+        self.messages.append(message)
+        self.received.set()
+
+    def start(self):
+        return asyncio.ensure_future(UserEventsApp(not_found_app)(self.scope, self.receive, self.send))
+
+    @property
+    def status(self):
+        return self.messages[0]['status']
+
+    @property
+    def body(self):
+        return b''.join(message.get('body', b'') for message in self.messages[1:]).decode()
+
+    async def wait_for(self, text, timeout=5):
+        async def poll():
+            while text not in self.body:
+                self.received.clear()
+                await self.received.wait()
+        await asyncio.wait_for(poll(), timeout)
+
+    async def disconnect(self, task):
+        await self.incoming.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 5)
+
+
+def events_of(body):
+    return [json.loads(line[len('data: '):]) for line in body.splitlines() if line.startswith('data: {"id"')]
+
+
+@pytest.mark.django_db(transaction=True)
+@allure.feature('Поток событий')
+class TestUserEvents:
+    """Тесты SSE-потока изменений пользователей"""
+
+    @allure.story('Аутентификация')
+    @allure.title('Без токена поток не открывается')
+    def test_requires_token(self):
+        async def scenario():
+            client = SSEClient()
+            await client.start()
+            return client.status
+
+        assert asyncio.run(scenario()) == 401
+
+    @allure.story('Аутентификация')
+    @allure.title('Токен в URL не принимается, истёкший билет тоже')
+    def test_query_token_and_expired_ticket_rejected(self, test_user, settings):
+        token = AuthToken.objects.issue(test_user)
+        ticket = issue_ticket(test_user)
+        settings.USER_EVENTS = {**settings.USER_EVENTS, 'TICKET_TTL': -1}
+
+        async def scenario(query):
+            client = SSEClient(query=query.encode())
+            await client.start()
+            return client.status
+
+        assert asyncio.run(scenario(f'token={token.key}')) == 401
+        assert asyncio.run(scenario(f'ticket={ticket}')) == 401
+
+    @allure.story('Аутентификация')
+    @allure.title('Билет выдаётся по токену в заголовке')
+    def test_ticket_endpoint(self, authenticated_client):
+        response = authenticated_client.post('/api/events/ticket/')
+
+        assert response.status_code == 200
+        assert response.data['expires_in'] == 60
+        assert response.data['ticket']
+        assert APIClient().post('/api/events/ticket/').status_code == 401
+
+    @allure.story('Доставка')
+    @allure.title('Подписчик получает событие о новом пользователе')
+    @allure.severity(allure.severity_level.CRITICAL)
+    def test_push_created_user(self, test_user):
+        token = AuthToken.objects.issue(test_user)
+
+        async def scenario():
+            client = SSEClient(headers=[('authorization', f'Token {token.key}')])
+            task = client.start()
+            await client.wait_for('retry:')
+            await sync_to_async(User.objects.create_user)('pushed_user', password='testpass123')
+            await client.wait_for('pushed_user')
+            await client.disconnect(task)
+            return client
+
+        client = asyncio.run(scenario())
+        assert client.status == 200
+        assert [(event['action'], event['user']['username']) for event in events_of(client.body)] == [
+            ('created', 'pushed_user'),
+        ]
+
+    @allure.story('Доставка')
+    @allure.title('Сбой чтения журнала не останавливает раздатчик: событие приходит после повтора')
+    def test_broadcaster_survives_db_error(self, test_user, monkeypatch):
+        token = AuthToken.objects.issue(test_user)
+        failures = {'left': 2}
+
+        def flaky_read_changes(cursor, limit):
+            if failures['left']:
+                failures['left'] -= 1
+                raise OperationalError('server closed the connection unexpectedly')
+            return read_changes(cursor, limit)
+
+        async def scenario():
+            client = SSEClient(headers=[('authorization', f'Token {token.key}')])
+            task = client.start()
+            await client.wait_for('retry:')
+            monkeypatch.setattr(events, 'read_changes', flaky_read_changes)
+            await sync_to_async(User.objects.create_user)('after_error', password='testpass123')
+            await client.wait_for('after_error')
+            await client.disconnect(task)
+            return client
+
+        client = asyncio.run(scenario())
+        assert failures['left'] == 0
+        assert [event['user']['username'] for event in events_of(client.body)] == ['after_error']
+
+    @allure.story('Переподключение')
+    @allure.title('После переподключения с Last-Event-ID пропущенные события досылаются')
+    def test_replay_after_reconnect(self, test_user):
+        ticket = issue_ticket(test_user)
+        last_event_id = latest_cursor()
+        User.objects.create_user('missed_user', password='testpass123')
+
+        async def scenario():
+            client = SSEClient(query=f'ticket={ticket}&last_event_id={last_event_id}'.encode())
+            task = client.start()
+            await client.wait_for('missed_user')
+            await client.disconnect(task)
+            return client
+
+        client = asyncio.run(scenario())
+        assert [event['user']['username'] for event in events_of(client.body)] == ['missed_user']
+
+    @allure.story('Медленные клиенты')
+    @allure.title('Переполненная очередь подписчика сбрасывается')
+    def test_slow_subscriber_reset(self):
+        async def scenario():
+            subscriber = Subscriber(queue_size=2)
+            assert subscriber.push(1, b'a')
+            assert subscriber.push(2, b'b')
+            assert not subscriber.push(3, b'c')
+            return subscriber.queue.get_nowait()
+
+        assert asyncio.run(scenario()) is RESET
+
+    @allure.story('Маршрутизация')
+    @allure.title('Остальные запросы уходят в Django')
+    def test_other_paths_delegate(self):
+        async def scenario():
+            client = SSEClient()
+            client.scope['path'] = '/api/users/'
+            await client.start()
+            return client.status
+
+        assert asyncio.run(scenario()) == 404
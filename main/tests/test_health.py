@@ -0,0 +1,50 @@
+import pytest
+import allure
+from django.db import OperationalError
+from rest_framework import status
+
+from main.health import ReadinessCheck
+
+
+@allure.feature('Проверки здоровья')
+class TestHealthEndpoints:
+    """Тесты эндпоинтов живости и готовности"""
+
+    @allure.story('Живость')
+    @allure.title('Проверка живости отвечает без обращения к БД и сессии')
+    def test_live(self, client):
+        response = client.get('/healthz/live', HTTP_HOST='10.0.0.5')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'status': 'ok'}
+        assert 'Set-Cookie' not in response.headers
+        assert response['Cache-Control'] == 'no-store'
+
+    @allure.story('Готовность')
+    @allure.title('Проверка готовности кеширует результат проверки БД')
+    @pytest.mark.django_db
+    def test_ready_cached(self, client, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            assert client.get('/healthz/ready').status_code == status.HTTP_200_OK
+        with django_assert_num_queries(0):
+            assert client.get('/healthz/ready').status_code == status.HTTP_200_OK
+
+    @allure.story('Готовность')
+    @allure.title('При недоступной БД проверка готовности отвечает 503')
+    def test_database_unavailable(self, monkeypatch, caplog):
+        class BrokenConnections:
+            def __getitem__(self, alias):
+                raise OperationalError('connection to db.internal user=app refused')
+
+        check = ReadinessCheck('default', cache_seconds=5)
+        monkeypatch.setattr('main.health.connections', BrokenConnections())
+
+        # Текст ошибки драйвера — только в логе сервера, не в ответе
+        assert check.result() == {'status': 'unavailable', 'database': 'unavailable'}
+        assert 'db.internal' in caplog.text
+
+    @allure.story('Готовность')
+    @allure.title('Ответ 503 при недоступной БД')
+    def test_ready_unavailable_response(self, client, monkeypatch):
+        monkeypatch.setattr(ReadinessCheck, 'result', lambda self: {'status': 'unavailable', 'database': 'down'})
+        response = client.get('/healthz/ready')
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
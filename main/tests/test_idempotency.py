@@ -0,0 +1,154 @@
+import hashlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import allure
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from main.idempotency import _cache_key
+from main.models import AuthToken
+from main.serializers import UserRegisterSerializer
+
+REGISTER_URL = '/api/register/'
+CHANGE_PASSWORD_URL = '/api/change-password/'
+
+
+def password_data(old='testpass123', new='NewSecurePass123!'):
+    return {'old_password': old, 'new_password': new, 'new_password2': new}
+
+
+@pytest.mark.django_db
+@allure.feature('Idempotency-Key')
+class TestIdempotency:
+    """Тесты повторов запросов с Idempotency-Key"""
+
+    @allure.story('Регистрация')
+    @allure.title('Повтор регистрации с тем же ключом получает исходный ответ')
+    def test_register_replay(self, api_client, user_data):
+        first = api_client.post(REGISTER_URL, user_data, format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+        second = api_client.post(REGISTER_URL, user_data, format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert second['Idempotent-Replayed'] == 'true'
+        assert second.data['user'] == first.data['user']
+        assert User.objects.filter(username=user_data['username']).count() == 1
+        # Токен в кеше повторов не хранится — повтор получает новый токен для устройства
+        assert AuthToken.objects.get().key == second.data['token'] != first.data['token']
+
+    @allure.story('Безопасность')
+    @allure.title('В кеше повторов нет пароля (даже хешем без соли) и токена')
+    def test_record_has_no_secrets(self, api_client, user_data):
+        response = api_client.post(REGISTER_URL, user_data, format='json', HTTP_IDEMPOTENCY_KEY='key-4')
+        original = SimpleNamespace(method='POST', path=REGISTER_URL, user=AnonymousUser())
+        record = caches['default'].get(_cache_key(original, 'key-4'))
+
+        body = json.dumps(user_data, sort_keys=True, default=str)
+        assert record['fingerprint'] != hashlib.sha256(body.encode()).hexdigest()
+        assert response.data['token'] not in json.dumps(record)
+        assert record['private'] == ['token']
+
+    @allure.story('Регистрация')
+    @allure.title('Без ключа повтор регистрации — ошибка, как раньше')
+    def test_register_without_key(self, api_client, user_data):
+        api_client.post(REGISTER_URL, user_data, format='json')
+        response = api_client.post(REGISTER_URL, user_data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not response.has_header('Idempotent-Replayed')
+
+    @allure.story('Регистрация')
+    @allure.title('Ошибка валидации тоже повторяется без повторной проверки')
+    def test_validation_error_replayed(self, api_client, user_data):
+        user_data['password2'] = 'Mismatch123!'
+        first = api_client.post(REGISTER_URL, user_data, format='json', HTTP_IDEMPOTENCY_KEY='key-2')
+        second = api_client.post(REGISTER_URL, user_data, format='json', HTTP_IDEMPOTENCY_KEY='key-2')
+
+        assert first.status_code == second.status_code == status.HTTP_400_BAD_REQUEST
+        assert second['Idempotent-Replayed'] == 'true'
+        assert second.data == first.data
+
+    @allure.story('Ошибки')
+    @allure.title('Тот же ключ с другими данными — 422')
+    def test_key_reuse_with_other_body(self, api_client, user_data):
+        api_client.post(REGISTER_URL, user_data, format='json', HTTP_IDEMPOTENCY_KEY='key-3')
+        response = api_client.post(REGISTER_URL, {**user_data, 'username': 'other'}, format='json',
+                                   HTTP_IDEMPOTENCY_KEY='key-3')
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert not User.objects.filter(username='other').exists()
+
+    @allure.story('Смена пароля')
+    @allure.title('Повтор смены пароля возвращает успех, хотя старый пароль уже сменён')
+    def test_change_password_replay(self, authenticated_client, test_user):
+        first = authenticated_client.post(CHANGE_PASSWORD_URL, password_data(), format='json',
+                                          HTTP_IDEMPOTENCY_KEY='pw-1')
+        second = authenticated_client.post(CHANGE_PASSWORD_URL, password_data(), format='json',
+                                           HTTP_IDEMPOTENCY_KEY='pw-1')
+
+        assert first.status_code == second.status_code == status.HTTP_200_OK
+        assert second['Idempotent-Replayed'] == 'true'
+        test_user.refresh_from_db()
+        assert test_user.check_password('NewSecurePass123!')
+
+    @allure.story('Смена пароля')
+    @allure.title('Ключ действует в пределах пользователя')
+    def test_key_scoped_to_user(self, test_user, test_admin):
+        for user in (test_user, test_admin):
+            client = APIClient()
+            client.force_authenticate(user)
+            response = client.post(CHANGE_PASSWORD_URL, password_data(), format='json',
+                                   HTTP_IDEMPOTENCY_KEY='shared-key')
+            assert response.status_code == status.HTTP_200_OK
+            assert not response.has_header('Idempotent-Replayed')
+
+    @allure.story('Параллельные запросы')
+    @allure.title('Пока исходный запрос держит ключ дольше LOCK_TIMEOUT, дубликат получает 409')
+    def test_in_flight_timeout(self, api_client, user_data, settings):
+        settings.IDEMPOTENCY = {**settings.IDEMPOTENCY, 'LOCK_TIMEOUT': 0.2}
+        # Исходный запрос с этим ключом выполняется в другом воркере
+        original = SimpleNamespace(method='POST', path=REGISTER_URL, user=AnonymousUser())
+        caches['shared'].add(_cache_key(original, 'busy') + ':lock', 'other', 10)
+
+        response = api_client.post(REGISTER_URL, user_data, format='json', HTTP_IDEMPOTENCY_KEY='busy')
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not User.objects.filter(username=user_data['username']).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+@allure.feature('Idempotency-Key')
+class TestConcurrentDuplicates:
+    """Тесты параллельных дубликатов"""
+
+    @allure.story('Параллельные запросы')
+    @allure.title('Параллельный дубликат ждёт исходный запрос и получает его ответ')
+    def test_concurrent_register(self, user_data, monkeypatch):
+        create = UserRegisterSerializer.create
+
+        def slow_create(self, validated_data):
+            time.sleep(0.3)
+            return create(self, validated_data)
+
+        monkeypatch.setattr(UserRegisterSerializer, 'create', slow_create)
+        responses = []
+
+        def register():
+            responses.append(APIClient().post(REGISTER_URL, user_data, format='json',
+                                              HTTP_IDEMPOTENCY_KEY='concurrent'))
+
+        threads = [threading.Thread(target=register) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert [response.status_code for response in responses] == [status.HTTP_201_CREATED] * 3
+        assert sum(response.has_header('Idempotent-Replayed') for response in responses) == 2
+        assert len({response.data['token'] for response in responses}) == 1
+        assert User.objects.filter(username=user_data['username']).count() == 1
@@ -0,0 +1,153 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+import allure
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.utils import timezone
+
+from main.maintenance import ArchiveInactiveUsersJob, PruneUserChangesJob, PurgeSessionsJob
+from main.models import AuthToken, MaintenanceCheckpoint, UserChange
+from .factories import AdminFactory, UserFactory
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(settings):
+    settings.MAINTENANCE = {**settings.MAINTENANCE, 'SLEEP': 0}
+
+
+def make_sessions(count, expired):
+    expire_date = timezone.now() + (timedelta(days=-1) if expired else timedelta(days=1))
+    prefix = 'expired' if expired else 'active'
+    Session.objects.bulk_create(
+        Session(session_key=f'{prefix}{i:04d}', session_data='', expire_date=expire_date)
+        for i in range(count)
+    )
+
+
+@pytest.mark.django_db
+@allure.feature('Обслуживание БД')
+class TestBatchJobs:
+    """Тесты задач обслуживания пачками"""
+
+    @allure.story('Сессии')
+    @allure.title('Удаляются только истёкшие сессии, пачками')
+    def test_purge_sessions(self):
+        make_sessions(5, expired=True)
+        make_sessions(2, expired=False)
+
+        result = PurgeSessionsJob(batch_size=2).run()
+
+        assert result.processed == 5
+        assert result.batches == 3
+        assert result.finished
+        assert set(Session.objects.values_list('session_key', flat=True)) == {'active0000', 'active0001'}
+        assert not MaintenanceCheckpoint.objects.exists()
+
+    @allure.story('Позиция')
+    @allure.title('Прерванная задача продолжается с сохранённой позиции')
+    def test_resume_from_checkpoint(self):
+        make_sessions(5, expired=True)
+
+        result = PurgeSessionsJob(batch_size=2).run(max_batches=1)
+
+        assert not result.finished
+        checkpoint = MaintenanceCheckpoint.objects.get(job='purge_sessions')
+        assert (checkpoint.last_pk, checkpoint.processed) == ('expired0001', 2)
+
+        result = PurgeSessionsJob(batch_size=2).run()
+
+        assert result.finished
+        assert result.processed == 5
+        assert result.batches == 2
+        assert not Session.objects.exists()
+
+    @allure.story('Неактивные пользователи')
+    @allure.title('Деактивируются давно не входившие пользователи, сотрудники не затрагиваются')
+    def test_archive_inactive_users(self):
+        long_ago = timezone.now() - timedelta(days=400)
+        stale = UserFactory.create_batch(3, last_login=long_ago)
+        never = UserFactory(date_joined=long_ago)
+        recent = UserFactory(last_login=timezone.now())
+        staff = AdminFactory(last_login=long_ago)
+        archived = [user.pk for user in [*stale, never]]
+
+        result = ArchiveInactiveUsersJob(days=365, batch_size=2).run()
+
+        assert result.processed == 4
+        for user in [*stale, never, recent, staff]:
+            user.refresh_from_db()
+        assert not any(user.is_active for user in [*stale, never])
+        assert recent.is_active and staff.is_active
+        deactivated = UserChange.objects.filter(action=UserChange.DEACTIVATED)
+        assert sorted(deactivated.values_list('user_id', flat=True)) == sorted(archived)
+
+    @allure.story('Неактивные пользователи')
+    @allure.title('Пользователь с действующим токеном не деактивируется, хотя давно не входил')
+    def test_archive_skips_live_tokens(self, authenticated_client, test_user):
+        long_ago = timezone.now() - timedelta(days=400)
+        test_user.last_login = long_ago
+        test_user.save(update_fields=['last_login'])
+        expired = UserFactory(last_login=long_ago)
+        AuthToken.objects.issue(expired, 'phone')
+        AuthToken.objects.filter(user=expired).update(expires_at=timezone.now() - timedelta(days=1))
+
+        result = ArchiveInactiveUsersJob(days=365).run()
+
+        assert result.processed == 1
+        assert authenticated_client.get('/api/profile/').status_code == 200
+        expired.refresh_from_db()
+        assert not expired.is_active
+
+    @allure.story('Неактивные пользователи')
+    @allure.title('Деактивированный пользователь сразу пропадает из кеша API')
+    def test_archive_invalidates_cache(self, authenticated_client):
+        stale = UserFactory(last_login=timezone.now() - timedelta(days=400))
+        url = f'/api/users/{stale.pk}/'
+        assert authenticated_client.get(url).data['is_active'] is True
+
+        ArchiveInactiveUsersJob(days=365).run()
+
+        assert authenticated_client.get(url).data['is_active'] is False
+
+    @allure.story('Журнал изменений')
+    @allure.title('Старые записи журнала удаляются, последняя остаётся')
+    def test_prune_user_changes(self):
+        users = UserFactory.create_batch(3)
+        old = timezone.now() - timedelta(days=31)
+        UserChange.objects.update(created_at=old)
+        UserChange.record([users[0].id], UserChange.UPDATED)
+        latest_old = UserChange.objects.filter(created_at=old).order_by('-id').first()
+
+        result = PruneUserChangesJob(days=30, sleep=0).run()
+
+        assert result.finished
+        assert not UserChange.objects.filter(created_at__lt=timezone.now() - timedelta(days=30)).exists()
+        assert UserChange.objects.count() == 1
+        assert not UserChange.objects.filter(pk=latest_old.pk).exists()
+
+        UserChange.objects.update(created_at=old)
+        PruneUserChangesJob(days=30, sleep=0).run()
+        assert UserChange.objects.count() == 1
+
+    @allure.story('Команды')
+    @allure.title('Команда purge_sessions: пробный запуск, ограничение пачек и --restart')
+    def test_purge_sessions_command(self):
+        make_sessions(3, expired=True)
+
+        out = StringIO()
+        call_command('purge_sessions', '--dry-run', stdout=out)
+        assert 'Истёкших сессий: 3' in out.getvalue()
+        assert Session.objects.count() == 3
+
+        out = StringIO()
+        call_command('purge_sessions', '--batch-size', '1', '--max-batches', '1', stdout=out)
+        assert 'остаток обработает следующий запуск' in out.getvalue()
+        assert Session.objects.count() == 2
+
+        out = StringIO()
+        call_command('purge_sessions', '--batch-size', '1', '--restart', stdout=out)
+        assert 'Продолжение' not in out.getvalue()
+        assert 'Обработано: 2 за 2 пачек' in out.getvalue()
+        assert not Session.objects.exists()
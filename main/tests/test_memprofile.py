@@ -0,0 +1,94 @@
+import tracemalloc
+
+import pytest
+import allure
+from rest_framework import status
+
+from main.memprofile import profiler
+
+
+@pytest.fixture
+def memory_profiler(settings):
+    """Включает профилировщик памяти на время теста"""
+    settings.MEMORY_PROFILER = {'ENABLED': True, 'SAMPLE_RATE': 1.0, 'FRAMES': 1}
+    profiler.reset()
+    yield profiler
+    profiler.reset()
+    tracemalloc.stop()
+
+
+@pytest.mark.django_db
+@allure.feature('Профилирование памяти')
+class TestMemoryProfileAPI:
+    """Тесты отчёта профилировщика памяти"""
+
+    @allure.story('Отчёт профилировщика')
+    @allure.title('Админ получает статистику памяти по view')
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_memory_report(self, api_client, test_admin, memory_profiler):
+        with allure.step("Несколько запросов к списку пользователей"):
+            api_client.force_authenticate(user=test_admin)
+            for _ in range(3):
+                assert api_client.get('/api/admin/users/').status_code == status.HTTP_200_OK
+
+        with allure.step("Запрос отчёта профилировщика"):
+            response = api_client.get('/api/admin/memory/')
+            assert response.status_code == status.HTTP_200_OK
+
+        with allure.step("Проверка статистики по view и снимков"):
+            assert response.data['tracing'] is True
+            assert response.data['views']['api_users']['requests'] == 3
+            assert response.data['samples'] >= 3
+            assert 'api_users' in response.data['recent_by_view']
+
+    @allure.story('Отчёт профилировщика')
+    @allure.title('Отчёт недоступен обычному пользователю')
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_memory_report_forbidden(self, api_client, test_user, memory_profiler):
+        api_client.force_authenticate(user=test_user)
+        response = api_client.get('/api/admin/memory/')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    @allure.story('Отчёт профилировщика')
+    @allure.title('При выключенном профилировщике отчёт не отдаётся')
+    @allure.severity(allure.severity_level.MINOR)
+    def test_memory_report_disabled(self, api_client, test_admin):
+        api_client.force_authenticate(user=test_admin)
+        response = api_client.get('/api/admin/memory/')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @allure.story('Отчёт профилировщика')
+    @allure.title('Нечисловой или неположительный top — 400')
+    @allure.severity(allure.severity_level.MINOR)
+    def test_memory_report_bad_top(self, api_client, test_admin, memory_profiler):
+        api_client.force_authenticate(user=test_admin)
+
+        for top in ('abc', '0', '-5'):
+            response = api_client.get('/api/admin/memory/', {'top': top})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert 'error' in response.data
+
+        assert api_client.get('/api/admin/memory/', {'top': '5'}).status_code == status.HTTP_200_OK
+
+
+@allure.feature('Профилирование памяти')
+class TestOverlappedRequests:
+    """Тесты пометки запросов, выполнявшихся одновременно с другими"""
+
+    @allure.story('Потоки')
+    @allure.title('Запрос, пересёкшийся с другим, учитывается в overlapped_requests')
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_overlapped(self, memory_profiler):
+        alone = memory_profiler.enter()
+        assert memory_profiler.leave(alone) is False
+
+        # Второй запрос начался и закончился, пока выполнялся первый
+        first = memory_profiler.enter()
+        second = memory_profiler.enter()
+        assert memory_profiler.leave(second) is True
+        assert memory_profiler.leave(first) is True
+
+        memory_profiler.record('api_users', 100, 200, overlapped=False)
+        memory_profiler.record('api_users', 100, 200, overlapped=True)
+        stats = memory_profiler.report()['views']['api_users']
+        assert (stats['requests'], stats['overlapped_requests']) == (2, 1)
@@ -0,0 +1,73 @@
+import re
+
+import pytest
+import allure
+from django.contrib.sessions.models import Session
+from django.test import Client
+
+
+def csrf_from_form(response):
+    return re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1)
+
+
+@pytest.mark.django_db
+@allure.feature('Кеш страниц')
+class TestAnonymousPageCache:
+    """Тесты кеша HTML-страниц для анонимных посетителей"""
+
+    @allure.story('Анонимные посетители')
+    @allure.title('Повторный анонимный запрос отдаётся из кеша без сессии')
+    def test_home_cached_without_session(self, client):
+        assert client.get('/')['X-Page-Cache'] == 'miss'
+        response = client.get('/')
+
+        assert response['X-Page-Cache'] == 'hit'
+        assert 'Вы не авторизованы' in response.content.decode()
+        assert 'Cookie' in response['Vary']
+        assert not Session.objects.exists()
+
+    @allure.story('CSRF')
+    @allure.title('Страница из кеша содержит рабочий CSRF-токен текущего посетителя')
+    def test_sign_up_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.get('/sign-up/')
+        response = client.get('/sign-up/')
+        assert response['X-Page-Cache'] == 'hit'
+        token = csrf_from_form(response)
+        assert token != '__csrf_token__'
+
+        response = client.post('/sign-up/', {
+            'username': 'cached_form_user',
+            'email': 'cached@example.com',
+            'password1': 'StrongPass123!',
+            'password2': 'StrongPass123!',
+            'csrfmiddlewaretoken': token,
+        })
+        assert response.status_code == 302
+
+    @allure.story('Авторизованные пользователи')
+    @allure.title('Авторизованный пользователь не получает анонимную страницу из кеша')
+    def test_authenticated_bypass(self, client, test_user):
+        client.get('/')
+        client.force_login(test_user)
+
+        response = client.get('/')
+
+        assert not response.has_header('X-Page-Cache')
+        assert test_user.username in response.content.decode()
+
+    @allure.story('Авторизованные пользователи')
+    @allure.title('Страницы с login_required по-прежнему перенаправляют анонимов')
+    def test_login_required_not_cached(self, client):
+        assert client.get('/about/').status_code == 302
+        assert client.get('/about/').status_code == 302
+
+    @allure.story('Анонимные посетители')
+    @allure.title('Запросы с параметрами не создают записей в кеше')
+    def test_query_string_not_cached(self, client):
+        for value in range(3):
+            response = client.get('/', {'x': value})
+            assert response.status_code == 200
+            assert not response.has_header('X-Page-Cache')
+
+        assert client.get('/')['X-Page-Cache'] == 'miss'
@@ -0,0 +1,113 @@
+import pytest
+import allure
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from main import sessions
+from main.sessions import DELETED, SessionStore, SessionWriter
+
+
+@pytest.fixture
+def writer(settings, monkeypatch):
+    """Отложенная запись сессий без фонового потока: сброс в БД вызывается тестом"""
+    settings.SESSION_WRITE_BEHIND = {'ENABLED': True}
+    writer = SessionWriter(flush_interval=60, max_pending=1000, background=False)
+    monkeypatch.setattr(sessions, '_writer', writer)
+    return writer
+
+
+def session_queries(queries):
+    return [query['sql'] for query in queries if 'django_session' in query['sql']]
+
+
+@pytest.mark.django_db
+@allure.feature('Сессии')
+class TestWriteBehindSessions:
+    """Тесты движка сессий с отложенной записью"""
+
+    @allure.story('Отложенная запись')
+    @allure.title('Сессия сохраняется в кеш сразу, а в БД — при сбросе')
+    def test_save_then_flush(self, writer):
+        store = SessionStore()
+        store['answer'] = 42
+        store.create()
+
+        assert not Session.objects.filter(session_key=store.session_key).exists()
+        assert SessionStore(store.session_key)['answer'] == 42
+
+        writer.flush()
+        assert Session.objects.filter(session_key=store.session_key).exists()
+
+    @allure.story('Отложенная запись')
+    @allure.title('Несколько изменений сессии пишутся в БД одной записью')
+    def test_coalescing(self, writer):
+        store = SessionStore()
+        store.create()
+        for value in range(5):
+            store['counter'] = value
+            store.save()
+        assert len(writer._pending) == 1
+
+        writer.flush()
+        assert SessionStore().decode(Session.objects.get(session_key=store.session_key).session_data) == {
+            'counter': 4,
+        }
+
+    @allure.story('Выход')
+    @allure.title('Удалённая сессия не восстанавливается из БД до сброса')
+    def test_delete_before_flush(self, writer):
+        store = SessionStore()
+        store['user'] = 'x'
+        store.create()
+        writer.flush()
+
+        store.delete()
+        assert writer.pending(store.session_key) is DELETED
+        assert SessionStore(store.session_key).load() == {}
+
+        writer.flush()
+        assert not Session.objects.filter(session_key=store.session_key).exists()
+
+    @allure.story('Выход')
+    @allure.title('Сессия, удалённая в одном воркере, не восстанавливается в другом')
+    def test_delete_seen_by_other_worker(self, writer, monkeypatch):
+        other = SessionWriter(flush_interval=60, max_pending=1000, background=False)
+        store = SessionStore()
+        store['_auth_user_id'] = '1'
+        store.create()
+        writer.flush()
+
+        # Другой воркер успел изменить сессию, но ещё не записал её в БД
+        monkeypatch.setattr(sessions, '_writer', other)
+        stale = SessionStore(store.session_key)
+        stale['seen'] = True
+        stale.save()
+
+        monkeypatch.setattr(sessions, '_writer', writer)
+        store.delete()
+        assert not Session.objects.filter(session_key=store.session_key).exists()
+
+        monkeypatch.setattr(sessions, '_writer', other)
+        other.flush()
+        assert SessionStore(store.session_key).load() == {}
+        writer.flush()
+        assert SessionStore(store.session_key).load() == {}
+
+        with pytest.raises(UpdateError):
+            stale.save()
+
+    @allure.story('Запросы')
+    @allure.title('Страницы авторизованного пользователя не обращаются к таблице сессий')
+    def test_no_session_queries(self, writer, client, test_user):
+        response = client.post('/accounts/login/', {'username': test_user.username, 'password': 'testpass123'})
+        assert response.status_code == 302
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/profile/')
+        assert response.status_code == 200
+        assert session_queries(queries) == []
+
+        client.post('/accounts/logout/')
+        assert client.get('/profile/').status_code == 302
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+import allure
+from rest_framework import status
+
+from main.jsonlog import get_writer
+
+
+def read_log(path):
+    get_writer(str(path)).flush()
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+@pytest.mark.django_db
+@allure.feature('Журнал медленных запросов')
+class TestSlowRequestLog:
+    """Тесты журнала медленных запросов"""
+
+    @allure.story('Запись медленных запросов')
+    @allure.title('API-запрос выше порога попадает в журнал вместе с SQL')
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_slow_api_request_logged(self, api_client, test_user, settings, tmp_path):
+        with allure.step("Включение журнала с нулевым порогом"):
+            log_file = tmp_path / 'slow.jsonl'
+            settings.SLOW_REQUEST_LOG = {'ENABLED': True, 'THRESHOLD_MS': 0, 'FILE': str(log_file)}
+
+        with allure.step("Вход через API"):
+            response = api_client.post('/api/login/', {
+                'username': test_user.username,
+                'password': 'testpass123'
+            }, format='json')
+            assert response.status_code == status.HTTP_200_OK
+
+        with allure.step("Проверка записи в журнале"):
+            record = read_log(log_file)[-1]
+            allure.attach(json.dumps(record, ensure_ascii=False, indent=2), name="Запись журнала",
+                          attachment_type=allure.attachment_type.JSON)
+            assert record['path'] == '/api/login/'
+            assert record['query_count'] == len(record['queries']) > 0
+            assert any('auth_user' in query['sql'] for query in record['queries'])
+
+        with allure.step("Проверка, что хеш пароля и токен скрыты"):
+            dumped = json.dumps(record)
+            assert response.data['token'] not in dumped
+            assert 'pbkdf2_sha256$' not in dumped
+
+    @allure.story('Запись медленных запросов')
+    @allure.title('HTML-страница профиля попадает в журнал с местом вызова')
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_slow_template_view_logged(self, client, test_user, settings, tmp_path):
+        log_file = tmp_path / 'slow.jsonl'
+        settings.SLOW_REQUEST_LOG = {'ENABLED': True, 'THRESHOLD_MS': 0, 'FILE': str(log_file)}
+        client.force_login(test_user)
+
+        response = client.get('/profile/')
+        assert response.status_code == status.HTTP_200_OK
+
+        record = read_log(log_file)[-1]
+        assert record['path'] == '/profile/'
+        assert record['user_id'] == test_user.id
+
+    @allure.story('Порог')
+    @allure.title('Быстрые запросы в журнал не попадают')
+    @allure.severity(allure.severity_level.MINOR)
+    def test_fast_request_not_logged(self, api_client, settings, tmp_path):
+        log_file = tmp_path / 'slow.jsonl'
+        settings.SLOW_REQUEST_LOG = {'ENABLED': True, 'THRESHOLD_MS': 60000, 'FILE': str(log_file)}
+
+        response = api_client.get('/api/users/')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        get_writer(str(log_file)).flush()
+        assert not log_file.exists()
@@ -0,0 +1,64 @@
+import pytest
+import allure
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import Client
+
+from main.storage import minify_css
+
+
+@pytest.fixture
+def collected_static(settings, tmp_path):
+    """collectstatic статики проекта в боевом хранилище во временный STATIC_ROOT"""
+    settings.STATIC_ROOT = tmp_path
+    settings.STATICFILES_FINDERS = ['django.contrib.staticfiles.finders.FileSystemFinder']
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'main.storage.MinifiedStaticFilesStorage'},
+    }
+    call_command('collectstatic', interactive=False, verbosity=0)
+    return tmp_path
+
+
+@allure.feature('Статика')
+class TestStaticAssets:
+    """Тесты сборки и отдачи статических файлов"""
+
+    @allure.story('Минификация')
+    @allure.title('CSS минифицируется без изменения строк')
+    def test_minify_css(self):
+        css = '/* comment */\nbody {\n    margin: 0 ;\n    content: "a  b";\n}\na:hover , b > i { color: red; }\n'
+        assert minify_css(css) == 'body{margin:0;content:"a  b"}a:hover,b>i{color:red}'
+
+    @allure.story('Сборка')
+    @allure.title('collectstatic создаёт минифицированные файлы с хешем и сжатые копии')
+    def test_collectstatic(self, collected_static):
+        hashed = [path for path in (collected_static / 'css').glob('home.*.css')]
+        assert len(hashed) == 1
+        assert '\n' not in hashed[0].read_text()
+        assert hashed[0].with_name(hashed[0].name + '.gz').exists()
+
+    @allure.story('Отдача')
+    @allure.title('Файл с хешем отдаётся с долгим кешированием и поддержкой Range')
+    @pytest.mark.django_db
+    def test_serve_hashed_file(self, collected_static):
+        url = static('css/home.css')
+        assert url != '/static/css/home.css'
+        client = Client()
+
+        response = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        assert response.status_code == 200
+        assert 'immutable' in response['Cache-Control']
+        assert response['Content-Encoding'] == 'gzip'
+
+        partial = client.get(url, HTTP_RANGE='bytes=0-9')
+        assert partial.status_code == 206
+        assert len(b''.join(partial.streaming_content)) == 10
+
+    @allure.story('Шаблоны')
+    @allure.title('Страницы подключают CSS файлом, а не встроенным стилем')
+    @pytest.mark.django_db
+    def test_pages_link_stylesheet(self, client):
+        content = client.get('/').content.decode()
+        assert '<style>' not in content
+        assert '/static/css/home.css' in content
@@ -0,0 +1,212 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+import allure
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+
+from main import tasks
+from main.cache import user_tag
+from main.models import Task
+from main.serializers import UserDetailSerializer
+from main.task_queue import Worker, retry_failed, task, thread_runner
+
+calls = []
+failures = {'left': 0}
+done = threading.Event()
+
+
+@task
+def record(value):
+    calls.append(value)
+    done.set()
+
+
+@task(max_attempts=2)
+def flaky(value):
+    if failures['left']:
+        failures['left'] -= 1
+        raise ConnectionError('Сервер недоступен')
+    calls.append(value)
+    done.set()
+
+
+@task(batched=True)
+def record_batch(kwargs_list):
+    calls.append([kwargs['value'] for kwargs in kwargs_list])
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+    failures['left'] = 0
+    done.clear()
+
+
+@pytest.fixture
+def db_mode(settings):
+    settings.TASK_QUEUE = {**settings.TASK_QUEUE, 'MODE': 'db', 'RETRY_DELAY': 60}
+
+
+@pytest.mark.django_db
+@allure.feature('Фоновые задачи')
+class TestRegistrationTasks:
+    """Тесты работы после регистрации"""
+
+    @allure.story('Регистрация')
+    @allure.title('После регистрации отправлено письмо, записан аудит и прогрет кеш карточки')
+    def test_register(self, api_client, user_data, django_capture_on_commit_callbacks, caplog):
+        # Уровень INFO для main.audit задан в LOGGING, а не в тесте
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post('/api/register/', user_data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [message.to for message in mail.outbox] == [[user_data['email']]]
+        assert [record.user_id for record in caplog.records if record.name == 'main.audit'] == [response.data['user']['id']]
+        assert cache.get(f'user_detail:{response.data["user"]["id"]}')['username'] == user_data['username']
+
+    @allure.story('Регистрация')
+    @allure.title('В режиме db регистрация только ставит задачи, воркер их выполняет')
+    def test_register_db_mode(self, api_client, user_data, db_mode):
+        api_client.post('/api/register/', user_data, format='json')
+
+        assert mail.outbox == []
+        assert Task.objects.count() == 3
+
+        assert Worker().run_batch() == 3
+        assert len(mail.outbox) == 1
+        assert not Task.objects.exists()
+
+    @allure.story('Прогрев кеша')
+    @allure.title('Изменение пользователя между чтением и записью не оставляет устаревшую карточку')
+    def test_warm_cache_races_update(self, test_user, monkeypatch):
+        class UpdatedWhileReading(UserDetailSerializer):
+            @property
+            def data(self):
+                data = super().data
+                # Другой запрос меняет пользователя после чтения из БД
+                cache.invalidate_tags(user_tag(self.instance.pk))
+                return data
+
+        monkeypatch.setattr(tasks, 'UserDetailSerializer', UpdatedWhileReading)
+
+        tasks.warm_user_cache([{'user_id': test_user.pk}])
+
+        assert cache.get(f'user_detail:{test_user.pk}') is None
+
+
+@pytest.mark.django_db
+@allure.feature('Фоновые задачи')
+class TestDatabaseQueue:
+    """Тесты очереди в таблице (режим db)"""
+
+    @allure.story('Транзакции')
+    @allure.title('Задача из откатившейся транзакции не выполняется')
+    def test_rollback(self, db_mode):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                record.enqueue(value=1)
+                raise RuntimeError
+
+        assert not Task.objects.exists()
+
+    @allure.story('Повторы')
+    @allure.title('Упавшая задача откладывается, после max_attempts — failed')
+    def test_retries(self, db_mode):
+        failures['left'] = 5
+        flaky.enqueue(value=1)
+
+        Worker().run_batch()
+        row = Task.objects.get()
+        assert (row.status, row.attempts) == (Task.PENDING, 1)
+        assert row.run_after > timezone.now() + timedelta(seconds=50)
+        assert 'Сервер недоступен' in row.last_error
+        assert Worker().run_batch() == 0
+
+        Task.objects.update(run_after=timezone.now())
+        Worker().run_batch()
+        row.refresh_from_db()
+        assert (row.status, row.attempts) == (Task.FAILED, 2)
+
+        failures['left'] = 0
+        assert retry_failed() == 1
+        Worker().run_batch()
+        assert calls == [1]
+        assert not Task.objects.exists()
+
+    @allure.story('Пачки')
+    @allure.title('batched-задача получает аргументы всей пачки одним вызовом')
+    def test_batched(self, db_mode):
+        for value in range(5):
+            record_batch.enqueue(value=value)
+
+        assert Worker(batch_size=3).run_batch() == 3
+        assert Worker(batch_size=3).run_batch() == 2
+        assert calls == [[0, 1, 2], [3, 4]]
+
+    @allure.story('Захват')
+    @allure.title('Захваченная задача недоступна другому воркеру, пока не истёк захват')
+    def test_lease(self, db_mode):
+        record.enqueue(value=1)
+        claimed = Worker().claim()
+
+        assert len(claimed) == 1
+        assert Worker().claim() == []
+
+        Task.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        assert [row.pk for row in Worker().claim()] == [claimed[0].pk]
+
+    @allure.story('Захват')
+    @allure.title('Истёкший захват последней попытки — failed, задачу можно повторить')
+    def test_lease_expired_on_last_attempt(self, db_mode):
+        flaky.enqueue(value=1)
+        Task.objects.update(max_attempts=1)
+        Worker().claim()
+        Task.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        assert Worker().claim() == []
+        row = Task.objects.get()
+        assert (row.status, row.attempts, row.last_error) == (Task.FAILED, 1, 'lease expired')
+
+        assert retry_failed() == 1
+        Worker().run_batch()
+        assert calls == [1]
+
+    @allure.story('Команда')
+    @allure.title('task_worker --once выполняет накопленные задачи и завершается')
+    def test_worker_command(self, db_mode):
+        record.enqueue(value=1)
+        record.enqueue(value=2)
+        out = StringIO()
+
+        call_command('task_worker', '--once', stdout=out)
+
+        assert calls == [1, 2]
+        assert 'Обработано задач: 2' in out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+@allure.feature('Фоновые задачи')
+class TestThreadQueue:
+    """Тесты пула потоков (режим thread)"""
+
+    @allure.story('Пул потоков')
+    @allure.title('Задача выполняется в пуле после фиксации транзакции, с повтором')
+    def test_thread_retry(self, settings):
+        settings.TASK_QUEUE = {**settings.TASK_QUEUE, 'MODE': 'thread', 'RETRY_DELAY': 0.01}
+        failures['left'] = 1
+        try:
+            with transaction.atomic():
+                flaky.enqueue(value='x')
+                assert not done.wait(0.1)
+
+            assert done.wait(5)
+            assert calls == ['x']
+        finally:
+            thread_runner.shutdown()
@@ -0,0 +1,53 @@
+import pytest
+import allure
+from django.template import engines
+
+from main.template_warmup import precompile_templates
+
+
+@allure.feature('Шаблоны')
+class TestTemplateCache:
+    """Тесты кеширования шаблонов и фрагментов"""
+
+    @allure.story('Предкомпиляция')
+    @allure.title('Шаблоны проекта компилируются заранее в кеш загрузчика')
+    def test_precompile(self):
+        engine = engines['django'].engine
+        loader = engine.template_loaders[0]
+        loader.reset()
+
+        count = precompile_templates()
+
+        assert count >= 6
+        assert any(key.startswith('home.html') for key in loader.get_template_cache)
+
+    @allure.story('Фрагменты')
+    @allure.title('Главная страница остаётся персональной при кешированных фрагментах')
+    @pytest.mark.django_db
+    def test_home_dynamic_parts(self, client, test_user):
+        anonymous = client.get('/').content.decode()
+        assert 'Вы не авторизованы' in anonymous
+
+        client.force_login(test_user)
+        personal = client.get('/').content.decode()
+        assert test_user.username in personal
+        assert 'Вы не авторизованы' not in personal
+        assert '/about/' in personal
+
+    @allure.story('Фрагменты')
+    @allure.title('Сообщения и форма профиля не кешируются')
+    @pytest.mark.django_db
+    def test_profile_messages(self, client, test_user):
+        client.force_login(test_user)
+        client.get('/profile/')
+
+        response = client.post('/profile/', {
+            'username': test_user.username,
+            'email': test_user.email,
+            'first_name': 'Новое',
+            'last_name': test_user.last_name,
+        }, follow=True)
+
+        content = response.content.decode()
+        assert 'Ваш профиль успешно обновлен!' in content
+        assert 'value="Новое"' in content
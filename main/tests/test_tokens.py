@@ -0,0 +1,171 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+import allure
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from main.authentication import ExpiringTokenAuthentication
+from main.models import AuthToken
+
+
+def client_with(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def login(api_client, user, device):
+    response = api_client.post('/api/login/', {
+        'username': user.username, 'password': 'testpass123', 'device': device,
+    }, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    return response.data['token']
+
+
+@pytest.mark.django_db
+@allure.feature('Токены API')
+class TestAuthTokens:
+    """Тесты срока действия и устройств токенов"""
+
+    @allure.story('Срок действия')
+    @allure.title('Истёкший токен отклоняется')
+    def test_expired_token_rejected(self, test_user):
+        token = AuthToken.objects.issue(test_user)
+        AuthToken.objects.filter(pk=token.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        response = client_with(token).get('/api/profile/')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @allure.story('Срок действия')
+    @allure.title('Токен, продлённый в другом воркере, принимается, хотя копия в кеше истекла')
+    def test_stale_cached_expiry_rechecked(self, test_user):
+        token = AuthToken.objects.issue(test_user)
+        stale = AuthToken.objects.get(pk=token.pk)
+        stale.expires_at = timezone.now() - timedelta(seconds=1)
+        ExpiringTokenAuthentication.cache_credentials(token.key, test_user, stale)
+
+        assert client_with(token).get('/api/profile/').status_code == status.HTTP_200_OK
+
+    @allure.story('Продление')
+    @allure.title('Токен продлевается, когда прошло больше половины срока')
+    def test_sliding_renewal(self, test_user, settings):
+        settings.AUTH_TOKEN_TTL = 3600
+        token = AuthToken.objects.issue(test_user)
+        old_expiry = timezone.now() + timedelta(minutes=10)
+        AuthToken.objects.filter(pk=token.pk).update(expires_at=old_expiry)
+
+        assert client_with(token).get('/api/profile/').status_code == status.HTTP_200_OK
+
+        token.refresh_from_db()
+        assert token.expires_at > old_expiry + timedelta(minutes=40)
+
+    @allure.story('Продление')
+    @allure.title('Свежий токен не продлевается на каждый запрос')
+    def test_no_renewal_for_fresh_token(self, test_user):
+        token = AuthToken.objects.issue(test_user)
+        client = client_with(token)
+        client.get('/api/profile/')
+        expires_at = AuthToken.objects.get(pk=token.pk).expires_at
+
+        client.get('/api/profile/')
+
+        assert AuthToken.objects.get(pk=token.pk).expires_at == expires_at
+
+    @allure.story('Устройства')
+    @allure.title('Вход с разных устройств выдаёт разные токены')
+    def test_token_per_device(self, api_client, test_user):
+        phone = login(api_client, test_user, 'phone')
+        laptop = login(api_client, test_user, 'laptop')
+
+        assert phone != laptop
+        assert set(AuthToken.objects.filter(user=test_user).values_list('device', flat=True)) == {'phone', 'laptop'}
+
+        phone_client = APIClient()
+        phone_client.credentials(HTTP_AUTHORIZATION=f'Token {phone}')
+        assert phone_client.post('/api/logout/').status_code == status.HTTP_200_OK
+        assert list(AuthToken.objects.filter(user=test_user).values_list('key', flat=True)) == [laptop]
+
+    @allure.story('Устройства')
+    @allure.title('Повторные входы с одного устройства заменяют его токен и не вытесняют другие')
+    def test_relogin_same_device(self, api_client, test_user, settings):
+        settings.AUTH_TOKEN_MAX_PER_USER = 3
+        laptop = login(api_client, test_user, 'laptop')
+        tablet = login(api_client, test_user, 'tablet')
+        phone_tokens = [login(api_client, test_user, 'phone') for _ in range(5)]
+
+        assert AuthToken.objects.filter(user=test_user, device='phone').count() == 1
+        assert client_with(AuthToken(key=phone_tokens[0])).get('/api/profile/').status_code == \
+            status.HTTP_401_UNAUTHORIZED
+        for key in (laptop, tablet, phone_tokens[-1]):
+            assert client_with(AuthToken(key=key)).get('/api/profile/').status_code == status.HTTP_200_OK
+
+    @allure.story('Устройства')
+    @allure.title('Без поля device одинаковые клиенты не выходят из аккаунта друг у друга')
+    def test_login_without_device(self, api_client, test_user):
+        credentials = {'username': test_user.username, 'password': 'testpass123'}
+        first, second = (
+            api_client.post('/api/login/', credentials, format='json', HTTP_USER_AGENT='App/1.0').data['token']
+            for _ in range(2)
+        )
+
+        assert first != second
+        devices = list(AuthToken.objects.filter(user=test_user).values_list('device', flat=True))
+        assert len(set(devices)) == 2 and all(device.startswith('App/1.0 #') for device in devices)
+        for key in (first, second):
+            assert client_with(AuthToken(key=key)).get('/api/profile/').status_code == status.HTTP_200_OK
+
+    @allure.story('Устройства')
+    @allure.title('Выход на всех устройствах удаляет все токены')
+    def test_logout_all(self, api_client, test_user):
+        login(api_client, test_user, 'phone')
+        laptop = login(api_client, test_user, 'laptop')
+        api_client.credentials(HTTP_AUTHORIZATION=f'Token {laptop}')
+
+        response = api_client.post('/api/logout-all/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['tokens_deleted'] == 2
+        assert not AuthToken.objects.filter(user=test_user).exists()
+        assert api_client.get('/api/profile/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    @allure.story('Устройства')
+    @allure.title('Сверх лимита удаляются самые старые токены')
+    def test_max_tokens_per_user(self, test_user, settings):
+        settings.AUTH_TOKEN_MAX_PER_USER = 2
+        first = AuthToken.objects.issue(test_user, 'first')
+        AuthToken.objects.issue(test_user, 'second')
+        AuthToken.objects.issue(test_user, 'third')
+
+        devices = set(AuthToken.objects.filter(user=test_user).values_list('device', flat=True))
+        assert devices == {'second', 'third'}
+        assert client_with(first).get('/api/profile/').status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+@allure.feature('Токены API')
+class TestClearTokensCommand:
+    """Тесты команды cleartokens"""
+
+    @allure.story('Очистка')
+    @allure.title('Удаляются только истёкшие токены, пачками')
+    def test_clear_expired(self, test_user, settings):
+        settings.AUTH_TOKEN_MAX_PER_USER = 0
+        tokens = [AuthToken.objects.issue(test_user, f'device-{i}') for i in range(5)]
+        expired = [token.pk for token in tokens[:3]]
+        AuthToken.objects.filter(pk__in=expired).update(expires_at=timezone.now() - timedelta(days=1))
+
+        out = StringIO()
+        call_command('cleartokens', '--dry-run', stdout=out)
+        assert 'Истёкших токенов: 3' in out.getvalue()
+        assert AuthToken.objects.count() == 5
+
+        out = StringIO()
+        call_command('cleartokens', '--batch-size', '2', '--sleep', '0', stdout=out)
+
+        assert 'Обработано: 3 за 2 пачек' in out.getvalue()
+        assert set(AuthToken.objects.values_list('pk', flat=True)) == {tokens[3].pk, tokens[4].pk}
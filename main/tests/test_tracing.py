@@ -0,0 +1,64 @@
+import json
+
+import pytest
+import allure
+from rest_framework import status
+
+from main.jsonlog import get_writer
+
+
+@pytest.mark.django_db
+@allure.feature('Трассировка запросов')
+class TestTracing:
+    """Тесты заголовка Server-Timing и файла трасс"""
+
+    @allure.story('Server-Timing')
+    @allure.title('Разбивка входа по фазам в заголовке Server-Timing')
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_login_server_timing(self, api_client, test_user, settings):
+        with allure.step("Включение трассировки"):
+            settings.TRACING = {'ENABLED': True, 'SERVER_TIMING': True}
+
+        with allure.step("Отправка POST-запроса на вход"):
+            response = api_client.post('/api/login/', {
+                'username': test_user.username,
+                'password': 'testpass123'
+            }, format='json')
+
+        with allure.step("Проверка статуса ответа (ожидается 200 OK)"):
+            assert response.status_code == status.HTTP_200_OK
+
+        with allure.step("Проверка фаз в заголовке Server-Timing"):
+            header = response['Server-Timing']
+            allure.attach(header, name="Server-Timing", attachment_type=allure.attachment_type.TEXT)
+            for phase in ('auth', 'hash', 'db', 'token', 'serialize', 'render', 'session', 'total'):
+                assert f'{phase};dur=' in header, f"В заголовке нет фазы '{phase}'"
+
+    @allure.story('Server-Timing')
+    @allure.title('Без включённой трассировки заголовок не добавляется')
+    @allure.severity(allure.severity_level.MINOR)
+    def test_tracing_disabled(self, authenticated_client, settings):
+        settings.TRACING = {'ENABLED': False}
+        response = authenticated_client.get('/api/profile/')
+        assert response.status_code == status.HTTP_200_OK
+        assert 'Server-Timing' not in response
+
+    @allure.story('Файл трасс')
+    @allure.title('Запись трассы в JSONL-файл')
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_trace_file(self, api_client, test_user, settings, tmp_path):
+        with allure.step("Включение записи всех трасс в файл"):
+            trace_file = tmp_path / 'traces.jsonl'
+            settings.TRACING = {'ENABLED': True, 'FILE': str(trace_file), 'SAMPLE_RATE': 1.0}
+            api_client.force_authenticate(user=test_user)
+
+        with allure.step("Запрос пользователя по ID"):
+            response = api_client.get(f'/api/users/{test_user.id}/')
+            assert response.status_code == status.HTTP_200_OK
+
+        with allure.step("Проверка записи в файле трасс"):
+            get_writer(str(trace_file)).flush()
+            records = [json.loads(line) for line in trace_file.read_text(encoding='utf-8').splitlines()]
+            assert records[-1]['path'] == f'/api/users/{test_user.id}/'
+            assert records[-1]['status'] == 200
+            assert 'db' in records[-1]['spans']
@@ -0,0 +1,126 @@
+from datetime import timedelta
+
+import pytest
+import allure
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework import status
+
+from main.models import UserChange
+
+CHANGES_URL = '/api/users/changes/'
+
+
+@pytest.fixture(autouse=True)
+def no_settle(settings):
+    settings.CHANGE_FEED_SETTLE_SECONDS = 0
+
+
+def sync(client, cursor):
+    response = client.get(CHANGES_URL, {'cursor': cursor})
+    assert response.status_code == status.HTTP_200_OK
+    return response.data
+
+
+@pytest.mark.django_db
+@allure.feature('Журнал изменений')
+class TestUserChanges:
+    """Тесты инкрементальной синхронизации пользователей"""
+
+    @allure.story('Синхронизация')
+    @allure.title('После курсора приходят только новые изменения')
+    @allure.severity(allure.severity_level.CRITICAL)
+    def test_incremental_sync(self, authenticated_client, test_user):
+        with allure.step("Полная синхронизация с курсора 0"):
+            data = sync(authenticated_client, 0)
+            assert test_user.id in [change['id'] for change in data['changes']]
+            cursor = data['cursor']
+
+        with allure.step("Без изменений курсор не двигается"):
+            data = sync(authenticated_client, cursor)
+            assert data['changes'] == []
+            assert data['cursor'] == cursor
+
+        with allure.step("Регистрация нового пользователя попадает в журнал"):
+            authenticated_client.post('/api/register/', {
+                'username': 'feed_user',
+                'email': 'feed@example.com',
+                'password': 'StrongPass123!',
+                'password2': 'StrongPass123!',
+            }, format='json')
+            data = sync(authenticated_client, cursor)
+            assert [(change['action'], change['user']['username']) for change in data['changes']] == [
+                ('created', 'feed_user'),
+            ]
+
+    @allure.story('Синхронизация')
+    @allure.title('Изменение профиля и деактивация публикуются, вход — нет')
+    def test_update_and_deactivate(self, authenticated_client, test_user):
+        cursor = UserChange.objects.order_by('-id').values_list('id', flat=True).first()
+
+        authenticated_client.patch('/api/profile/', {'first_name': 'Новое'}, format='json')
+        data = sync(authenticated_client, cursor)
+        assert [(change['id'], change['action']) for change in data['changes']] == [(test_user.id, 'updated')]
+        assert data['changes'][0]['user']['first_name'] == 'Новое'
+
+        other = User.objects.create_user('inactive_user', password='testpass123')
+        other.is_active = False
+        other.save()
+        data = sync(authenticated_client, data['cursor'])
+        assert [(change['id'], change['action']) for change in data['changes']] == [(other.id, 'deactivated')]
+
+    @allure.story('Синхронизация')
+    @allure.title('Удалённый пользователь приходит без данных')
+    def test_deleted_user(self, authenticated_client):
+        user = User.objects.create_user('deleted_user', password='testpass123')
+        cursor = UserChange.objects.order_by('-id').values_list('id', flat=True).first()
+        user_id = user.id
+        user.delete()
+
+        data = sync(authenticated_client, cursor)
+        assert data['changes'] == [{'id': user_id, 'action': 'deleted', 'user': None}]
+
+    @allure.story('Постраничность')
+    @allure.title('Большой журнал отдаётся страницами по limit')
+    def test_pagination(self, authenticated_client):
+        for index in range(5):
+            User.objects.create_user(f'page_user_{index}', password='testpass123')
+        cursor = 0
+        seen = []
+        while True:
+            data = authenticated_client.get(CHANGES_URL, {'cursor': cursor, 'limit': 2}).data
+            seen.extend(change['id'] for change in data['changes'])
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+        assert set(User.objects.values_list('id', flat=True)) <= set(seen)
+
+    @allure.story('Синхронизация')
+    @allure.title('Курсор не проходит через недавнюю дыру в id')
+    @allure.severity(allure.severity_level.CRITICAL)
+    def test_cursor_holds_at_gap(self, authenticated_client, settings):
+        settings.CHANGE_FEED_GAP_SECONDS = 60
+        users = [User.objects.create_user(f'gap_user_{index}', password='testpass123') for index in range(3)]
+        change_ids = list(UserChange.objects.filter(user_id__in=[user.id for user in users])
+                          .order_by('id').values_list('id', flat=True))
+        cursor = change_ids[0] - 1
+
+        with allure.step("Запись в середине ещё не видна (транзакция не зафиксирована)"):
+            UserChange.objects.filter(id=change_ids[1]).delete()
+            data = sync(authenticated_client, cursor)
+            assert [change['id'] for change in data['changes']] == [users[0].id]
+            assert data['has_more'] is False
+            cursor = data['cursor']
+            assert cursor == change_ids[0]
+
+        with allure.step("Дыра старше CHANGE_FEED_GAP_SECONDS считается откатом"):
+            UserChange.objects.filter(id=change_ids[2]).update(created_at=timezone.now() - timedelta(seconds=61))
+            data = sync(authenticated_client, cursor)
+            assert [change['id'] for change in data['changes']] == [users[2].id]
+            assert data['cursor'] == change_ids[2]
+
+    @allure.story('Валидация')
+    @allure.title('Некорректный курсор отклоняется')
+    def test_invalid_cursor(self, authenticated_client):
+        response = authenticated_client.get(CHANGES_URL, {'cursor': 'abc'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
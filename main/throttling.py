@@ -0,0 +1,19 @@
+# main/throttling.py
+"""
+Ограничение частоты запросов DRF со счётчиками в общем уровне кеша.
+
+Стандартные throttle-классы хранят историю в cache по умолчанию; у
+TieredCache это L1 процесса, и каждый воркер считал бы запросы отдельно.
+Здесь история читается и пишется прямо в общий уровень (cache.shared),
+как блокировки Idempotency-Key.
+"""
+from django.core.cache import cache as default_cache
+from rest_framework.throttling import ScopedRateThrottle
+
+
+class SharedScopedRateThrottle(ScopedRateThrottle):
+    """ScopedRateThrottle (throttle_scope у view) с историей в общем кеше"""
+
+    @property
+    def cache(self):
+        return getattr(default_cache, 'shared', default_cache)
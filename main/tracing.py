@@ -0,0 +1,185 @@
+# main/tracing.py
+"""
+Лёгкая трассировка запросов.
+
+Спаны по фазам (аутентификация, хеширование пароля, запросы к БД,
+сериализация, рендеринг, запись сессии) собираются в рамках одного запроса
+и отдаются клиенту в заголовке Server-Timing. Часть трасс (по SAMPLE_RATE)
+дополнительно пишется в локальный JSONL-файл фоновым потоком (см. jsonlog).
+"""
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from .jsonlog import get_writer
+
+_current_trace = ContextVar('current_trace', default=None)
+
+
+def get_tracing_config():
+    """Настройки трассировки с значениями по умолчанию"""
+    config = {
+        'ENABLED': False,
+        'SERVER_TIMING': True,
+        'FILE': '',
+        'SAMPLE_RATE': 0.01,
+    }
+    config.update(getattr(settings, 'TRACING', {}))
+    return config
+
+
+class Trace:
+    """Накопитель спанов одного запроса: имя фазы -> [суммарные мс, количество]"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.active = set()
+
+    def add(self, name, duration_ms):
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [duration_ms, 1]
+        else:
+            entry[0] += duration_ms
+            entry[1] += 1
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self, total_ms):
+        """Значение заголовка Server-Timing"""
+        parts = [
+            f'{name};dur={duration:.1f};desc="x{count}"'
+            for name, (duration, count) in self.spans.items()
+        ]
+        parts.append(f'total;dur={total_ms:.1f}')
+        return ', '.join(parts)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name):
+    """
+    Замеряет фазу запроса. Вне трассируемого запроса ничего не делает.
+    Вложенный спан с тем же именем не учитывается повторно.
+    """
+    trace = _current_trace.get()
+    if trace is None or name in trace.active:
+        yield
+        return
+
+    trace.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.active.discard(name)
+        trace.add(name, (time.perf_counter() - start) * 1000)
+
+
+def traced(name):
+    """Декоратор: выполняет функцию внутри спана name"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _db_span(execute, sql, params, many, context):
+    with span('db'):
+        return execute(sql, params, many, context)
+
+
+class TracingMiddleware:
+    """
+    Открывает трассу на время запроса и оборачивает все запросы к БД в спан 'db'.
+    Должен стоять первым в MIDDLEWARE, чтобы учитывать работу остальных middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_tracing_config()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        trace = Trace()
+        token = _current_trace.set(trace)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_db_span))
+                response = self.get_response(request)
+        finally:
+            _current_trace.reset(token)
+
+        total_ms = trace.elapsed_ms()
+        if self.config['SERVER_TIMING']:
+            response['Server-Timing'] = trace.server_timing(total_ms)
+
+        if self.config['FILE'] and random.random() < self.config['SAMPLE_RATE']:
+            get_writer(self.config['FILE']).write({
+                'ts': time.time(),
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 3),
+                'spans': {
+                    name: {'ms': round(duration, 3), 'count': count}
+                    for name, (duration, count) in trace.spans.items()
+                },
+            })
+        return response
+
+
+class TracedSessionMiddleware(SessionMiddleware):
+    """SessionMiddleware с замером записи сессии"""
+
+    def process_response(self, request, response):
+        with span('session'):
+            return super().process_response(request, response)
+
+
+class TracedJSONRenderer(JSONRenderer):
+    """JSON-рендерер DRF с замером рендеринга"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class TracedListSerializer(serializers.ListSerializer):
+    """ListSerializer с одним спаном на весь список"""
+
+    def to_representation(self, data):
+        with span('serialize'):
+            return super().to_representation(data)
+
+
+class TracedSerializerMixin:
+    """
+    Замеряет сериализацию верхнего уровня. Для many=True спан открывает
+    TracedListSerializer (укажите его в Meta.list_serializer_class).
+    """
+
+    def to_representation(self, instance):
+        if self.parent is not None:
+            return super().to_representation(instance)
+        with span('serialize'):
+            return super().to_representation(instance)
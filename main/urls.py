@@ -1,10 +1,10 @@
 from django.urls import path, include
-from . import views
+from .lazy import view
 
 urlpatterns = [
-    path('', views.home, name='home'),
-    path('about/', views.about, name='about'),
-    path('sign-up/', views.sign_up, name='sign_up'),
-    path('profile/', views.profile, name='profile'),
+    path('', view('main.views.home'), name='home'),
+    path('about/', view('main.views.about'), name='about'),
+    path('sign-up/', view('main.views.sign_up'), name='sign_up'),
+    path('profile/', view('main.views.profile'), name='profile'),
     path('accounts/', include('django.contrib.auth.urls')),
 ]
\ No newline at end of file
@@ -3,15 +3,24 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from .forms import SignUpForm, UserUpdateForm
+from .page_cache import cache_anonymous_page
+from .tasks import after_registration
+from .tracing import span
 
 
+@cache_anonymous_page
 def home(request):
-    return render(request, 'home.html')
+    with span('render'):
+        return render(request, 'home.html')
+
+
 @login_required
 def about(request):
-    return render(request, 'about.html')
+    with span('render'):
+        return render(request, 'about.html')
 
 
+@cache_anonymous_page
 def sign_up(request):
     if request.method == 'POST':
         # Если форма отправлена, передаем в нее данные из POST-запроса
@@ -20,7 +29,10 @@ def sign_up(request):
             # Сохраняем нового пользователя
             user = form.save()
             # Сразу логиним пользователя после регистрации
-            login(request, user)
+            with span('login'):
+                login(request, user)
+            # Письмо, аудит и прогрев кеша — в фоне, после обновления last_login
+            after_registration(user, request, 'web')
             # Перенаправляем на главную страницу или в личный кабинет
             return redirect('home')  # 'home' - имя вашего главного URL
     else:
@@ -28,7 +40,8 @@ def sign_up(request):
         form = SignUpForm()
 
     # Передаем форму в шаблон
-    return render(request, 'registration/sign_up.html', {'form': form})
+    with span('render'):
+        return render(request, 'registration/sign_up.html', {'form': form})
 
 
 @login_required  # Только авторизованные пользователи могут зайти
@@ -45,4 +58,5 @@ def profile(request):
         # Если просто открыта страница, показываем форму с текущими данными
         form = UserUpdateForm(instance=request.user)
 
-    return render(request, 'profile.html', {'form': form})
\ No newline at end of file
+    with span('render'):
+        return render(request, 'profile.html', {'form': form})
\ No newline at end of file
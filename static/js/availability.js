@@ -0,0 +1,46 @@
+// static/js/availability.js
+// Подсказка «занято/свободно» для полей username и email формы регистрации.
+// Запросы к /api/availability/ отправляются после паузы в наборе.
+(function () {
+    var script = document.currentScript;
+    var url = script.dataset.url;
+    var delay = 250;
+
+    function watch(name) {
+        var input = document.querySelector('input[name="' + name + '"]');
+        if (!input) {
+            return;
+        }
+        var hint = document.createElement('span');
+        hint.className = 'availability';
+        input.insertAdjacentElement('afterend', hint);
+
+        var timer = null;
+        var controller = null;
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            hint.textContent = '';
+            var value = input.value.trim();
+            if (!value) {
+                return;
+            }
+            timer = setTimeout(function () {
+                if (controller) {
+                    controller.abort();
+                }
+                controller = new AbortController();
+                fetch(url + '?' + name + '=' + encodeURIComponent(value), {signal: controller.signal})
+                    .then(function (response) { return response.ok ? response.json() : null; })
+                    .then(function (data) {
+                        if (data && data[name] && data[name].value === input.value.trim()) {
+                            hint.textContent = data[name].available ? ' свободно' : ' уже занято';
+                        }
+                    })
+                    .catch(function () {});
+            }, delay);
+        });
+    }
+
+    watch('username');
+    watch('email');
+})();